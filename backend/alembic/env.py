@@ -6,11 +6,11 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from logging.config import fileConfig
 
-from sqlalchemy import engine_from_config
+from sqlalchemy import engine_from_config, text
 from sqlalchemy.pool import NullPool
 from alembic import context
 
-from app.config import DATABASE_URL
+from app.config import DATABASE_SCHEMA, DATABASE_URL
 from app.database import Base
 
 # Import all models so Base.metadata is populated for autogenerate
@@ -47,9 +47,15 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
+        if DATABASE_SCHEMA:
+            # Migrate into DATABASE_SCHEMA (e.g. a per-worker test schema), version table included.
+            connection.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{DATABASE_SCHEMA}"'))
+            connection.execute(text(f'SET search_path TO "{DATABASE_SCHEMA}"'))
+            connection.commit()
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
+            version_table_schema=DATABASE_SCHEMA or None,
         )
 
         with context.begin_transaction():
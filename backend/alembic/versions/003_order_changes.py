@@ -0,0 +1,93 @@
+"""Order change log for GET /orders/changes
+
+Revision ID: 003_order_changes
+Revises: 002_idempotency_keys
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "003_order_changes"
+down_revision: Union[str, None] = "002_idempotency_keys"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "order_changes",
+        sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column("order_id", sa.Integer(), nullable=False),
+        sa.Column("change", sa.String(16), nullable=False),
+        sa.Column("txid", sa.BigInteger(), nullable=False, server_default=sa.text("txid_current()")),
+        sa.Column("changed_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index(op.f("ix_order_changes_changed_at"), "order_changes", ["changed_at"], unique=False)
+    op.create_index(op.f("ix_orders_updated_at"), "orders", ["updated_at"], unique=False)
+
+    # Triggers catch every writer (API, scripts, manual SQL), so the feed cannot miss a change.
+    op.execute(
+        """
+        CREATE FUNCTION log_order_change() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                INSERT INTO order_changes (order_id, change) VALUES (OLD.id, 'deleted');
+                RETURN OLD;
+            END IF;
+            INSERT INTO order_changes (order_id, change)
+            VALUES (NEW.id, CASE TG_OP WHEN 'INSERT' THEN 'created' ELSE 'updated' END);
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER orders_log_change
+        AFTER INSERT OR UPDATE OR DELETE ON orders
+        FOR EACH ROW EXECUTE FUNCTION log_order_change();
+        """
+    )
+    # Stop writes touch many rows at once; log one change per affected order per statement.
+    op.execute(
+        """
+        CREATE FUNCTION log_order_change_from_stops() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                INSERT INTO order_changes (order_id, change) SELECT DISTINCT order_id, 'updated' FROM old_stops;
+            ELSE
+                INSERT INTO order_changes (order_id, change) SELECT DISTINCT order_id, 'updated' FROM new_stops;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER stops_log_change_insert AFTER INSERT ON stops
+        REFERENCING NEW TABLE AS new_stops
+        FOR EACH STATEMENT EXECUTE FUNCTION log_order_change_from_stops();
+        CREATE TRIGGER stops_log_change_update AFTER UPDATE ON stops
+        REFERENCING NEW TABLE AS new_stops
+        FOR EACH STATEMENT EXECUTE FUNCTION log_order_change_from_stops();
+        CREATE TRIGGER stops_log_change_delete AFTER DELETE ON stops
+        REFERENCING OLD TABLE AS old_stops
+        FOR EACH STATEMENT EXECUTE FUNCTION log_order_change_from_stops();
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS stops_log_change_delete ON stops")
+    op.execute("DROP TRIGGER IF EXISTS stops_log_change_update ON stops")
+    op.execute("DROP TRIGGER IF EXISTS stops_log_change_insert ON stops")
+    op.execute("DROP FUNCTION IF EXISTS log_order_change_from_stops()")
+    op.execute("DROP TRIGGER IF EXISTS orders_log_change ON orders")
+    op.execute("DROP FUNCTION IF EXISTS log_order_change()")
+    op.drop_index(op.f("ix_orders_updated_at"), table_name="orders")
+    op.drop_index(op.f("ix_order_changes_changed_at"), table_name="order_changes")
+    op.drop_table("order_changes")
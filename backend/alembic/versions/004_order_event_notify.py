@@ -0,0 +1,83 @@
+"""NOTIFY order events for the SSE stream
+
+Revision ID: 004_order_event_notify
+Revises: 003_order_changes
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "004_order_event_notify"
+down_revision: Union[str, None] = "003_order_changes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Deferred to commit time: rolled-back writes never notify, and the payload reflects the
+    # committed state (a new order's stops are already there). Identical payloads within one
+    # transaction are collapsed by Postgres, so a stop rewrite notifies once per order.
+    op.execute(
+        """
+        CREATE FUNCTION notify_order_event() RETURNS trigger AS $$
+        DECLARE
+            event text;
+            changed_id integer;
+        BEGIN
+            IF TG_TABLE_NAME = 'stops' THEN
+                changed_id := COALESCE(NEW.order_id, OLD.order_id);
+                event := 'stops_updated';
+            ELSIF TG_OP = 'DELETE' THEN
+                PERFORM pg_notify('order_events', json_build_object('event', 'deleted', 'order_id', OLD.id)::text);
+                RETURN NULL;
+            ELSE
+                changed_id := NEW.id;
+                IF TG_OP = 'INSERT' THEN
+                    event := 'created';
+                ELSIF NEW.status IS DISTINCT FROM OLD.status THEN
+                    event := 'status_changed';
+                ELSIF NEW.total_miles IS DISTINCT FROM OLD.total_miles THEN
+                    event := 'miles_computed';
+                ELSE
+                    event := 'updated';
+                END IF;
+            END IF;
+
+            -- Stops of an order created in this transaction are part of its 'created' event.
+            PERFORM pg_notify('order_events', json_build_object(
+                'event', event,
+                'order_id', o.id,
+                'customer_id', o.customer_id,
+                'status', o.status,
+                'trailer_type', o.trailer_type,
+                'total_miles', o.total_miles,
+                'origin_state', (SELECT s.state FROM stops s WHERE s.order_id = o.id ORDER BY s.sequence LIMIT 1),
+                'destination_state', (SELECT s.state FROM stops s WHERE s.order_id = o.id ORDER BY s.sequence DESC LIMIT 1)
+            )::text)
+            FROM orders o
+            WHERE o.id = changed_id AND NOT (event = 'stops_updated' AND o.created_at = now());
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        """
+    )
+    op.execute(
+        """
+        CREATE CONSTRAINT TRIGGER orders_notify_event
+        AFTER INSERT OR UPDATE OR DELETE ON orders
+        DEFERRABLE INITIALLY DEFERRED
+        FOR EACH ROW EXECUTE FUNCTION notify_order_event();
+        CREATE CONSTRAINT TRIGGER stops_notify_event
+        AFTER INSERT OR UPDATE OR DELETE ON stops
+        DEFERRABLE INITIALLY DEFERRED
+        FOR EACH ROW EXECUTE FUNCTION notify_order_event();
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS stops_notify_event ON stops")
+    op.execute("DROP TRIGGER IF EXISTS orders_notify_event ON orders")
+    op.execute("DROP FUNCTION IF EXISTS notify_order_event()")
@@ -0,0 +1,155 @@
+"""Archive tier for old orders and stops
+
+Revision ID: 005_order_archive
+Revises: 004_order_event_notify
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision: str = "005_order_archive"
+down_revision: Union[str, None] = "004_order_event_notify"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Moves done by app.services.order_archive set this so triggers log 'archived' instead of 'deleted'.
+_ARCHIVING = "coalesce(current_setting('app.archiving', true), '') = 'on'"
+
+_LOG_ORDER_CHANGE = """
+CREATE OR REPLACE FUNCTION log_order_change() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO order_changes (order_id, change)
+        VALUES (OLD.id, CASE WHEN {archiving} THEN 'archived' ELSE 'deleted' END);
+        RETURN OLD;
+    END IF;
+    INSERT INTO order_changes (order_id, change)
+    VALUES (NEW.id, CASE TG_OP WHEN 'INSERT' THEN 'created' ELSE 'updated' END);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+_LOG_ORDER_CHANGE_DOWN = """
+CREATE OR REPLACE FUNCTION log_order_change() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO order_changes (order_id, change) VALUES (OLD.id, 'deleted');
+        RETURN OLD;
+    END IF;
+    INSERT INTO order_changes (order_id, change)
+    VALUES (NEW.id, CASE TG_OP WHEN 'INSERT' THEN 'created' ELSE 'updated' END);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+_NOTIFY_ORDER_EVENT = """
+CREATE OR REPLACE FUNCTION notify_order_event() RETURNS trigger AS $$
+DECLARE
+    event text;
+    changed_id integer;
+BEGIN
+    IF TG_TABLE_NAME = 'stops' THEN
+        changed_id := COALESCE(NEW.order_id, OLD.order_id);
+        event := 'stops_updated';
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('order_events', json_build_object(
+            'event', {deleted_event},
+            'order_id', OLD.id
+        )::text);
+        RETURN NULL;
+    ELSE
+        changed_id := NEW.id;
+        IF TG_OP = 'INSERT' THEN
+            event := 'created';
+        ELSIF NEW.status IS DISTINCT FROM OLD.status THEN
+            event := 'status_changed';
+        ELSIF NEW.total_miles IS DISTINCT FROM OLD.total_miles THEN
+            event := 'miles_computed';
+        ELSE
+            event := 'updated';
+        END IF;
+    END IF;
+
+    -- Stops of an order created in this transaction are part of its 'created' event.
+    PERFORM pg_notify('order_events', json_build_object(
+        'event', event,
+        'order_id', o.id,
+        'customer_id', o.customer_id,
+        'status', o.status,
+        'trailer_type', o.trailer_type,
+        'total_miles', o.total_miles,
+        'origin_state', (SELECT s.state FROM stops s WHERE s.order_id = o.id ORDER BY s.sequence LIMIT 1),
+        'destination_state', (SELECT s.state FROM stops s WHERE s.order_id = o.id ORDER BY s.sequence DESC LIMIT 1)
+    )::text)
+    FROM orders o
+    WHERE o.id = changed_id AND NOT (event = 'stops_updated' AND o.created_at = now());
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        "orders_archive",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("customer_id", sa.Integer(), nullable=False),
+        sa.Column("trailer_type", sa.String(64), nullable=True),
+        sa.Column("load_type", sa.String(128), nullable=True),
+        sa.Column("weight_lbs", sa.Integer(), nullable=True),
+        sa.Column("notes", sa.String(1024), nullable=True),
+        sa.Column("status", sa.String(32), nullable=False),
+        sa.Column("route_geometry", JSONB, nullable=True),
+        sa.Column("total_miles", sa.Float(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("archived_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(["customer_id"], ["customers.id"], ondelete="RESTRICT"),
+    )
+    op.create_index(op.f("ix_orders_archive_customer_id"), "orders_archive", ["customer_id"], unique=False)
+    # Rows arrive roughly in created_at order, so a BRIN index covers date-range exports at a tiny size.
+    op.create_index(
+        "ix_orders_archive_created_at_brin", "orders_archive", ["created_at"], unique=False, postgresql_using="brin"
+    )
+
+    op.create_table(
+        "stops_archive",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("order_id", sa.Integer(), nullable=False),
+        sa.Column("sequence", sa.Integer(), nullable=False),
+        sa.Column("stop_type", sa.String(32), nullable=False),
+        sa.Column("location_name", sa.String(255), nullable=True),
+        sa.Column("address", sa.String(512), nullable=True),
+        sa.Column("city", sa.String(128), nullable=True),
+        sa.Column("state", sa.String(32), nullable=True),
+        sa.Column("zip", sa.String(32), nullable=True),
+        sa.Column("lat", sa.Float(), nullable=True),
+        sa.Column("lng", sa.Float(), nullable=True),
+        sa.Column("scheduled_arrival_early", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("scheduled_arrival_late", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["order_id"], ["orders_archive.id"], ondelete="CASCADE"),
+    )
+    op.create_index(op.f("ix_stops_archive_order_id"), "stops_archive", ["order_id"], unique=False)
+
+    op.execute(_LOG_ORDER_CHANGE.format(archiving=_ARCHIVING))
+    op.execute(
+        _NOTIFY_ORDER_EVENT.format(deleted_event=f"CASE WHEN {_ARCHIVING} THEN 'archived' ELSE 'deleted' END")
+    )
+
+
+def downgrade() -> None:
+    op.execute(_NOTIFY_ORDER_EVENT.format(deleted_event="'deleted'"))
+    op.execute(_LOG_ORDER_CHANGE_DOWN)
+    op.drop_index(op.f("ix_stops_archive_order_id"), table_name="stops_archive")
+    op.drop_table("stops_archive")
+    op.drop_index("ix_orders_archive_created_at_brin", table_name="orders_archive")
+    op.drop_index(op.f("ix_orders_archive_customer_id"), table_name="orders_archive")
+    op.drop_table("orders_archive")
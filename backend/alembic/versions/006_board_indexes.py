@@ -0,0 +1,51 @@
+"""Indexes for the board's access patterns
+
+Revision ID: 006_board_indexes
+Revises: 005_order_archive
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "006_board_indexes"
+down_revision: Union[str, None] = "005_order_archive"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Status-scoped date ranges (archival candidates, status boards) and plain date ranges (export, "new").
+    op.create_index("ix_orders_status_created_at", "orders", ["status", "created_at"], unique=False)
+    op.create_index(op.f("ix_orders_created_at"), "orders", ["created_at"], unique=False)
+    # Equipment is always compared normalized ("Dry Van" -> "dry-van"), so index the expression.
+    op.create_index(
+        "ix_orders_equipment",
+        "orders",
+        [sa.text("replace(lower(btrim(trailer_type)), ' ', '-')")],
+        unique=False,
+    )
+    # Origin/destination lookups (first/last stop by sequence) answered from the index alone.
+    op.create_index(
+        "ix_stops_order_id_sequence_place",
+        "stops",
+        ["order_id", "sequence"],
+        unique=False,
+        postgresql_include=["city", "state", "scheduled_arrival_early"],
+    )
+    op.create_index(op.f("ix_stops_scheduled_arrival_early"), "stops", ["scheduled_arrival_early"], unique=False)
+    # updated_at delta refreshes of the board snapshot and customer typeahead index.
+    op.create_index(op.f("ix_stops_updated_at"), "stops", ["updated_at"], unique=False)
+    op.create_index(op.f("ix_customers_updated_at"), "customers", ["updated_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_customers_updated_at"), table_name="customers")
+    op.drop_index(op.f("ix_stops_updated_at"), table_name="stops")
+    op.drop_index(op.f("ix_stops_scheduled_arrival_early"), table_name="stops")
+    op.drop_index("ix_stops_order_id_sequence_place", table_name="stops")
+    op.drop_index("ix_orders_equipment", table_name="orders")
+    op.drop_index(op.f("ix_orders_created_at"), table_name="orders")
+    op.drop_index("ix_orders_status_created_at", table_name="orders")
@@ -0,0 +1,44 @@
+"""Record where order miles came from (OSRM vs Haversine)
+
+Revision ID: 007_distance_source
+Revises: 006_board_indexes
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "007_distance_source"
+down_revision: Union[str, None] = "006_board_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("orders", sa.Column("distance_source", sa.String(16), nullable=True))
+    # Archive copies columns by name from orders.
+    op.add_column("orders_archive", sa.Column("distance_source", sa.String(16), nullable=True))
+    # Backfill candidates: small partial indexes that shrink as the backfill makes progress.
+    op.create_index(
+        "ix_orders_backfill_candidates",
+        "orders",
+        ["id"],
+        unique=False,
+        postgresql_where=sa.text("distance_source IS NULL OR distance_source <> 'osrm'"),
+    )
+    op.create_index(
+        "ix_stops_missing_coordinates",
+        "stops",
+        ["order_id"],
+        unique=False,
+        postgresql_where=sa.text("lat IS NULL OR lng IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_stops_missing_coordinates", table_name="stops")
+    op.drop_index("ix_orders_backfill_candidates", table_name="orders")
+    op.drop_column("orders_archive", "distance_source")
+    op.drop_column("orders", "distance_source")
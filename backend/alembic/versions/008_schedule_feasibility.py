@@ -0,0 +1,38 @@
+"""Stop ETAs and order at-risk flags from schedule feasibility
+
+Revision ID: 008_schedule_feasibility
+Revises: 007_distance_source
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "008_schedule_feasibility"
+down_revision: Union[str, None] = "007_distance_source"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Same columns on the archive tables, which copy by name from the hot ones.
+    for table in ("stops", "stops_archive"):
+        op.add_column(table, sa.Column("eta", sa.DateTime(timezone=True), nullable=True))
+        op.add_column(table, sa.Column("slack_minutes", sa.Float(), nullable=True))
+    for table in ("orders", "orders_archive"):
+        op.add_column(table, sa.Column("at_risk", sa.Boolean(), server_default=sa.false(), nullable=False))
+        op.add_column(table, sa.Column("window_violations", sa.Integer(), server_default="0", nullable=False))
+    # At-risk views touch few orders; a partial index keeps them off a full scan.
+    op.create_index("ix_orders_at_risk", "orders", ["id"], unique=False, postgresql_where=sa.text("at_risk"))
+
+
+def downgrade() -> None:
+    op.drop_index("ix_orders_at_risk", table_name="orders")
+    for table in ("orders", "orders_archive"):
+        op.drop_column(table, "window_violations")
+        op.drop_column(table, "at_risk")
+    for table in ("stops", "stops_archive"):
+        op.drop_column(table, "slack_minutes")
+        op.drop_column(table, "eta")
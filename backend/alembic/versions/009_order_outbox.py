@@ -0,0 +1,48 @@
+"""Transactional outbox for order events
+
+Revision ID: 009_order_outbox
+Revises: 008_schedule_feasibility
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision: str = "009_order_outbox"
+down_revision: Union[str, None] = "008_schedule_feasibility"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "order_outbox",
+        sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column("order_id", sa.Integer(), nullable=False),
+        sa.Column("event", sa.String(32), nullable=False),
+        sa.Column("payload", JSONB, nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("dispatched_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("attempts", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("last_error", sa.String(512), nullable=True),
+    )
+    # The dispatcher and backlog gauges only look at undelivered rows; pruning only at delivered ones.
+    op.create_index(
+        "ix_order_outbox_pending", "order_outbox", ["id"], unique=False, postgresql_where=sa.text("dispatched_at IS NULL")
+    )
+    op.create_index(
+        "ix_order_outbox_dispatched_at",
+        "order_outbox",
+        ["dispatched_at"],
+        unique=False,
+        postgresql_where=sa.text("dispatched_at IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_order_outbox_dispatched_at", table_name="order_outbox")
+    op.drop_index("ix_order_outbox_pending", table_name="order_outbox")
+    op.drop_table("order_outbox")
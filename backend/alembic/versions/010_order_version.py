@@ -0,0 +1,27 @@
+"""Order version for optimistic concurrency on stop edits
+
+Revision ID: 010_order_version
+Revises: 009_order_outbox
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "010_order_version"
+down_revision: Union[str, None] = "009_order_outbox"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Same column on the archive table, which copies by name from orders.
+    for table in ("orders", "orders_archive"):
+        op.add_column(table, sa.Column("version", sa.Integer(), server_default="1", nullable=False))
+
+
+def downgrade() -> None:
+    for table in ("orders", "orders_archive"):
+        op.drop_column(table, "version")
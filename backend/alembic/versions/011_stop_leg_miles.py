@@ -0,0 +1,27 @@
+"""Stored leg miles so schedule sweeps reuse the distances ETAs were computed with
+
+Revision ID: 011_stop_leg_miles
+Revises: 010_order_version
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "011_stop_leg_miles"
+down_revision: Union[str, None] = "010_order_version"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Same column on the archive table, which copies by name from stops.
+    for table in ("stops", "stops_archive"):
+        op.add_column(table, sa.Column("leg_miles", sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    for table in ("stops", "stops_archive"):
+        op.drop_column(table, "leg_miles")
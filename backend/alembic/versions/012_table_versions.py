@@ -0,0 +1,54 @@
+"""Cheap ETag validators: txid index on order_changes, change counter for customers
+
+Revision ID: 012_table_versions
+Revises: 011_stop_leg_miles
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "012_table_versions"
+down_revision: Union[str, None] = "011_stop_leg_miles"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Orders and stops validators count the change-log rows at or past the snapshot horizon.
+    op.create_index(op.f("ix_order_changes_txid"), "order_changes", ["txid"], unique=False)
+
+    op.create_table(
+        "table_versions",
+        sa.Column("table_name", sa.String(63), primary_key=True),
+        sa.Column("version", sa.BigInteger(), server_default="0", nullable=False),
+    )
+    op.execute("INSERT INTO table_versions (table_name) VALUES ('customers')")
+    # The row lock is held until commit, so versions become visible in commit order. Writers to one
+    # table serialize on it: only for rarely written tables (orders and stops use order_changes).
+    op.execute(
+        """
+        CREATE FUNCTION bump_table_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE table_name = TG_TABLE_NAME;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER customers_bump_version
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON customers
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS customers_bump_version ON customers")
+    op.execute("DROP FUNCTION IF EXISTS bump_table_version()")
+    op.drop_table("table_versions")
+    op.drop_index(op.f("ix_order_changes_txid"), table_name="order_changes")
@@ -0,0 +1,45 @@
+"""Park outbox events that keep failing so later events are not blocked behind them
+
+Revision ID: 013_outbox_failed_at
+Revises: 012_table_versions
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "013_outbox_failed_at"
+down_revision: Union[str, None] = "012_table_versions"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("order_outbox", sa.Column("failed_at", sa.DateTime(timezone=True), nullable=True))
+    # The dispatcher claims only deliverable rows; parked ones get their own small index for status and retry.
+    op.drop_index("ix_order_outbox_pending", table_name="order_outbox")
+    op.create_index(
+        "ix_order_outbox_pending",
+        "order_outbox",
+        ["id"],
+        unique=False,
+        postgresql_where=sa.text("dispatched_at IS NULL AND failed_at IS NULL"),
+    )
+    op.create_index(
+        "ix_order_outbox_parked",
+        "order_outbox",
+        ["id"],
+        unique=False,
+        postgresql_where=sa.text("dispatched_at IS NULL AND failed_at IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_order_outbox_parked", table_name="order_outbox")
+    op.drop_index("ix_order_outbox_pending", table_name="order_outbox")
+    op.create_index(
+        "ix_order_outbox_pending", "order_outbox", ["id"], unique=False, postgresql_where=sa.text("dispatched_at IS NULL")
+    )
+    op.drop_column("order_outbox", "failed_at")
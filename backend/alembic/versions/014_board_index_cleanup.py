@@ -0,0 +1,54 @@
+"""Board indexes that queries actually use; one (order_id, sequence) index on stops
+
+Revision ID: 014_board_index_cleanup
+Revises: 013_outbox_failed_at
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "014_board_index_cleanup"
+down_revision: Union[str, None] = "013_outbox_failed_at"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Archival candidates are picked by status and last update, not creation date.
+    op.drop_index("ix_orders_status_created_at", table_name="orders")
+    op.create_index("ix_orders_status_updated_at", "orders", ["status", "updated_at"], unique=False)
+    # The board filters equipment in Python and facets only use the expression in FILTER clauses.
+    op.drop_index("ix_orders_equipment", table_name="orders")
+    # The covering index enforces the per-order sequence itself instead of duplicating the constraint.
+    op.drop_index("ix_stops_order_id_sequence_place", table_name="stops")
+    op.drop_constraint("uq_stops_order_id_sequence", "stops", type_="unique")
+    op.create_index(
+        "uq_stops_order_id_sequence",
+        "stops",
+        ["order_id", "sequence"],
+        unique=True,
+        postgresql_include=["city", "state", "scheduled_arrival_early"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_stops_order_id_sequence", table_name="stops")
+    op.create_unique_constraint("uq_stops_order_id_sequence", "stops", ["order_id", "sequence"])
+    op.create_index(
+        "ix_stops_order_id_sequence_place",
+        "stops",
+        ["order_id", "sequence"],
+        unique=False,
+        postgresql_include=["city", "state", "scheduled_arrival_early"],
+    )
+    op.create_index(
+        "ix_orders_equipment",
+        "orders",
+        [sa.text("replace(lower(btrim(trailer_type)), ' ', '-')")],
+        unique=False,
+    )
+    op.drop_index("ix_orders_status_updated_at", table_name="orders")
+    op.create_index("ix_orders_status_created_at", "orders", ["status", "created_at"], unique=False)
@@ -0,0 +1,24 @@
+"""Store the response ETag with idempotent responses so replays send the same validator
+
+Revision ID: 015_idempotency_response_etag
+Revises: 014_board_index_cleanup
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "015_idempotency_response_etag"
+down_revision: Union[str, None] = "014_board_index_cleanup"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("idempotency_keys", sa.Column("response_etag", sa.String(128), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("idempotency_keys", "response_etag")
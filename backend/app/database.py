@@ -1,19 +1,282 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import itertools
+import threading
+import time
+from datetime import datetime
 
-from app.config import DATABASE_URL
+from fastapi import Request
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool
 
-engine = create_engine(
+from app.config import (
+    DATABASE_REPLICA_URLS,
+    DATABASE_SCHEMA,
     DATABASE_URL,
-    pool_pre_ping=True,
+    DB_MAX_OVERFLOW,
+    DB_POOL_RECYCLE_SECONDS,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT_SECONDS,
+    DB_STATEMENT_TIMEOUT_MS,
+    REPLICA_MAX_LAG_SECONDS,
+    REPLICA_RETRY_SECONDS,
+    REPLICA_STICKY_SECONDS,
 )
+
+
+class PoolWaitStats:
+    """Cumulative time callers spent waiting for a pooled connection, plus pool timeouts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record(self, waited: float, timed_out: bool) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.wait_stats.record(time.perf_counter() - started, timed_out)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+
+def _create_engine(url: str):
+    options = []
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        options.append(f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}")
+    if DATABASE_SCHEMA:
+        options.append(f"-c search_path={DATABASE_SCHEMA}")
+    connect_args = {"options": " ".join(options)} if options else {}
+    return create_engine(
+        url,
+        poolclass=TimedQueuePool,
+        pool_pre_ping=True,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=DB_POOL_RECYCLE_SECONDS,
+        connect_args=connect_args,
+    )
+
+
+engine = _create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+replica_engines = [_create_engine(url) for url in DATABASE_REPLICA_URLS]
+ReplicaSessionLocals = [
+    sessionmaker(autocommit=False, autoflush=False, bind=replica_engine) for replica_engine in replica_engines
+]
 
-def get_db():
+# Set on responses to writes; while it is in the future, that client's reads go to the primary. Browser
+# clients on another site never send the cookie back, so they echo the header instead.
+PRIMARY_STICKY_COOKIE = "db_primary_until"
+PRIMARY_STICKY_HEADER = "X-Primary-Until"
+
+_REPLICA_LAG_CHECK_SECONDS = 5.0
+_REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+class _ReplicaRouter:
+    """Round-robin over healthy replicas; a replica that fails or lags is skipped for a while."""
+
+    def __init__(self, count: int):
+        self._count = count
+        self._cycle = itertools.cycle(range(count)) if count else None
+        self._lock = threading.Lock()
+        self._unhealthy_until = [0.0] * count
+        self._lag_checked_at = [0.0] * count
+
+    def candidates(self) -> list[int]:
+        now = time.monotonic()
+        with self._lock:
+            if not self._cycle:
+                return []
+            start = next(self._cycle)
+        order = [(start + offset) % self._count for offset in range(self._count)]
+        return [index for index in order if self._unhealthy_until[index] <= now]
+
+    def needs_lag_check(self, index: int) -> bool:
+        return time.monotonic() - self._lag_checked_at[index] >= _REPLICA_LAG_CHECK_SECONDS
+
+    def mark_checked(self, index: int) -> None:
+        self._lag_checked_at[index] = time.monotonic()
+
+    def mark_unhealthy(self, index: int) -> None:
+        self._unhealthy_until[index] = time.monotonic() + REPLICA_RETRY_SECONDS
+
+
+replica_router = _ReplicaRouter(len(ReplicaSessionLocals))
+
+
+def get_db(request: Request):
+    # Marks the request as a primary (write) request for read-your-writes stickiness.
+    request.state.db_write = True
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+def _wants_primary(request: Request) -> bool:
+    for sticky_until in (request.cookies.get(PRIMARY_STICKY_COOKIE), request.headers.get(PRIMARY_STICKY_HEADER)):
+        try:
+            if sticky_until is not None and float(sticky_until) > time.time():
+                return True
+        except ValueError:
+            continue
+    return False
+
+
+def _open_replica_session():
+    """Return a session on the first healthy replica, or None if none is usable."""
+    for index in replica_router.candidates():
+        db = ReplicaSessionLocals[index]()
+        try:
+            if replica_router.needs_lag_check(index):
+                lag = db.execute(_REPLICA_LAG_SQL).scalar()
+                replica_router.mark_checked(index)
+                if lag is not None and float(lag) > REPLICA_MAX_LAG_SECONDS:
+                    db.close()
+                    replica_router.mark_unhealthy(index)
+                    continue
+            else:
+                db.connection()
+            return db
+        except OperationalError:
+            db.close()
+            replica_router.mark_unhealthy(index)
+    return None
+
+
+def _open_read_session(request: Request):
+    db = None
+    if ReplicaSessionLocals and not _wants_primary(request):
+        db = _open_replica_session()
+    return db if db is not None else SessionLocal()
+
+
+def get_read_db(request: Request):
+    """
+    Session for read-only endpoints.
+    Uses a replica when DATABASE_REPLICA_URLS is set, unless the client wrote recently or no replica is healthy.
+    """
+    db = _open_read_session(request)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_lazy_read_db(request: Request):
+    """
+    Like get_read_db, but yields a function that opens the session on first call. For endpoints that
+    usually answer from memory, so those requests never check out a replica connection.
+    """
+    opened = []
+
+    def open_db():
+        if not opened:
+            opened.append(_open_read_session(request))
+        return opened[0]
+
+    try:
+        yield open_db
+    finally:
+        for db in opened:
+            db.close()
+
+
+def mark_primary_sticky(response) -> None:
+    """Pin the client's subsequent reads to the primary so it sees its own writes (cookie, or echoed header)."""
+    sticky_until = str(time.time() + REPLICA_STICKY_SECONDS)
+    response.headers[PRIMARY_STICKY_HEADER] = sticky_until
+    response.set_cookie(
+        PRIMARY_STICKY_COOKIE,
+        sticky_until,
+        max_age=int(REPLICA_STICKY_SECONDS) + 1,
+        httponly=True,
+        samesite="lax",
+    )
+
+
+# Oldest start among this database's open transactions (including the caller's), or now().
+_DELTA_WATERMARK_SQL = text(
+    "SELECT least(now(), min(xact_start)) FROM pg_stat_activity "
+    "WHERE datname = current_database() AND xact_start IS NOT NULL"
+)
+
+
+def delta_watermark(db) -> datetime:
+    """
+    Watermark for `updated_at >= watermark` delta reads (board snapshot, customer index). `updated_at`
+    is now() of the writing transaction, i.e. its start, so any row not yet visible to this read will
+    carry a timestamp no older than the oldest transaction open right now, however long it runs.
+    Run it on the primary: a replica has its own sessions and lags. Sessions of other database roles
+    only show up for roles with pg_read_all_stats.
+    """
+    return db.execute(_DELTA_WATERMARK_SQL).scalar()
+
+
+def prewarm_pool(target_engine, connections: int) -> int:
+    """Open up to `connections` pooled connections at once and return them, so later checkouts are warm."""
+    opened = []
+    try:
+        for _ in range(min(connections, DB_POOL_SIZE)):
+            conn = target_engine.connect()
+            conn.execute(text("SELECT 1"))
+            opened.append(conn)
+    finally:
+        for conn in opened:
+            conn.close()
+    return len(opened)
+
+
+def pool_status(target_engine) -> dict:
+    """Live gauges for one engine's pool."""
+    pool = target_engine.pool
+    stats = pool.wait_stats
+    attempts = stats.checkouts + stats.timeouts
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checkouts": stats.checkouts,
+        "timeouts": stats.timeouts,
+        "avg_wait_ms": round(stats.total_wait_seconds / attempts * 1000, 3) if attempts else 0.0,
+        "max_wait_ms": round(stats.max_wait_seconds * 1000, 3),
+    }
@@ -1,14 +1,40 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from sqlalchemy import text
 
-from app.database import engine
-from app.routers import orders, customers
+from app.config import (
+    GZIP_COMPRESS_LEVEL,
+    GZIP_MINIMUM_SIZE,
+    ORDER_BOARD_SNAPSHOT,
+    ORDER_EVENTS_LISTEN,
+    WARMUP_BACKGROUND,
+    WARMUP_ENABLED,
+)
+from app.database import (
+    PRIMARY_STICKY_HEADER,
+    PoolTimeoutError,
+    ReplicaSessionLocals,
+    SessionLocal,
+    engine,
+    mark_primary_sticky,
+    pool_status,
+    replica_engines,
+)
+from app.routers import orders, customers, quotes, routing
+from app.services.geo_gateway import geo_gateway
+from app.services.order_board import order_board
+from app.services.order_events import order_event_hub
+from app.services.outbox import outbox_status
+from app.services.warmup import start_warmup, warmup_state
 
 app = FastAPI(title="Freight Marketplace API")
 
 app.include_router(orders.router)
 app.include_router(customers.router)
+app.include_router(routing.router)
+app.include_router(quotes.router)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,16 +42,87 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let browser clients read validators for conditional polling, and the primary pin to echo back.
+    expose_headers=["ETag", PRIMARY_STICKY_HEADER],
 )
+# Starlette >= 0.46 (pinned in requirements.txt) leaves text/event-stream alone, so SSE events are not buffered.
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE, compresslevel=GZIP_COMPRESS_LEVEL)
+
+
+@app.middleware("http")
+async def replica_read_your_writes(request: Request, call_next):
+    """After a successful write, keep this client's reads on the primary while replicas catch up."""
+    response = await call_next(request)
+    if ReplicaSessionLocals and getattr(request.state, "db_write", False) and response.status_code < 400:
+        mark_primary_sticky(response)
+    return response
+
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_exhausted(request: Request, exc: PoolTimeoutError):
+    """Fail fast when every pooled connection is busy instead of letting requests queue indefinitely."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database connection pool exhausted; retry shortly"},
+        headers={"Retry-After": "1"},
+    )
 
 
 @app.on_event("startup")
 def startup():
-    """Verify database connection on startup."""
+    """Verify database connection, start the order-event listener and warm the worker up (see app.services.warmup)."""
     with engine.connect() as conn:
         conn.execute(text("SELECT 1"))
+    if ORDER_EVENTS_LISTEN:
+        if ORDER_BOARD_SNAPSHOT:
+            # Writes from other workers reach this worker's board on the next read, not the next poll.
+            order_event_hub.add_callback(lambda event: order_board.mark_stale())
+        order_event_hub.start()
+    if WARMUP_ENABLED:
+        start_warmup(app, background=WARMUP_BACKGROUND)
+    else:
+        warmup_state.finish()
+
+
+@app.on_event("shutdown")
+def shutdown():
+    order_event_hub.stop()
 
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
+
+
+@app.get("/ready")
+def ready(response: Response):
+    """Readiness: 503 until this worker's warm-up is done. Includes startup timings."""
+    if not warmup_state.ready:
+        response.status_code = 503
+    return warmup_state.status()
+
+
+@app.get("/health/db")
+def health_db():
+    """Connection pool gauges for the primary and each replica, plus the LISTEN connection for order events."""
+    return {
+        "primary": pool_status(engine),
+        "replicas": [pool_status(replica_engine) for replica_engine in replica_engines],
+        "order_events": order_event_hub.status(),
+    }
+
+
+@app.get("/health/outbox")
+def health_outbox():
+    """Order-event outbox backlog: undelivered events, delivery lag of the oldest and its retry count."""
+    db = SessionLocal()
+    try:
+        return outbox_status(db)
+    finally:
+        db.close()
+
+
+@app.get("/health/upstreams")
+def health_upstreams():
+    """Circuit state, latency and failure counts per geo upstream (Nominatim, OSRM)."""
+    return geo_gateway.status()
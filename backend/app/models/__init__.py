@@ -2,5 +2,10 @@ from app.models.customer import Customer
 from app.models.order import Order
 from app.models.stop import Stop
 from app.models.lane_history import LaneHistory
+from app.models.idempotency_key import IdempotencyKey
+from app.models.order_change import OrderChange
+from app.models.order_archive import OrderArchive, StopArchive
+from app.models.order_outbox import OrderOutbox
+from app.models.table_version import TableVersion
 
-__all__ = ["Customer", "Order", "Stop", "LaneHistory"]
+__all__ = ["Customer", "Order", "Stop", "LaneHistory", "IdempotencyKey", "OrderChange", "OrderArchive", "StopArchive", "OrderOutbox", "TableVersion"]
@@ -19,6 +19,6 @@ class Customer(Base):
     phone = Column(String(64), nullable=True)
     email = Column(String(255), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
 
     orders = relationship("Order", back_populates="customer")
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+
+class IdempotencyKey(Base):
+    """Client-supplied Idempotency-Key claims and the response recorded for each."""
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String(128), nullable=False)  # endpoint (+ resource), e.g. "create_order"
+    key = Column(String(255), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    status = Column(String(16), nullable=False, default="in_progress")  # in_progress, completed
+    response_status = Column(Integer, nullable=True)
+    response_body = Column(JSONB, nullable=True)
+    response_etag = Column(String(128), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    __table_args__ = (UniqueConstraint("scope", "key", name="uq_idempotency_keys_scope_key"),)
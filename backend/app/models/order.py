@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime
+from sqlalchemy import Boolean, Column, Integer, String, Float, ForeignKey, DateTime, Index, false, text
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -18,8 +18,24 @@ class Order(Base):
     status = Column(String(32), nullable=False, default="draft")
     route_geometry = Column(JSONB, nullable=True)  # GeoJSON LineString: {"type": "LineString", "coordinates": [[lng, lat], ...]}
     total_miles = Column(Float, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    distance_source = Column(String(16), nullable=True)  # "osrm" or "haversine"; NULL until miles are computed
+    # Schedule feasibility (app.services.schedule): some stop has too little slack / is past its late window.
+    at_risk = Column(Boolean, nullable=False, default=False, server_default=false())
+    window_violations = Column(Integer, nullable=False, default=0, server_default="0")
+    # Bumped by every write to the order or its stops: compare-and-swap for edits, cache validator for reads.
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
 
     customer = relationship("Customer", back_populates="orders")
     stops = relationship("Stop", back_populates="order", order_by="Stop.sequence", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index("ix_orders_status_updated_at", "status", "updated_at"),
+        Index(
+            "ix_orders_backfill_candidates",
+            "id",
+            postgresql_where=text("distance_source IS NULL OR distance_source <> 'osrm'"),
+        ),
+        Index("ix_orders_at_risk", "id", postgresql_where=text("at_risk")),
+    )
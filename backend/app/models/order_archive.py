@@ -0,0 +1,56 @@
+from sqlalchemy import Boolean, Column, Integer, String, Float, ForeignKey, DateTime, false
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+
+class OrderArchive(Base):
+    """Orders moved out of the hot `orders` table by scripts/archive_orders.py; same columns plus archived_at."""
+    __tablename__ = "orders_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False, index=True)
+    trailer_type = Column(String(64), nullable=True)
+    load_type = Column(String(128), nullable=True)
+    weight_lbs = Column(Integer, nullable=True)
+    notes = Column(String(1024), nullable=True)
+    status = Column(String(32), nullable=False)
+    route_geometry = Column(JSONB, nullable=True)
+    total_miles = Column(Float, nullable=True)
+    distance_source = Column(String(16), nullable=True)  # "osrm" or "haversine"; NULL until miles are computed
+    at_risk = Column(Boolean, nullable=False, server_default=false())
+    window_violations = Column(Integer, nullable=False, server_default="0")
+    version = Column(Integer, nullable=False, server_default="1")
+    created_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    customer = relationship("Customer")
+    stops = relationship("StopArchive", back_populates="order", order_by="StopArchive.sequence")
+
+
+class StopArchive(Base):
+    __tablename__ = "stops_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    order_id = Column(Integer, ForeignKey("orders_archive.id", ondelete="CASCADE"), nullable=False, index=True)
+    sequence = Column(Integer, nullable=False)
+    stop_type = Column(String(32), nullable=False)
+    location_name = Column(String(255), nullable=True)
+    address = Column(String(512), nullable=True)
+    city = Column(String(128), nullable=True)
+    state = Column(String(32), nullable=True)
+    zip = Column(String(32), nullable=True)
+    lat = Column(Float, nullable=True)
+    lng = Column(Float, nullable=True)
+    scheduled_arrival_early = Column(DateTime(timezone=True), nullable=True)
+    scheduled_arrival_late = Column(DateTime(timezone=True), nullable=True)
+    eta = Column(DateTime(timezone=True), nullable=True)
+    slack_minutes = Column(Float, nullable=True)
+    leg_miles = Column(Float, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+
+    order = relationship("OrderArchive", back_populates="stops")
@@ -0,0 +1,15 @@
+from sqlalchemy import BigInteger, Column, DateTime, Integer, String, text
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+
+class OrderChange(Base):
+    """Append-only log of order writes, filled by database triggers; `id` is the change-feed token."""
+    __tablename__ = "order_changes"
+
+    id = Column(BigInteger, primary_key=True)
+    order_id = Column(Integer, nullable=False)  # no FK: rows outlive deleted orders as tombstones
+    change = Column(String(16), nullable=False)  # created, updated, deleted
+    txid = Column(BigInteger, nullable=False, server_default=text("txid_current()"), index=True)
+    changed_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -0,0 +1,26 @@
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+
+class OrderOutbox(Base):
+    """Order events written in the same transaction as the order change; drained by scripts/outbox_dispatcher.py."""
+    __tablename__ = "order_outbox"
+
+    id = Column(BigInteger, primary_key=True)  # delivery order, and the id consumers dedupe on
+    order_id = Column(Integer, nullable=False)  # no FK: events outlive deleted orders
+    event = Column(String(32), nullable=False)  # order.created, order.stops_updated, order.stops_optimized
+    payload = Column(JSONB, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    dispatched_at = Column(DateTime(timezone=True), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(String(512), nullable=True)
+    failed_at = Column(DateTime(timezone=True), nullable=True)  # parked after OUTBOX_MAX_ATTEMPTS failures
+
+    __table_args__ = (
+        Index("ix_order_outbox_pending", "id", postgresql_where=text("dispatched_at IS NULL AND failed_at IS NULL")),
+        Index("ix_order_outbox_parked", "id", postgresql_where=text("dispatched_at IS NULL AND failed_at IS NOT NULL")),
+        Index("ix_order_outbox_dispatched_at", "dispatched_at", postgresql_where=text("dispatched_at IS NOT NULL")),
+    )
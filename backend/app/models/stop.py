@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -19,11 +19,23 @@ class Stop(Base):
     zip = Column(String(32), nullable=True)
     lat = Column(Float, nullable=True)
     lng = Column(Float, nullable=True)
-    scheduled_arrival_early = Column(DateTime(timezone=True), nullable=True)
+    scheduled_arrival_early = Column(DateTime(timezone=True), nullable=True, index=True)
     scheduled_arrival_late = Column(DateTime(timezone=True), nullable=True)
+    eta = Column(DateTime(timezone=True), nullable=True)  # computed by app.services.schedule
+    slack_minutes = Column(Float, nullable=True)  # minutes between eta and scheduled_arrival_late; negative = late
+    leg_miles = Column(Float, nullable=True)  # miles from the previous stop that `eta` was computed with
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
 
     order = relationship("Order", back_populates="stops")
 
-    __table_args__ = (UniqueConstraint("order_id", "sequence", name="uq_stops_order_id_sequence"),)
+    __table_args__ = (
+        Index(
+            "uq_stops_order_id_sequence",
+            "order_id",
+            "sequence",
+            unique=True,
+            postgresql_include=["city", "state", "scheduled_arrival_early"],
+        ),
+        Index("ix_stops_missing_coordinates", "order_id", postgresql_where=text("lat IS NULL OR lng IS NULL")),
+    )
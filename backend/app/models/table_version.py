@@ -0,0 +1,11 @@
+from sqlalchemy import BigInteger, Column, String, text
+
+from app.database import Base
+
+
+class TableVersion(Base):
+    """Per-table change counter bumped by a statement trigger (customers); read by ETag validators."""
+    __tablename__ = "table_versions"
+
+    table_name = Column(String(63), primary_key=True)
+    version = Column(BigInteger, nullable=False, server_default=text("0"))
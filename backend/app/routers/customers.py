@@ -1,23 +1,47 @@
-from fastapi import APIRouter, Depends, Query
+from typing import Callable
+
+from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_lazy_read_db
 from app.models import Customer
 from app.schemas import CustomerSearchResponse, CustomerListItem
+from app.services.customer_index import customer_index
+from app.services.http_cache import PROCESS_TOKEN, etag_matches, make_etag, not_modified, set_etag, table_validator
 
 router = APIRouter(prefix="/customers", tags=["customers"])
 
 
 @router.get("", response_model=CustomerSearchResponse)
 def search_customers(
+    request: Request,
+    response: Response,
     query: str = Query("", description="Search by name (ILIKE)"),
-    db: Session = Depends(get_db),
+    mode: str = Query("", description="typeahead: prefix match on name words / MC number from the in-memory index"),
+    limit: int = Query(100, ge=1, le=100),
+    read_db: Callable[[], Session] = Depends(get_lazy_read_db),
 ):
-    """List customers, optionally filtered by name (ILIKE)."""
+    """
+    List customers, optionally filtered by name (ILIKE). `mode=typeahead` serves ranked prefix matches from memory.
+    Sends an ETag; a matching If-None-Match gets a 304.
+    """
+    if mode.strip().lower() == "typeahead":
+        customer_index.ensure_fresh()
+        etag = make_etag("customers", PROCESS_TOKEN, customer_index.version, "typeahead", query, limit)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
+        return CustomerSearchResponse(items=customer_index.search(query, limit=limit))
+
+    db = read_db()
+    etag = make_etag("customers", table_validator(db, Customer), query, limit)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     customer_query = db.query(Customer)
     if query and query.strip():
         pattern = f"%{query.strip()}%"
         customer_query = customer_query.filter(Customer.name.ilike(pattern))
 
-    customers = customer_query.order_by(Customer.name.asc()).limit(100).all()
+    customers = customer_query.order_by(Customer.name.asc()).limit(limit).all()
     return CustomerSearchResponse(items=[CustomerListItem.model_validate(c) for c in customers])
@@ -1,25 +1,84 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_
+import asyncio
+import json
+import time
+from typing import Callable
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.orm import Session, joinedload, noload, selectinload
+from sqlalchemy import or_, update
 from datetime import date, datetime, timedelta
 
-from app.database import get_db
+from app.config import (
+    ESTIMATE_CACHE_SECONDS,
+    ESTIMATE_CACHE_SIZE,
+    ORDER_BOARD_SNAPSHOT,
+    ORDER_CHANGES_RETRY_AFTER_SECONDS,
+    ORDER_EVENTS_LISTEN,
+    ORDER_STREAM_HEARTBEAT_SECONDS,
+)
+from app.database import get_db, get_lazy_read_db, get_read_db
 from app.models import Order, Stop, Customer
 from app.schemas import (
+    OptimizeStopsResponse,
+    OrderBatchRequest,
+    OrderBatchResponse,
+    OrderChangeItem,
+    OrderChangesResponse,
     OrderCreate,
+    OrderFacetsResponse,
     OrderResponse,
     OrderListResponse,
+    OrderMapResponse,
     OrderListItem,
     OrderMilesEstimateRequest,
     OrderMilesEstimateResponse,
     OrderStopsUpdate,
+    StopCreate,
     StopResponse,
     CustomerCard,
 )
-from app.services.geometry import stops_to_linestring, compute_total_miles, enrich_stops_with_coordinates
+from app.services.cache import SingleFlight
+from app.services import idempotency, outbox
+from app.services.geo_gateway import geo_budget
+from app.services.http_cache import (
+    PROCESS_TOKEN,
+    etag_matches,
+    if_match,
+    make_etag,
+    not_modified,
+    set_etag,
+    table_validator,
+)
+from app.services.order_archive import export_orders_csv, get_archived_order, get_archived_orders
+from app.services.order_board import order_board
+from app.services.order_changes import ChangeTokenExpired, read_changes
+from app.services.order_events import RESYNC_EVENT, OrderEventFilter, order_event_hub
+from app.services.order_facets import compute_order_facets
+from app.services.order_map import MAX_ZOOM, order_map
+from app.services.geometry import (
+    DISTANCE_SOURCE_OSRM,
+    compute_route_miles,
+    distance_matrix_miles,
+    enrich_stops_with_coordinates,
+    stops_to_linestring,
+)
+from app.services.schedule import schedule_stops
+from app.services.stop_optimizer import optimize_stop_order
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
+# Stop-sequence optimization is bounded so it stays within one OSRM /table call and a few milliseconds of search.
+MAX_OPTIMIZE_STOPS = 25
+
+# Only OSRM miles with every stop geocoded are kept; Haversine fallbacks and partial geocodes are
+# retried on the next request so they recover as soon as the upstreams do.
+_estimate_flight = SingleFlight(
+    ttl_seconds=ESTIMATE_CACHE_SECONDS,
+    max_entries=ESTIMATE_CACHE_SIZE,
+    cacheable=lambda result: result[1] == DISTANCE_SOURCE_OSRM and result[2],
+)
+
 
 def _order_to_response(order: Order) -> OrderResponse:
     """Convert Order model to OrderResponse with stops, route_geometry, and optional customer."""
@@ -37,12 +96,55 @@ def _order_to_response(order: Order) -> OrderResponse:
         status=order.status,
         route_geometry=order.route_geometry,
         total_miles=order.total_miles,
+        distance_source=order.distance_source,
+        at_risk=order.at_risk,
+        window_violations=order.window_violations,
+        version=order.version,
         stops=stops,
         created_at=order.created_at,
         customer=customer,
+        archived_at=getattr(order, "archived_at", None),
     )
 
 
+def _build_stops(stop_inputs: list[StopCreate], order_id: int | None = None) -> list[Stop]:
+    """Build Stop models (not yet added to a session) from request stops."""
+    return [
+        Stop(
+            order_id=order_id,
+            sequence=s.sequence,
+            stop_type=s.stop_type,
+            location_name=s.location_name,
+            address=s.address,
+            city=s.city,
+            state=s.state,
+            zip=s.zip,
+            lat=s.lat,
+            lng=s.lng,
+            scheduled_arrival_early=s.scheduled_arrival_early,
+            scheduled_arrival_late=s.scheduled_arrival_late,
+        )
+        for s in stop_inputs
+    ]
+
+
+def _run_idempotent(scope: str, key: str | None, body, handler):
+    """
+    Run `handler(claim)` at most once per Idempotency-Key.
+    Duplicates replay the stored response; if the handler fails the key is released for retries.
+    """
+    if not key:
+        return handler(None)
+    claimed = idempotency.claim(scope, key, body)
+    if isinstance(claimed, JSONResponse):
+        return claimed
+    try:
+        return handler(claimed)
+    except BaseException:
+        idempotency.release(claimed)
+        raise
+
+
 def _get_origin_destination(order: Order) -> tuple[str | None, str | None, str | None, str | None]:
     """Get origin city/state and destination city/state from first and last stop."""
     sorted_stops = sorted(order.stops, key=lambda s: s.sequence)
@@ -62,6 +164,24 @@ def _normalize(value: str | None) -> str:
     return (value or "").strip().lower()
 
 
+def _estimate_key(stops: list[StopCreate]) -> tuple:
+    """Key for a stop list covering only the fields that affect geocoding and routing."""
+    key = []
+    for s in sorted(stops, key=lambda stop: stop.sequence):
+        key.append(
+            (
+                " ".join(_normalize(s.location_name).split()),
+                " ".join(_normalize(s.address).split()),
+                " ".join(_normalize(s.city).split()),
+                _normalize(s.state),
+                _normalize(s.zip),
+                round(s.lat, 5) if s.lat is not None else None,
+                round(s.lng, 5) if s.lng is not None else None,
+            )
+        )
+    return tuple(key)
+
+
 def _normalize_equipment(value: str | None) -> str:
     return _normalize(value).replace(" ", "-")
 
@@ -92,20 +212,35 @@ def _matches_time_window_filter(scheduled_at: datetime | None, time_window: str)
 
 
 @router.post("", response_model=OrderResponse, status_code=201)
-def create_order(body: OrderCreate, db: Session = Depends(get_db)):
-    """Create order with stops in a transaction. Sets route_geometry and total_miles."""
+def create_order(
+    body: OrderCreate,
+    db: Session = Depends(get_db),
+    idempotency_key: str | None = Header(None, alias=idempotency.IDEMPOTENCY_HEADER),
+):
+    """Create order with stops in a transaction. Sets route_geometry and total_miles. Honors Idempotency-Key."""
+    return _run_idempotent("create_order", idempotency_key, body, lambda claim: _create_order(body, db, claim))
+
+
+def _create_order(body: OrderCreate, db: Session, claim: idempotency.IdempotencyClaim | None) -> OrderResponse:
     if not body.stops:
         raise HTTPException(status_code=400, detail="At least one stop is required")
 
-    # Validate customer exists
-    customer = db.query(Customer).filter(Customer.id == body.customer_id).first()
-    if not customer:
-        raise HTTPException(status_code=400, detail=f"Customer id {body.customer_id} not found")
-
     sequences = [s.sequence for s in body.stops]
     if len(sequences) != len(set(sequences)):
         raise HTTPException(status_code=400, detail="Stop sequences must be unique per order")
 
+    # Validate customer exists
+    customer = db.query(Customer.id).filter(Customer.id == body.customer_id).first()
+    if not customer:
+        raise HTTPException(status_code=400, detail=f"Customer id {body.customer_id} not found")
+    # End the read transaction so no pooled connection is held during geocoding/routing.
+    db.rollback()
+
+    stops = _build_stops(body.stops)
+    with geo_budget():
+        enrich_stops_with_coordinates(stops)
+        total_miles, distance_source = compute_route_miles(stops)
+        schedule = schedule_stops(stops)
     order = Order(
         customer_id=body.customer_id,
         trailer_type=body.trailer_type,
@@ -113,44 +248,30 @@ def create_order(body: OrderCreate, db: Session = Depends(get_db)):
         weight_lbs=body.weight_lbs,
         notes=body.notes,
         status="draft",
+        route_geometry=stops_to_linestring(stops),
+        total_miles=total_miles,
+        distance_source=distance_source,
+        at_risk=schedule.at_risk,
+        window_violations=schedule.violations,
     )
+    order.stops = stops
     db.add(order)
     db.flush()
-
-    for s in body.stops:
-        stop = Stop(
-            order_id=order.id,
-            sequence=s.sequence,
-            stop_type=s.stop_type,
-            location_name=s.location_name,
-            address=s.address,
-            city=s.city,
-            state=s.state,
-            zip=s.zip,
-            lat=s.lat,
-            lng=s.lng,
-            scheduled_arrival_early=s.scheduled_arrival_early,
-            scheduled_arrival_late=s.scheduled_arrival_late,
-        )
-        db.add(stop)
-
-    db.flush()
-
-    # Re-fetch stops and compute geometry + total_miles
-    stops_for_order = db.query(Stop).filter(Stop.order_id == order.id).order_by(Stop.sequence).all()
-    enrich_stops_with_coordinates(stops_for_order)
-    db.flush()
-    order.route_geometry = stops_to_linestring(stops_for_order)
-    order.total_miles = compute_total_miles(stops_for_order)
-    db.add(order)
-    db.commit()
     db.refresh(order)
+    response = _order_to_response(order)
+    outbox.enqueue(db, order.id, outbox.ORDER_CREATED, response.model_dump(mode="json"))
+    if claim:
+        idempotency.complete(db, claim, 201, response)
+    db.commit()
+    order_board.mark_stale()
 
-    return _order_to_response(order)
+    return response
 
 
 @router.get("", response_model=OrderListResponse)
 def list_orders(
+    request: Request,
+    response: Response,
     q: str = Query("", description="Search by order id, customer name, origin/destination city or state"),
     available_date: date | None = Query(None, description="Filter by origin scheduled arrival date"),
     time_window: str = Query("", description="morning|afternoon|evening"),
@@ -158,16 +279,47 @@ def list_orders(
     delivery: str = Query("", description="Destination city/state"),
     equipment: str = Query("", description="flatbed|reefer|dry-van"),
     shipper: str = Query("", description="all|preferred|new"),
+    at_risk: bool | None = Query(None, description="Only orders whose schedule is (true) or is not (false) at risk"),
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db),
+    read_db: Callable[[], Session] = Depends(get_lazy_read_db),
 ):
-    """List orders with search and pagination."""
+    """List orders with search and pagination. Sends an ETag; a matching If-None-Match gets a 304."""
+    params = (q, available_date, time_window, pickup, delivery, equipment, shipper, at_risk, page, page_size)
+    # "new" shippers age out with the clock, not with writes; let that filter's ETag expire each minute.
+    clock = int(time.time() // 60) if _normalize(shipper) == "new" else None
+    if ORDER_BOARD_SNAPSHOT:
+        order_board.ensure_fresh()
+        etag = make_etag("orders", PROCESS_TOKEN, order_board.version, clock, params)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
+        items, total = order_board.query(
+            q=q,
+            available_date=available_date,
+            time_window=time_window,
+            pickup=pickup,
+            delivery=delivery,
+            equipment=equipment,
+            shipper=shipper,
+            at_risk=at_risk,
+            page=page,
+            page_size=page_size,
+        )
+        return OrderListResponse(items=items, total=total, page=page, page_size=page_size)
+
+    db = read_db()
+    etag = make_etag("orders", table_validator(db, Order, Stop, Customer), clock, params)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     query = (
         db.query(Order)
         .options(joinedload(Order.customer), joinedload(Order.stops))
         .join(Customer, Order.customer_id == Customer.id)
     )
+    if at_risk is not None:
+        query = query.filter(Order.at_risk.is_(at_risk))
     if q and q.strip():
         term = f"%{q.strip()}%"
         search_filter = or_(
@@ -237,12 +389,151 @@ def list_orders(
                 total_miles=order.total_miles,
                 status=order.status,
                 created_at=order.created_at,
+                at_risk=order.at_risk,
             )
         )
 
     return OrderListResponse(items=items, total=total, page=page, page_size=page_size)
 
 
+@router.get("/facets", response_model=OrderFacetsResponse)
+def get_order_facets(
+    q: str = Query("", description="Search by order id, customer name, origin/destination city or state"),
+    available_date: date | None = Query(None, description="Filter by origin scheduled arrival date"),
+    time_window: str = Query("", description="morning|afternoon|evening"),
+    pickup: str = Query("", description="Origin city/state"),
+    delivery: str = Query("", description="Destination city/state"),
+    equipment: str = Query("", description="flatbed|reefer|dry-van"),
+    shipper: str = Query("", description="all|preferred|new"),
+    db: Session = Depends(get_read_db),
+):
+    """Counts per filter value for the board filter bar, from one aggregate query (briefly cached)."""
+    return compute_order_facets(
+        db,
+        q=q,
+        available_date=available_date,
+        time_window=time_window,
+        pickup=pickup,
+        delivery=delivery,
+        equipment=equipment,
+        shipper=shipper,
+    )
+
+
+@router.get("/map", response_model=OrderMapResponse)
+def get_order_map(
+    bbox: str = Query(..., description="Viewport as min_lng,min_lat,max_lng,max_lat"),
+    zoom: int = Query(..., ge=0, le=MAX_ZOOM),
+    equipment: str = Query("", description="flatbed|reefer|dry-van"),
+    status: str = Query("", description="Only orders in this status"),
+):
+    """Clustered origins/destinations and simplified lines for the map viewport, in one payload."""
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(part) for part in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be min_lng,min_lat,max_lng,max_lat")
+    if min_lng > max_lng or min_lat > max_lat:
+        raise HTTPException(status_code=400, detail="bbox minimums must not exceed maximums")
+    return order_map((min_lng, min_lat, max_lng, max_lat), zoom, equipment=equipment, status=status)
+
+
+@router.get("/changes", response_model=OrderChangesResponse)
+def get_order_changes(
+    response: Response,
+    since: int = Query(0, ge=0, description="next_token from the previous call; 0 for the whole retained log"),
+    limit: int = Query(500, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Orders created, updated or deleted since a token, for incremental sync. 410 if the token has expired.
+    Retry-After is set when later changes wait on a still-running transaction.
+    """
+    try:
+        changes, next_token, has_more, pinned = read_changes(db, since, limit)
+    except ChangeTokenExpired:
+        raise HTTPException(status_code=410, detail="Change token expired; resync from GET /orders")
+    if pinned:
+        response.headers["Retry-After"] = str(ORDER_CHANGES_RETRY_AFTER_SECONDS)
+    return OrderChangesResponse(
+        changes=[
+            OrderChangeItem(
+                order_id=order_id,
+                change=change,
+                order=_order_to_response(order) if order is not None else None,
+            )
+            for order_id, change, order in changes
+        ],
+        next_token=next_token,
+        has_more=has_more,
+    )
+
+
+@router.get("/stream")
+async def stream_order_events(
+    request: Request,
+    equipment: str = Query("", description="flatbed|reefer|dry-van"),
+    status: str = Query(""),
+    customer_id: int | None = Query(None),
+    pickup_state: str = Query("", description="Origin state, e.g. OH"),
+    delivery_state: str = Query("", description="Destination state"),
+):
+    """
+    Server-Sent Events of order changes (created, stops_updated, miles_computed, status_changed, updated,
+    deleted) matching the filters. A `resync` event means events may have been missed: catch up with
+    GET /orders/changes. The stream closes after a resync caused by a slow consumer; reconnect.
+    503 when this deployment does not listen for order events (ORDER_EVENTS_LISTEN=false).
+    """
+    if not ORDER_EVENTS_LISTEN:
+        raise HTTPException(status_code=503, detail="Order event stream is disabled")
+    event_filter = OrderEventFilter(
+        equipment=_normalize_equipment(equipment) or None,
+        status=_normalize(status) or None,
+        customer_id=customer_id,
+        pickup_state=pickup_state.strip().upper() or None,
+        delivery_state=delivery_state.strip().upper() or None,
+    )
+    subscriber = order_event_hub.subscribe(event_filter)
+
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout=ORDER_STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event['event']}\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+                if event is RESYNC_EVENT and subscriber.overflowed:
+                    break
+        finally:
+            order_event_hub.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/export")
+def export_orders(
+    created_from: date | None = Query(None, description="Earliest created_at date (UTC), inclusive"),
+    created_to: date | None = Query(None, description="Latest created_at date (UTC), inclusive"),
+    include_archived: bool = Query(True),
+):
+    """CSV of hot and archived orders created in the date range, streamed so large exports stay flat in memory."""
+    if created_from and created_to and created_from > created_to:
+        raise HTTPException(status_code=400, detail="created_from must not be after created_to")
+    return StreamingResponse(
+        export_orders_csv(created_from, created_to, include_archived),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="orders.csv"'},
+    )
+
+
 @router.post("/estimate-miles", response_model=OrderMilesEstimateResponse)
 def estimate_order_miles(body: OrderMilesEstimateRequest):
     """
@@ -252,50 +543,169 @@ def estimate_order_miles(body: OrderMilesEstimateRequest):
     if len(body.stops) < 2:
         return OrderMilesEstimateResponse(total_miles=None)
 
-    transient_stops: list[Stop] = []
-    for stop in body.stops:
-        transient_stops.append(
-            Stop(
-                order_id=0,
-                sequence=stop.sequence,
-                stop_type=stop.stop_type,
-                location_name=stop.location_name,
-                address=stop.address,
-                city=stop.city,
-                state=stop.state,
-                zip=stop.zip,
-                lat=stop.lat,
-                lng=stop.lng,
-                scheduled_arrival_early=stop.scheduled_arrival_early,
-                scheduled_arrival_late=stop.scheduled_arrival_late,
-            )
-        )
+    def estimate() -> tuple[float | None, str | None, bool]:
+        transient_stops = _build_stops(body.stops, order_id=0)
+        with geo_budget():
+            enrich_stops_with_coordinates(transient_stops)
+            miles, source = compute_route_miles(transient_stops)
+        return miles, source, all(s.lat is not None and s.lng is not None for s in transient_stops)
 
-    enrich_stops_with_coordinates(transient_stops)
-    miles = compute_total_miles(transient_stops)
+    # Concurrent identical estimates share one geocode/route computation.
+    miles, _, _ = _estimate_flight.do(_estimate_key(body.stops), estimate)
     return OrderMilesEstimateResponse(total_miles=miles)
 
 
+@router.post("/batch", response_model=OrderBatchResponse)
+def get_orders_batch(body: OrderBatchRequest, db: Session = Depends(get_read_db)):
+    """
+    Fetch many orders in one request; like GET /orders/{id}, ids not in the hot table are looked up in the
+    archive tier. Uses a fixed number of queries (orders, stops, customers, plus the same three for the archive
+    when some ids are not live) regardless of how many ids are asked for.
+    Optional `fields` trims each item to a subset of OrderResponse fields; unknown field names are a 400.
+    """
+    if body.fields is not None:
+        unknown = sorted(set(body.fields) - set(OrderResponse.model_fields))
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    fields = set(body.fields) if body.fields is not None else None
+
+    # Only load relationships the caller asked for; skipped ones become empty instead of lazy-loading per row.
+    options = [
+        selectinload(Order.stops) if fields is None or "stops" in fields else noload(Order.stops),
+        selectinload(Order.customer) if fields is None or "customer" in fields else noload(Order.customer),
+    ]
+
+    requested_ids = list(dict.fromkeys(body.ids))
+    orders = db.query(Order).options(*options).filter(Order.id.in_(requested_ids)).all()
+    orders_by_id = {order.id: order for order in orders}
+    not_live = [order_id for order_id in requested_ids if order_id not in orders_by_id]
+    if not_live:
+        orders_by_id.update({order.id: order for order in get_archived_orders(db, not_live)})
+
+    items = [
+        _order_to_response(orders_by_id[order_id]).model_dump(mode="json", include=fields)
+        for order_id in requested_ids
+        if order_id in orders_by_id
+    ]
+    missing_ids = [order_id for order_id in requested_ids if order_id not in orders_by_id]
+    return OrderBatchResponse(items=items, missing_ids=missing_ids)
+
+
+def _order_etag(order_id: int, version: int, customer_updated_at: datetime | None) -> str:
+    # The embedded customer card changes without bumping the order's version.
+    return make_etag("order", order_id, version, customer_updated_at)
+
+
+def _current_etag(db: Session, order_id: int) -> tuple[int, str] | None:
+    """(version, ETag) of a live order from one primary-key lookup; None if the order is not live."""
+    row = (
+        db.query(Order.version, Customer.updated_at)
+        .outerjoin(Customer, Customer.id == Order.customer_id)
+        .filter(Order.id == order_id)
+        .first()
+    )
+    return None if row is None else (row[0], _order_etag(order_id, row[0], row[1]))
+
+
+def _check_precondition(db: Session, order_id: int, expected_version: int | None, if_match_header: str | None) -> int:
+    """
+    Reject a stale edit before any geocoding or routing: 404 if the order is gone, 409 if the body's
+    version or the If-Match ETag no longer matches. Returns the version the edit is based on.
+    """
+    current = _current_etag(db, order_id)
+    if current is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    version, etag = current
+    if (expected_version is not None and expected_version != version) or not if_match(if_match_header, etag):
+        raise HTTPException(status_code=409, detail=f"Order has changed (now version {version}); reload and retry")
+    return version
+
+
+def _bump_version(db: Session, order_id: int, expected_version: int) -> None:
+    """
+    Compare-and-swap the order's version at write time. The row lock it takes makes a concurrent edit
+    wait and then fail here with 409 instead of overwriting this one.
+    """
+    bumped = db.execute(
+        update(Order)
+        .where(Order.id == order_id, Order.version == expected_version)
+        .values(version=Order.version + 1)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if bumped:
+        return
+    db.rollback()
+    if not db.query(Order.id).filter(Order.id == order_id).first():
+        raise HTTPException(status_code=404, detail="Order not found")
+    raise HTTPException(status_code=409, detail="Order was changed by another request; reload and retry")
+
+
+def _loaded_order_etag(order: Order) -> str:
+    return _order_etag(order.id, order.version, order.customer.updated_at if order.customer else None)
+
+
 @router.get("/{order_id}", response_model=OrderResponse)
-def get_order(order_id: int, db: Session = Depends(get_db)):
-    """Get single order with stops, route_geometry, and customer. 404 if not found."""
+def get_order(order_id: int, request: Request, response: Response, db: Session = Depends(get_read_db)):
+    """
+    Get single order with stops, route_geometry, and customer; falls back to the archive tier. 404 if not found.
+    Sends an ETag built from the order's version; a matching If-None-Match gets a 304 before the order is loaded.
+    """
+    current = _current_etag(db, order_id)
+    if current is not None:
+        _, etag = current
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
     order = (
         db.query(Order)
         .options(joinedload(Order.customer))
         .filter(Order.id == order_id)
         .first()
     )
+    if not order:
+        order = get_archived_order(db, order_id)
+        if order:
+            # Archived orders no longer change.
+            etag = make_etag("order", order_id, order.archived_at, order.customer.updated_at if order.customer else None)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            set_etag(response, etag)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     return _order_to_response(order)
 
 
 @router.put("/{order_id}/stops", response_model=OrderResponse)
-def update_order_stops(order_id: int, body: OrderStopsUpdate, db: Session = Depends(get_db)):
-    """Replace stops for an order. Recomputes route_geometry and total_miles. 404 if order not found; 400 if validation fails."""
-    order = db.query(Order).filter(Order.id == order_id).first()
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
+def update_order_stops(
+    order_id: int,
+    body: OrderStopsUpdate,
+    response: Response,
+    db: Session = Depends(get_db),
+    idempotency_key: str | None = Header(None, alias=idempotency.IDEMPOTENCY_HEADER),
+    if_match_header: str | None = Header(None, alias="If-Match"),
+):
+    """
+    Replace stops for an order. Recomputes route_geometry and total_miles. 404 if order not found; 400 if validation fails.
+    Send the order's `version` in the body or its ETag as If-Match: a stale edit gets a 409 before any geocoding, and
+    a concurrent edit that commits first makes this one fail with 409 rather than overwrite it. Honors Idempotency-Key.
+    """
+    return _run_idempotent(
+        f"update_order_stops:{order_id}",
+        idempotency_key,
+        body,
+        lambda claim: _update_order_stops(order_id, body, db, claim, if_match_header, response),
+    )
+
+
+def _update_order_stops(
+    order_id: int,
+    body: OrderStopsUpdate,
+    db: Session,
+    claim: idempotency.IdempotencyClaim | None,
+    if_match_header: str | None,
+    response: Response,
+) -> OrderResponse:
+    version = _check_precondition(db, order_id, body.version, if_match_header)
 
     if not body.stops:
         raise HTTPException(status_code=400, detail="At least one stop is required")
@@ -304,36 +714,139 @@ def update_order_stops(order_id: int, body: OrderStopsUpdate, db: Session = Depe
     if len(sequences) != len(set(sequences)):
         raise HTTPException(status_code=400, detail="Stop sequences must be unique per order")
 
+    # Geocode and route before writing so no pooled connection is held during external calls.
+    db.rollback()
+    stops = _build_stops(body.stops, order_id=order_id)
+    with geo_budget():
+        enrich_stops_with_coordinates(stops)
+        total_miles, distance_source = compute_route_miles(stops)
+        schedule = schedule_stops(stops)
+
+    _bump_version(db, order_id, version)
+    order = db.query(Order).filter(Order.id == order_id).first()
+
     # Delete existing stops and add new ones
     db.query(Stop).filter(Stop.order_id == order_id).delete()
     db.flush()
+    db.add_all(stops)
+    order.route_geometry = stops_to_linestring(stops)
+    order.total_miles = total_miles
+    order.distance_source = distance_source
+    order.at_risk = schedule.at_risk
+    order.window_violations = schedule.violations
+    db.flush()
+    db.refresh(order)
+    result = _order_to_response(order)
+    etag = _loaded_order_etag(order)
+    outbox.enqueue(db, order.id, outbox.ORDER_STOPS_UPDATED, result.model_dump(mode="json"))
+    if claim:
+        idempotency.complete(db, claim, 200, result, etag=etag)
+    db.commit()
+    order_board.mark_stale()
+    set_etag(response, etag)
 
-    for s in body.stops:
-        stop = Stop(
-            order_id=order_id,
-            sequence=s.sequence,
-            stop_type=s.stop_type,
-            location_name=s.location_name,
-            address=s.address,
-            city=s.city,
-            state=s.state,
-            zip=s.zip,
-            lat=s.lat,
-            lng=s.lng,
-            scheduled_arrival_early=s.scheduled_arrival_early,
-            scheduled_arrival_late=s.scheduled_arrival_late,
+    return result
+
+
+def _optimize_order_stops(
+    order_id: int, db: Session, apply: bool, if_match_header: str | None = None
+) -> OptimizeStopsResponse:
+    version = _check_precondition(db, order_id, None, if_match_header) if apply else None
+    order = db.query(Order).options(selectinload(Order.stops)).filter(Order.id == order_id).first()
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    stored = sorted(order.stops, key=lambda s: s.sequence)
+    if len(stored) > MAX_OPTIMIZE_STOPS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_OPTIMIZE_STOPS} stops can be optimized")
+    snapshots = [StopResponse.model_validate(s) for s in stored]
+    # Release the connection; geocoding and the distance matrix use transient copies.
+    db.rollback()
+
+    stops = _build_stops(snapshots, order_id=order_id)
+    with geo_budget():
+        enrich_stops_with_coordinates(stops)
+        if any(s.lat is None or s.lng is None for s in stops):
+            raise HTTPException(status_code=400, detail="Every stop needs a resolvable location to optimize")
+        points = [(s.lat, s.lng) for s in stops]
+        matrix, _ = distance_matrix_miles(points, points)
+        result = optimize_stop_order(
+            matrix, [(s.scheduled_arrival_early, s.scheduled_arrival_late) for s in stops]
         )
-        db.add(stop)
+        reordered = [stops[i] for i in result.order]
+        for position, stop in enumerate(reordered, start=1):
+            stop.sequence = position
+        total_miles, distance_source = compute_route_miles(reordered) if apply else (None, None)
+        schedule = schedule_stops(reordered)
+
+    original_miles = round(sum(matrix[i][i + 1] for i in range(len(stops) - 1)), 2) if len(stops) > 1 else None
+    optimized_miles = round(result.miles, 2) if len(stops) > 1 else None
+
+    if apply:
+        # Any write since the stops were read (including a stop edit) fails the swap with 409.
+        _bump_version(db, order_id, version)
+        order = db.query(Order).options(selectinload(Order.stops)).filter(Order.id == order_id).first()
+        by_id = {s.id: s for s in order.stops}
+        # Two passes so the (order_id, sequence) unique constraint never sees a duplicate mid-update.
+        for position, index in enumerate(result.order, start=1):
+            by_id[snapshots[index].id].sequence = -position
+        db.flush()
+        for position, index in enumerate(result.order, start=1):
+            target = by_id[snapshots[index].id]
+            target.sequence = position
+            target.lat, target.lng = stops[index].lat, stops[index].lng
+            target.eta, target.slack_minutes = stops[index].eta, stops[index].slack_minutes
+            target.leg_miles = stops[index].leg_miles
+        order.route_geometry = stops_to_linestring(reordered)
+        order.total_miles = total_miles
+        order.distance_source = distance_source
+        order.at_risk = schedule.at_risk
+        order.window_violations = schedule.violations
+        db.flush()
+        outbox.enqueue(db, order.id, outbox.ORDER_STOPS_OPTIMIZED, _order_to_response(order).model_dump(mode="json"))
+        db.commit()
+        order_board.mark_stale()
+
+    return OptimizeStopsResponse(
+        order_id=order_id,
+        applied=apply,
+        original_stop_ids=[s.id for s in snapshots],
+        optimized_stop_ids=[snapshots[i].id for i in result.order],
+        original_miles=original_miles,
+        optimized_miles=optimized_miles,
+        saved_miles=round(original_miles - optimized_miles, 2) if original_miles is not None else None,
+        window_violations=result.violations,
+        stops=[
+            snapshots[index].model_copy(
+                update={
+                    "sequence": position,
+                    "lat": stops[index].lat,
+                    "lng": stops[index].lng,
+                    "eta": stops[index].eta,
+                    "slack_minutes": stops[index].slack_minutes,
+                }
+            )
+            for position, index in enumerate(result.order, start=1)
+        ],
+    )
 
-    db.flush()
 
-    stops_for_order = db.query(Stop).filter(Stop.order_id == order_id).order_by(Stop.sequence).all()
-    enrich_stops_with_coordinates(stops_for_order)
-    db.flush()
-    order.route_geometry = stops_to_linestring(stops_for_order)
-    order.total_miles = compute_total_miles(stops_for_order)
-    db.add(order)
-    db.commit()
-    db.refresh(order)
+@router.post("/{order_id}/optimize-stops/preview", response_model=OptimizeStopsResponse)
+def preview_optimize_order_stops(order_id: int, db: Session = Depends(get_read_db)):
+    """
+    Suggest an order for intermediate stops that minimizes miles with pickup first, dropoff last
+    and scheduled arrival windows kept feasible where possible. Nothing is saved.
+    """
+    return _optimize_order_stops(order_id, db, apply=False)
 
-    return _order_to_response(order)
+
+@router.post("/{order_id}/optimize-stops", response_model=OptimizeStopsResponse)
+def optimize_order_stops(
+    order_id: int,
+    db: Session = Depends(get_db),
+    if_match_header: str | None = Header(None, alias="If-Match"),
+):
+    """
+    Reorder intermediate stops as in the preview and save the new sequence, route_geometry and total_miles.
+    409 if If-Match is stale or the order changes while optimizing.
+    """
+    return _optimize_order_stops(order_id, db, apply=True, if_match_header=if_match_header)
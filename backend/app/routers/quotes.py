@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session, selectinload
+
+from app.database import get_read_db
+from app.models import Order
+from app.schemas import QuoteBatchRequest, QuoteBatchResponse, QuoteRequest, QuoteResponse
+from app.services.lane_rates import lane_rates
+
+router = APIRouter(prefix="/quotes", tags=["quotes"])
+
+
+def _quote(body: QuoteRequest, order: Order | None) -> QuoteResponse:
+    """Quote `body`, taking lane, equipment and miles the request leaves out from the order (first/last stop)."""
+    origin_city, origin_state = body.origin_city, body.origin_state
+    destination_city, destination_state = body.destination_city, body.destination_state
+    equipment, total_miles = body.equipment, body.total_miles
+    if order is not None:
+        stops = sorted(order.stops, key=lambda s: s.sequence)
+        first = stops[0] if stops else None
+        last = stops[-1] if stops else None
+        origin_city = origin_city or (first.city if first else None)
+        origin_state = origin_state or (first.state if first else None)
+        destination_city = destination_city or (last.city if last else None)
+        destination_state = destination_state or (last.state if last else None)
+        equipment = equipment or order.trailer_type
+        total_miles = total_miles if total_miles is not None else order.total_miles
+    return lane_rates.quote(
+        origin_city,
+        origin_state,
+        destination_city,
+        destination_state,
+        equipment=equipment,
+        total_miles=total_miles,
+        order_id=body.order_id,
+    )
+
+
+def _load_orders(db: Session, order_ids: set[int]) -> dict[int, Order]:
+    if not order_ids:
+        return {}
+    orders = db.query(Order).options(selectinload(Order.stops)).filter(Order.id.in_(order_ids)).all()
+    return {order.id: order for order in orders}
+
+
+@router.post("", response_model=QuoteResponse)
+def create_quote(body: QuoteRequest, db: Session = Depends(get_read_db)):
+    """Instant price from lane-history rates (lane -> state pair -> origin state -> national) times miles."""
+    orders = _load_orders(db, {body.order_id} if body.order_id is not None else set())
+    if body.order_id is not None and body.order_id not in orders:
+        raise HTTPException(status_code=404, detail="Order not found")
+    lane_rates.ensure_fresh(db)
+    return _quote(body, orders.get(body.order_id))
+
+
+@router.post("/batch", response_model=QuoteBatchResponse)
+def create_quotes_batch(body: QuoteBatchRequest, db: Session = Depends(get_read_db)):
+    """Price many orders or candidate lanes at once; referenced orders are loaded in one query."""
+    orders = _load_orders(db, {item.order_id for item in body.items if item.order_id is not None})
+    lane_rates.ensure_fresh(db)
+    missing = sorted({item.order_id for item in body.items if item.order_id is not None and item.order_id not in orders})
+    items = [
+        _quote(item, orders.get(item.order_id))
+        for item in body.items
+        if item.order_id is None or item.order_id in orders
+    ]
+    return QuoteBatchResponse(items=items, missing_order_ids=missing)
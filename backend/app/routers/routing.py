@@ -0,0 +1,80 @@
+from fastapi import APIRouter, HTTPException
+
+from app.models import Stop
+from app.schemas import RoutePoint, RoutingMatrixRequest, RoutingMatrixResponse
+from app.services.geo_gateway import geo_budget
+from app.services.geometry import distance_matrix_miles, enrich_stops_with_coordinates
+
+router = APIRouter(prefix="/routing", tags=["routing"])
+
+# OSRM /table handles at most this many distinct coordinates per call.
+MAX_MATRIX_COORDINATES = 100
+
+
+def _resolve_points(points: list[RoutePoint]) -> list[RoutePoint]:
+    """Geocode points without coordinates (Nominatim) and return copies with lat/lng filled where possible."""
+    transient_stops = [
+        Stop(
+            order_id=0,
+            sequence=index,
+            stop_type="stop",
+            location_name=p.location_name,
+            address=p.address,
+            city=p.city,
+            state=p.state,
+            zip=p.zip,
+            lat=p.lat,
+            lng=p.lng,
+        )
+        for index, p in enumerate(points)
+    ]
+    enrich_stops_with_coordinates(transient_stops)
+    return [
+        p.model_copy(update={"lat": stop.lat, "lng": stop.lng})
+        for p, stop in zip(points, transient_stops)
+    ]
+
+
+@router.post("/matrix", response_model=RoutingMatrixResponse)
+def routing_matrix(body: RoutingMatrixRequest):
+    """
+    Driving miles for every origin/destination pair in one call.
+    Uses one OSRM /table request for uncached cells and falls back to Haversine per cell.
+    """
+    with geo_budget():
+        return _routing_matrix(body)
+
+
+def _routing_matrix(body: RoutingMatrixRequest) -> RoutingMatrixResponse:
+    # Refuse before geocoding: each unresolved point can cost a Nominatim call.
+    if len(body.origins) + len(body.destinations) > MAX_MATRIX_COORDINATES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_MATRIX_COORDINATES} origins and destinations combined per request",
+        )
+    origins = _resolve_points(body.origins)
+    destinations = _resolve_points(body.destinations)
+
+    origin_index = [i for i, p in enumerate(origins) if p.lat is not None and p.lng is not None]
+    dest_index = [j for j, p in enumerate(destinations) if p.lat is not None and p.lng is not None]
+    distinct = {(origins[i].lat, origins[i].lng) for i in origin_index}
+    distinct |= {(destinations[j].lat, destinations[j].lng) for j in dest_index}
+    if len(distinct) > MAX_MATRIX_COORDINATES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_MATRIX_COORDINATES} distinct origin/destination locations per request",
+        )
+
+    miles: list[list[float | None]] = [[None] * len(destinations) for _ in origins]
+    sources: list[list[str | None]] = [[None] * len(destinations) for _ in origins]
+    if origin_index and dest_index:
+        resolved_miles, resolved_sources = distance_matrix_miles(
+            [(origins[i].lat, origins[i].lng) for i in origin_index],
+            [(destinations[j].lat, destinations[j].lng) for j in dest_index],
+        )
+        for row, i in enumerate(origin_index):
+            for col, j in enumerate(dest_index):
+                miles[i][j] = resolved_miles[row][col]
+                sources[i][j] = resolved_sources[row][col]
+
+    return RoutingMatrixResponse(miles=miles, sources=sources, origins=origins, destinations=destinations)
@@ -1,26 +1,53 @@
 from app.schemas.customer import CustomerCard, CustomerListItem, CustomerSearchResponse
 from app.schemas.order import (
+    OptimizeStopsResponse,
+    OrderBatchRequest,
+    OrderBatchResponse,
+    OrderChangeItem,
+    OrderChangesResponse,
     OrderCreate,
+    OrderFacetsResponse,
     OrderListItem,
     OrderListResponse,
+    OrderMapCluster,
+    OrderMapLine,
+    OrderMapResponse,
     OrderMilesEstimateRequest,
     OrderMilesEstimateResponse,
     OrderResponse,
     OrderStopsUpdate,
 )
+from app.schemas.quote import QuoteBatchRequest, QuoteBatchResponse, QuoteRequest, QuoteResponse
+from app.schemas.routing import RoutePoint, RoutingMatrixRequest, RoutingMatrixResponse
 from app.schemas.stop import StopCreate, StopResponse, StopUpdate
 
 __all__ = [
     "CustomerCard",
     "CustomerListItem",
     "CustomerSearchResponse",
+    "OptimizeStopsResponse",
+    "OrderBatchRequest",
+    "OrderBatchResponse",
+    "OrderChangeItem",
+    "OrderChangesResponse",
     "OrderCreate",
+    "OrderFacetsResponse",
     "OrderListItem",
     "OrderListResponse",
+    "OrderMapCluster",
+    "OrderMapLine",
+    "OrderMapResponse",
     "OrderMilesEstimateRequest",
     "OrderMilesEstimateResponse",
     "OrderResponse",
     "OrderStopsUpdate",
+    "QuoteBatchRequest",
+    "QuoteBatchResponse",
+    "QuoteRequest",
+    "QuoteResponse",
+    "RoutePoint",
+    "RoutingMatrixRequest",
+    "RoutingMatrixResponse",
     "StopCreate",
     "StopResponse",
     "StopUpdate",
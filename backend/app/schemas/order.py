@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Any, Optional
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
 from app.schemas.stop import StopCreate, StopResponse, StopUpdate
 from app.schemas.customer import CustomerCard
@@ -26,9 +26,14 @@ class OrderResponse(BaseModel):
     status: str
     route_geometry: Optional[dict[str, Any]] = None
     total_miles: Optional[float] = None
+    distance_source: Optional[str] = None  # "osrm" (driving) or "haversine" (straight-line fallback)
+    at_risk: bool = False  # some stop's ETA leaves less than SCHEDULE_MIN_SLACK_MINUTES before its late window
+    window_violations: int = 0  # stops whose ETA is past their late window
+    version: int = 1  # send back as OrderStopsUpdate.version (or the ETag as If-Match) to edit safely
     stops: list[StopResponse]
     created_at: datetime
     customer: Optional[CustomerCard] = None  # for drawer Customer Details tab
+    archived_at: Optional[datetime] = None  # set when served from the archive tier
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -47,6 +52,7 @@ class OrderListItem(BaseModel):
     total_miles: Optional[float] = None
     status: str
     created_at: datetime
+    at_risk: bool = False
 
 
 class OrderListResponse(BaseModel):
@@ -56,8 +62,52 @@ class OrderListResponse(BaseModel):
     page_size: int
 
 
+class OrderFacetsResponse(BaseModel):
+    """Counts per filter value; each facet is counted under all the other active filters."""
+    total: int  # orders matching every filter, as GET /orders would report
+    equipment: dict[str, int]  # normalized trailer type, e.g. "dry-van"
+    shipper: dict[str, int]  # all | preferred | new
+    time_window: dict[str, int]  # morning | afternoon | evening
+    pickup_state: dict[str, int]
+    delivery_state: dict[str, int]
+
+
+class OrderChangeItem(BaseModel):
+    order_id: int
+    change: str  # created | updated | deleted | archived
+    order: Optional[OrderResponse] = None  # current state; null for deleted and archived orders
+
+
+class OrderChangesResponse(BaseModel):
+    changes: list[OrderChangeItem]
+    next_token: int  # pass as ?since= on the next call
+    has_more: bool  # more changes are ready; call again right away
+
+
+class OrderMapCluster(BaseModel):
+    kind: str  # origin | destination
+    lat: float  # centroid of the clustered points
+    lng: float
+    count: int
+    order_id: Optional[int] = None  # set when the cluster is a single order
+
+
+class OrderMapLine(BaseModel):
+    coordinates: list[list[float]]  # [[lng, lat], ...]
+    count: int  # orders drawn by this line
+    order_id: Optional[int] = None  # set for a single order's (simplified) route
+
+
+class OrderMapResponse(BaseModel):
+    zoom: int
+    clusters: list[OrderMapCluster]
+    lines: list[OrderMapLine]  # cluster-to-cluster flows below MAP_ROUTE_MIN_ZOOM, order routes at or above it
+    lines_truncated: bool  # more lines were in view than MAP_MAX_LINES; the busiest are kept
+
+
 class OrderStopsUpdate(BaseModel):
     stops: list[StopUpdate]  # optional id for existing stops
+    version: Optional[int] = None  # expected OrderResponse.version; 409 if the order has changed since
 
 
 class OrderMilesEstimateRequest(BaseModel):
@@ -66,3 +116,25 @@ class OrderMilesEstimateRequest(BaseModel):
 
 class OrderMilesEstimateResponse(BaseModel):
     total_miles: Optional[float] = None
+
+
+class OrderBatchRequest(BaseModel):
+    ids: list[int] = Field(..., min_length=1, max_length=500)
+    fields: Optional[list[str]] = None  # subset of OrderResponse fields; all when omitted
+
+
+class OrderBatchResponse(BaseModel):
+    items: list[dict[str, Any]]
+    missing_ids: list[int]
+
+
+class OptimizeStopsResponse(BaseModel):
+    order_id: int
+    applied: bool
+    original_stop_ids: list[int]
+    optimized_stop_ids: list[int]
+    original_miles: Optional[float] = None
+    optimized_miles: Optional[float] = None
+    saved_miles: Optional[float] = None
+    window_violations: int  # stops whose scheduled_arrival_late cannot be met in the optimized order
+    stops: list[StopResponse]  # in optimized order with new sequence numbers
@@ -0,0 +1,33 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class QuoteRequest(BaseModel):
+    """Price an existing order (`order_id`) or a candidate lane; explicit fields override the order's."""
+    order_id: Optional[int] = None
+    origin_city: Optional[str] = None
+    origin_state: Optional[str] = None
+    destination_city: Optional[str] = None
+    destination_state: Optional[str] = None
+    equipment: Optional[str] = None  # trailer type, e.g. "Dry Van" or "reefer"
+    total_miles: Optional[float] = Field(None, ge=0)
+
+
+class QuoteResponse(BaseModel):
+    order_id: Optional[int] = None
+    rate_per_mile: float  # after the equipment multiplier
+    total: Optional[float] = None  # rate_per_mile x total_miles; null when miles are unknown
+    total_miles: Optional[float] = None
+    basis: str  # lane | state_pair | origin_state | national | default: most specific level with enough loads
+    sample_loads: int  # loads behind the base rate
+    equipment_multiplier: float
+
+
+class QuoteBatchRequest(BaseModel):
+    items: list[QuoteRequest] = Field(..., min_length=1, max_length=1000)
+
+
+class QuoteBatchResponse(BaseModel):
+    items: list[QuoteResponse]  # same order as the request, without items whose order_id is missing
+    missing_order_ids: list[int]
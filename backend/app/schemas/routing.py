@@ -0,0 +1,26 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class RoutePoint(BaseModel):
+    """A location given by coordinates or by address parts to geocode."""
+    location_name: Optional[str] = None
+    address: Optional[str] = None
+    city: Optional[str] = None
+    state: Optional[str] = None
+    zip: Optional[str] = None
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+
+
+class RoutingMatrixRequest(BaseModel):
+    origins: list[RoutePoint] = Field(..., min_length=1, max_length=100)
+    destinations: list[RoutePoint] = Field(..., min_length=1, max_length=100)
+
+
+class RoutingMatrixResponse(BaseModel):
+    miles: list[list[Optional[float]]]  # miles[i][j]: origin i -> destination j; null if either point is unresolved
+    sources: list[list[Optional[str]]]  # "osrm" | "haversine" per cell
+    origins: list[RoutePoint]  # with resolved lat/lng
+    destinations: list[RoutePoint]
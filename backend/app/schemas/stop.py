@@ -36,5 +36,7 @@ class StopResponse(BaseModel):
     scheduled_arrival_early: Optional[datetime] = None
     scheduled_arrival_late: Optional[datetime] = None
     sequence: int
+    eta: Optional[datetime] = None  # estimated arrival from route miles, speed and dwell
+    slack_minutes: Optional[float] = None  # minutes from eta to scheduled_arrival_late; negative = window missed
 
     model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,103 @@
+"""
+Small in-process caches shared by services.
+
+- TTLCache: thread-safe LRU with per-entry expiry.
+- SingleFlight: concurrent calls with the same key share one computation; results are kept in a TTLCache.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Least-recently-used cache whose entries expire `ttl_seconds` after being set."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SingleFlight:
+    """
+    Run `fn` once per key among concurrent callers and reuse the result for a while.
+    Exceptions are shared with callers already waiting but never cached; results rejected by `cacheable` are not kept.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries: int = 1024,
+        cacheable: Callable[[Any], bool] = lambda value: True,
+    ):
+        self.results = TTLCache(ttl_seconds, max_entries)
+        self.cacheable = cacheable
+        self._lock = threading.Lock()
+        self._inflight: dict[Hashable, Future] = {}
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        cached = self.results.get(key, _MISSING)
+        if cached is not _MISSING:
+            self.hits += 1
+            return cached
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = fn()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            if self.cacheable(value):
+                self.results.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
@@ -0,0 +1,215 @@
+"""
+In-memory prefix index over customer names and MC numbers for typeahead lookups.
+
+- Loaded once per worker, then kept current from `updated_at` deltas read from the primary.
+- Lookups bisect a sorted token list, so no SQL runs per keystroke.
+"""
+import bisect
+import heapq
+import re
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from app.config import CUSTOMER_INDEX_REFRESH_SECONDS
+from app.database import SessionLocal, delta_watermark
+from app.models.customer import Customer
+from app.schemas.customer import CustomerListItem
+
+# Rank tiers: lower is better.
+_RANK_NAME_PREFIX = 0
+_RANK_WORD_PREFIX = 1
+_RANK_MC_PREFIX = 2
+
+# Distinct (query, limit) results remembered between index changes; short prefixes repeat across users.
+_RESULT_CACHE_SIZE = 4096
+
+_WORD_SPLIT = re.compile(r"[^0-9a-z]+")
+
+
+def _normalize(value: str | None) -> str:
+    return " ".join((value or "").lower().split())
+
+
+def _name_tokens(name: str) -> list[str]:
+    return [token for token in _WORD_SPLIT.split(_normalize(name)) if token]
+
+
+def _mc_tokens(mc_number: str | None) -> list[str]:
+    normalized = _normalize(mc_number)
+    if not normalized:
+        return []
+    compact = _WORD_SPLIT.sub("", normalized)
+    digits = re.sub(r"\D", "", normalized)
+    tokens: list[str] = []
+    for candidate in [normalized, compact, digits]:
+        if candidate and candidate not in tokens:
+            tokens.append(candidate)
+    return tokens
+
+
+class CustomerPrefixIndex:
+    """Sorted (token, customer_id) pairs plus the list-item payload per customer."""
+
+    def __init__(self, refresh_seconds: float = CUSTOMER_INDEX_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._entries: list[tuple[str, int]] = []
+        self._tokens_by_id: dict[int, list[tuple[str, int]]] = {}
+        self._items: dict[int, CustomerListItem] = {}
+        self._sort_keys: dict[int, tuple[str, int]] = {}
+        self._results: dict[tuple[str, int], list[CustomerListItem]] = {}
+        self._watermark: datetime | None = None
+        self._checked_at: float | None = None
+        # Bumped whenever indexed customers change, so responses can be validated with an ETag.
+        self.version = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._checked_at is not None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def load(self, db: Session) -> None:
+        """Rebuild the whole index from the customers table."""
+        watermark = delta_watermark(db)
+        customers = db.query(Customer).all()
+        with self._lock:
+            self._entries = []
+            self._tokens_by_id = {}
+            self._items = {}
+            self._sort_keys = {}
+            self._results = {}
+            self._watermark = watermark
+            for customer in customers:
+                self._add(customer)
+            self._entries.sort()
+            self._checked_at = time.monotonic()
+            self.version += 1
+
+    def refresh(self, db: Session) -> int:
+        """Apply customers changed since the last load/refresh. Returns how many rows were re-indexed."""
+        watermark = delta_watermark(db)
+        changed = db.query(Customer).filter(Customer.updated_at >= self._watermark).all()
+        with self._lock:
+            for customer in changed:
+                self._remove(customer.id)
+                self._add(customer, keep_sorted=True)
+            if changed:
+                self._results.clear()
+                self.version += 1
+            self._watermark = watermark
+            self._checked_at = time.monotonic()
+        return len(changed)
+
+    def ensure_fresh(self, db: Session | None = None) -> None:
+        """
+        Load on first use, then pull deltas at most once per refresh interval.
+        `db` must be on the primary (see delta_watermark); by default a primary session is opened when needed.
+        """
+        if self.loaded and time.monotonic() - self._checked_at < self.refresh_seconds:
+            return
+        primary = db or SessionLocal()
+        try:
+            if not self.loaded:
+                self.load(primary)
+            else:
+                self.refresh(primary)
+        finally:
+            if db is None:
+                primary.close()
+
+    def upsert(self, customer: Customer) -> None:
+        """Index a customer immediately (for write paths in this worker)."""
+        with self._lock:
+            self._remove(customer.id)
+            self._add(customer, keep_sorted=True)
+            self._results.clear()
+            self.version += 1
+
+    def search(self, query: str, limit: int = 20) -> list[CustomerListItem]:
+        """
+        Return up to `limit` customers whose name words or MC number start with the query.
+        Every query word must prefix-match; full-name prefix matches rank first, then word, then MC matches.
+        """
+        normalized = _normalize(query)
+        cache_key = (normalized, limit)
+        with self._lock:
+            cached = self._results.get(cache_key)
+            if cached is not None:
+                return cached
+            if normalized:
+                result = self._search_locked(normalized, limit)
+            else:
+                ordered = heapq.nsmallest(limit, self._sort_keys.values())
+                result = [self._items[customer_id] for _, customer_id in ordered]
+            if len(self._results) >= _RESULT_CACHE_SIZE:
+                self._results.clear()
+            self._results[cache_key] = result
+            return result
+
+    def _search_locked(self, normalized: str, limit: int) -> list[CustomerListItem]:
+        query_tokens = [token for token in _WORD_SPLIT.split(normalized) if token] or [normalized]
+        # Scan the most selective query word (fewest index entries), then verify the rest per candidate.
+        lead = min(query_tokens, key=self._count)
+        others = [token for token in query_tokens if token != lead]
+        candidates = self._scan(lead)
+        # "MC-12" splits into words; its compact form matches MC tokens directly.
+        compact = "".join(query_tokens)
+        compact_matches = self._scan(compact) if others else set()
+
+        ranked: list[tuple[int, str, int]] = []
+        for customer_id in candidates | compact_matches:
+            tokens = self._tokens_by_id[customer_id]
+            if customer_id not in compact_matches and others:
+                if not all(any(token.startswith(q) for token, _ in tokens) for q in others):
+                    continue
+            name_key = self._sort_keys[customer_id][0]
+            if name_key.startswith(normalized):
+                rank = _RANK_NAME_PREFIX
+            elif any(kind == _RANK_WORD_PREFIX and token.startswith(lead) for token, kind in tokens):
+                rank = _RANK_WORD_PREFIX
+            else:
+                rank = _RANK_MC_PREFIX
+            ranked.append((rank, name_key, customer_id))
+
+        return [self._items[customer_id] for _, _, customer_id in heapq.nsmallest(limit, ranked)]
+
+    def _range(self, prefix: str) -> tuple[int, int]:
+        lo = bisect.bisect_left(self._entries, (prefix, -1))
+        hi = bisect.bisect_left(self._entries, (prefix + "\U0010ffff", -1), lo)
+        return lo, hi
+
+    def _count(self, prefix: str) -> int:
+        lo, hi = self._range(prefix)
+        return hi - lo
+
+    def _scan(self, prefix: str) -> set[int]:
+        lo, hi = self._range(prefix)
+        return {customer_id for _, customer_id in self._entries[lo:hi]}
+
+    def _add(self, customer: Customer, keep_sorted: bool = False) -> None:
+        tokens = [(token, _RANK_WORD_PREFIX) for token in _name_tokens(customer.name)]
+        tokens += [(token, _RANK_MC_PREFIX) for token in _mc_tokens(customer.mc_number)]
+        self._tokens_by_id[customer.id] = tokens
+        self._items[customer.id] = CustomerListItem.model_validate(customer)
+        self._sort_keys[customer.id] = (_normalize(customer.name), customer.id)
+        for token, _ in tokens:
+            if keep_sorted:
+                bisect.insort(self._entries, (token, customer.id))
+            else:
+                self._entries.append((token, customer.id))
+
+    def _remove(self, customer_id: int) -> None:
+        for token, _ in self._tokens_by_id.pop(customer_id, []):
+            position = bisect.bisect_left(self._entries, (token, customer_id))
+            if position < len(self._entries) and self._entries[position] == (token, customer_id):
+                del self._entries[position]
+        self._items.pop(customer_id, None)
+        self._sort_keys.pop(customer_id, None)
+
+
+customer_index = CustomerPrefixIndex()
@@ -0,0 +1,256 @@
+"""
+Shared outbound HTTP gateway for geocoding (Nominatim) and routing (OSRM).
+
+- One pooled keep-alive httpx.Client per process.
+- Per-request latency budget (`geo_budget`) caps total time spent across all geo calls.
+- Retries with jittered exponential backoff on transport errors, 429 and 5xx.
+- Per-upstream circuit breaker: after repeated failures calls are skipped so callers fall back immediately.
+- Per-upstream latency and failure counters for /health/upstreams.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+import httpx
+
+from app.config import (
+    GEO_BREAKER_FAILURES,
+    GEO_BREAKER_RESET_SECONDS,
+    GEO_HTTP_TIMEOUT_SECONDS,
+    GEO_MAX_CONNECTIONS,
+    GEO_MAX_RETRIES,
+    GEO_REQUEST_BUDGET_SECONDS,
+    GEO_RETRY_BACKOFF_SECONDS,
+)
+
+# Monotonic deadline for the geo work of the current request, if a budget is active.
+_deadline: ContextVar[float | None] = ContextVar("geo_deadline", default=None)
+
+# Below this much remaining budget a call is not worth starting.
+_MIN_ATTEMPT_SECONDS = 0.05
+
+
+@contextmanager
+def geo_budget(seconds: float = GEO_REQUEST_BUDGET_SECONDS) -> Iterator[None]:
+    """Limit the total time spent on geo calls inside the block. Nested budgets keep the outer deadline."""
+    if _deadline.get() is not None:
+        yield
+        return
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def _remaining_budget() -> float | None:
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` consecutive failures; half-open (one trial call) after `reset_seconds`."""
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._consecutive_failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._consecutive_failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._trial_in_flight or self._consecutive_failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class UpstreamStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.short_circuited = 0
+        self.budget_exhausted = 0
+        self.total_latency_seconds = 0.0
+        self.max_latency_seconds = 0.0
+        self.last_error: str | None = None
+
+    def record_attempt(self, latency: float, ok: bool, error: str | None = None) -> None:
+        with self._lock:
+            self.requests += 1
+            self.total_latency_seconds += latency
+            self.max_latency_seconds = max(self.max_latency_seconds, latency)
+            if ok:
+                self.successes += 1
+            else:
+                self.failures += 1
+                self.last_error = error
+
+    def increment(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "successes": self.successes,
+                "failures": self.failures,
+                "retries": self.retries,
+                "short_circuited": self.short_circuited,
+                "budget_exhausted": self.budget_exhausted,
+                "avg_latency_ms": round(self.total_latency_seconds / self.requests * 1000, 1) if self.requests else 0.0,
+                "max_latency_ms": round(self.max_latency_seconds * 1000, 1),
+                "last_error": self.last_error,
+            }
+
+
+class GeoGateway:
+    def __init__(self):
+        self._client = httpx.Client(
+            timeout=GEO_HTTP_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=GEO_MAX_CONNECTIONS, max_keepalive_connections=GEO_MAX_CONNECTIONS),
+        )
+        self._lock = threading.Lock()
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._stats: dict[str, UpstreamStats] = {}
+
+    def _upstream(self, name: str) -> tuple[CircuitBreaker, UpstreamStats]:
+        with self._lock:
+            if name not in self._breakers:
+                self._breakers[name] = CircuitBreaker(GEO_BREAKER_FAILURES, GEO_BREAKER_RESET_SECONDS)
+                self._stats[name] = UpstreamStats()
+            return self._breakers[name], self._stats[name]
+
+    def get_json(
+        self,
+        upstream: str,
+        url: str,
+        params: dict[str, Any] | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> Any | None:
+        """
+        GET `url` and return its JSON body, or None when the upstream is unavailable.
+        Client errors (4xx other than 429) return None without counting against the circuit.
+        """
+        breaker, stats = self._upstream(upstream)
+        if not breaker.allow():
+            stats.increment("short_circuited")
+            return None
+
+        settled = False
+        try:
+            payload = self._attempt(breaker, stats, url, params, headers)
+            settled = True
+            return payload
+        finally:
+            if not settled:
+                # Unexpected error: never leave a half-open trial claimed, or the circuit stays open for good.
+                breaker.record_failure()
+
+    def _attempt(
+        self,
+        breaker: CircuitBreaker,
+        stats: UpstreamStats,
+        url: str,
+        params: dict[str, Any] | None,
+        headers: dict[str, str] | None,
+    ) -> Any | None:
+        """Try (and retry) one call, telling the breaker how it went before returning."""
+        for attempt in range(GEO_MAX_RETRIES + 1):
+            remaining = _remaining_budget()
+            if remaining is not None and remaining < _MIN_ATTEMPT_SECONDS:
+                stats.increment("budget_exhausted")
+                if attempt > 0:
+                    break
+                # Not the upstream's fault; give back a half-open trial without judging it.
+                breaker.release_trial()
+                return None
+            timeout = GEO_HTTP_TIMEOUT_SECONDS if remaining is None else min(GEO_HTTP_TIMEOUT_SECONDS, remaining)
+
+            started = time.perf_counter()
+            error: str | None = None
+            retryable = True
+            try:
+                response = self._client.get(url, params=params, headers=headers, timeout=timeout)
+                if response.status_code == 429 or response.status_code >= 500:
+                    error = f"HTTP {response.status_code}"
+                elif response.status_code >= 400:
+                    stats.record_attempt(time.perf_counter() - started, ok=True)
+                    breaker.record_success()
+                    return None
+                else:
+                    payload = response.json()
+                    stats.record_attempt(time.perf_counter() - started, ok=True)
+                    breaker.record_success()
+                    return payload
+            except httpx.TransportError as exc:
+                error = f"{type(exc).__name__}: {exc}"
+            except httpx.HTTPError as exc:
+                # Undecodable bodies, redirect loops: not going to improve on retry.
+                error = f"{type(exc).__name__}: {exc}"
+                retryable = False
+            except ValueError as exc:
+                # Malformed JSON from a 2xx is not going to improve on retry.
+                error = f"invalid JSON: {exc}"
+                retryable = False
+
+            stats.record_attempt(time.perf_counter() - started, ok=False, error=error)
+            if not retryable or attempt == GEO_MAX_RETRIES:
+                break
+            backoff = random.uniform(0, GEO_RETRY_BACKOFF_SECONDS * (2 ** attempt))
+            remaining = _remaining_budget()
+            if remaining is not None and backoff >= remaining:
+                break
+            stats.increment("retries")
+            time.sleep(backoff)
+
+        breaker.record_failure()
+        return None
+
+    def status(self) -> dict[str, Any]:
+        with self._lock:
+            names = list(self._stats)
+        return {
+            name: {"circuit": self._breakers[name].state, **self._stats[name].snapshot()}
+            for name in names
+        }
+
+
+geo_gateway = GeoGateway()
@@ -3,17 +3,24 @@ Geometry utilities for stop geocoding and route computation.
 
 - Geocode missing coordinates using Nominatim.
 - Compute driving miles using OSRM (fallback to Haversine).
+- Compute origin x destination miles matrices using OSRM /table (fallback to Haversine).
+
+All outbound calls go through the shared geo gateway (pooled client, budget, retries, circuit breaker).
 """
 import math
 from typing import Any, Iterable
 
-import httpx
-
+from app.config import NOMINATIM_SEARCH_URL, OSRM_BASE_URL, ROUTE_MATRIX_CACHE_SECONDS, ROUTE_MATRIX_CACHE_SIZE
 from app.models.stop import Stop
+from app.services.cache import TTLCache
+from app.services.geo_gateway import geo_gateway
 
-NOMINATIM_SEARCH_URL = "https://nominatim.openstreetmap.org/search"
-OSRM_ROUTE_URL = "http://router.project-osrm.org/route/v1/driving"
-HTTP_TIMEOUT_SECONDS = 10.0
+OSRM_ROUTE_URL = f"{OSRM_BASE_URL}/route/v1/driving"
+OSRM_TABLE_URL = f"{OSRM_BASE_URL}/table/v1/driving"
+METERS_TO_MILES = 0.000621371
+DISTANCE_SOURCE_OSRM = "osrm"
+DISTANCE_SOURCE_HAVERSINE = "haversine"
+EARTH_RADIUS_MILES = 3958.8
 NOMINATIM_HEADERS = {
     "User-Agent": "freight-marketplace/1.0 (dispatch@local)",
 }
@@ -21,7 +28,7 @@ NOMINATIM_HEADERS = {
 
 def haversine_miles(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
     """Compute distance in miles between two points using Haversine formula."""
-    R = 3958.8  # Earth radius in miles
+    R = EARTH_RADIUS_MILES
     phi1 = math.radians(lat1)
     phi2 = math.radians(lat2)
     dphi = math.radians(lat2 - lat1)
@@ -60,19 +67,14 @@ def _build_geocode_queries(stop: Stop) -> list[str]:
     return queries
 
 
-def _geocode_query(query: str, client: httpx.Client) -> tuple[float, float] | None:
-    try:
-        response = client.get(
-            NOMINATIM_SEARCH_URL,
-            params={"q": query, "format": "json", "limit": 1},
-            headers=NOMINATIM_HEADERS,
-        )
-        response.raise_for_status()
-        items = response.json()
-    except Exception:
-        return None
-
-    if not items:
+def _geocode_query(query: str) -> tuple[float, float] | None:
+    items = geo_gateway.get_json(
+        "nominatim",
+        NOMINATIM_SEARCH_URL,
+        params={"q": query, "format": "json", "limit": 1},
+        headers=NOMINATIM_HEADERS,
+    )
+    if not isinstance(items, list) or not items:
         return None
 
     first = items[0]
@@ -95,31 +97,19 @@ def enrich_stops_with_coordinates(stops: Iterable[Stop]) -> None:
     if not missing:
         return
 
-    try:
-        with httpx.Client(timeout=HTTP_TIMEOUT_SECONDS) as client:
-            for stop in missing:
-                for query in _build_geocode_queries(stop):
-                    coordinates = _geocode_query(query, client)
-                    if coordinates is None:
-                        continue
-                    stop.lat, stop.lng = coordinates
-                    break
-    except Exception:
-        # If external geocoding fails, keep existing values and continue.
-        return
+    for stop in missing:
+        for query in _build_geocode_queries(stop):
+            coordinates = _geocode_query(query)
+            if coordinates is None:
+                continue
+            stop.lat, stop.lng = coordinates
+            break
 
 
-def _osrm_route_miles(stops: list[Stop], client: httpx.Client) -> float | None:
+def _osrm_route_miles(stops: list[Stop]) -> float | None:
     coordinate_pairs = ";".join(f"{stop.lng},{stop.lat}" for stop in stops)
-    route_url = f"{OSRM_ROUTE_URL}/{coordinate_pairs}"
-    try:
-        response = client.get(route_url, params={"overview": "false"})
-        response.raise_for_status()
-        payload = response.json()
-    except Exception:
-        return None
-
-    if payload.get("code") != "Ok":
+    payload = geo_gateway.get_json("osrm", f"{OSRM_ROUTE_URL}/{coordinate_pairs}", params={"overview": "false"})
+    if not isinstance(payload, dict) or payload.get("code") != "Ok":
         return None
     routes = payload.get("routes")
     if not isinstance(routes, list) or not routes:
@@ -129,27 +119,24 @@ def _osrm_route_miles(stops: list[Stop], client: httpx.Client) -> float | None:
     if not isinstance(distance_meters, (int, float)):
         return None
 
-    return float(distance_meters) * 0.000621371
+    return float(distance_meters) * METERS_TO_MILES
 
 
-def compute_total_miles(stops: list[Stop]) -> float | None:
+def compute_route_miles(stops: list[Stop]) -> tuple[float | None, str | None]:
     """
-    Compute total route miles from stops ordered by sequence.
+    Compute total route miles from stops ordered by sequence, and which source produced them.
 
-    Prefers OSRM driving distance and falls back to Haversine when unavailable.
+    Returns (miles, "osrm") for driving distance, (miles, "haversine") when OSRM is unavailable,
+    and (None, None) with fewer than two located stops.
     """
     sorted_stops = sorted(stops, key=lambda s: s.sequence)
     valid = [s for s in sorted_stops if s.lat is not None and s.lng is not None]
     if len(valid) < 2:
-        return None
+        return None, None
 
-    try:
-        with httpx.Client(timeout=HTTP_TIMEOUT_SECONDS) as client:
-            osrm_miles = _osrm_route_miles(valid, client)
-        if osrm_miles is not None:
-            return round(osrm_miles, 2)
-    except Exception:
-        pass
+    osrm_miles = _osrm_route_miles(valid)
+    if osrm_miles is not None:
+        return round(osrm_miles, 2), DISTANCE_SOURCE_OSRM
 
     total = 0.0
     for i in range(len(valid) - 1):
@@ -157,4 +144,122 @@ def compute_total_miles(stops: list[Stop]) -> float | None:
             valid[i].lat, valid[i].lng,
             valid[i + 1].lat, valid[i + 1].lng,
         )
-    return round(total, 2)
+    return round(total, 2), DISTANCE_SOURCE_HAVERSINE
+
+
+def compute_total_miles(stops: list[Stop]) -> float | None:
+    """
+    Compute total route miles from stops ordered by sequence.
+
+    Prefers OSRM driving distance and falls back to Haversine when unavailable.
+    """
+    return compute_route_miles(stops)[0]
+
+
+Point = tuple[float, float]  # (lat, lng)
+
+# OSRM matrix cells keyed by rounded (origin, destination) coordinates.
+_matrix_cell_cache = TTLCache(ROUTE_MATRIX_CACHE_SECONDS, ROUTE_MATRIX_CACHE_SIZE)
+
+
+def _cell_key(origin: Point, destination: Point) -> tuple[float, float, float, float]:
+    return (round(origin[0], 5), round(origin[1], 5), round(destination[0], 5), round(destination[1], 5))
+
+
+def haversine_matrix_miles(origins: list[Point], destinations: list[Point]) -> list[list[float]]:
+    """Great-circle miles for every origin/destination pair; trig terms are computed once per point."""
+    dest_terms = [(math.radians(lat), math.radians(lng), math.cos(math.radians(lat))) for lat, lng in destinations]
+    matrix: list[list[float]] = []
+    for lat, lng in origins:
+        phi1, lam1 = math.radians(lat), math.radians(lng)
+        cos_phi1 = math.cos(phi1)
+        row = []
+        for phi2, lam2, cos_phi2 in dest_terms:
+            a = math.sin((phi2 - phi1) / 2) ** 2 + cos_phi1 * cos_phi2 * math.sin((lam2 - lam1) / 2) ** 2
+            row.append(2 * EARTH_RADIUS_MILES * math.asin(min(1.0, math.sqrt(a))))
+        matrix.append(row)
+    return matrix
+
+
+def _osrm_table_miles(origins: list[Point], destinations: list[Point]) -> list[list[float | None]] | None:
+    """One /table call; each distinct point is sent once, so the coordinate count matches what callers validate."""
+    coordinates = list(dict.fromkeys(origins + destinations))
+    position = {point: index for index, point in enumerate(coordinates)}
+    source_points = list(dict.fromkeys(origins))
+    destination_points = list(dict.fromkeys(destinations))
+    coordinate_pairs = ";".join(f"{lng},{lat}" for lat, lng in coordinates)
+    params = {
+        "sources": ";".join(str(position[point]) for point in source_points),
+        "destinations": ";".join(str(position[point]) for point in destination_points),
+        "annotations": "distance",
+    }
+    payload = geo_gateway.get_json("osrm", f"{OSRM_TABLE_URL}/{coordinate_pairs}", params=params)
+    if not isinstance(payload, dict) or payload.get("code") != "Ok":
+        return None
+    distances = payload.get("distances")
+    if not isinstance(distances, list) or len(distances) != len(source_points):
+        return None
+
+    rows: dict[Point, list[float | None]] = {}
+    for point, row in zip(source_points, distances):
+        if not isinstance(row, list) or len(row) != len(destination_points):
+            return None
+        cells = {
+            destination: float(d) * METERS_TO_MILES if isinstance(d, (int, float)) else None
+            for destination, d in zip(destination_points, row)
+        }
+        rows[point] = [cells[destination] for destination in destinations]
+    return [rows[origin] for origin in origins]
+
+
+def distance_matrix_miles(
+    origins: list[Point], destinations: list[Point]
+) -> tuple[list[list[float]], list[list[str]]]:
+    """
+    Miles for every origin/destination pair, plus the source of each cell ("osrm" or "haversine").
+
+    Cached cells are reused; the rest are fetched with one OSRM /table call over the rows and
+    columns that still have gaps. Cells OSRM cannot answer fall back to Haversine and are not cached.
+    """
+    miles: list[list[float | None]] = [
+        [_matrix_cell_cache.get(_cell_key(o, d)) for d in destinations] for o in origins
+    ]
+    sources = [["osrm" if cell is not None else "haversine" for cell in row] for row in miles]
+
+    missing_rows = [i for i, row in enumerate(miles) if any(cell is None for cell in row)]
+    missing_cols = sorted({j for i in missing_rows for j, cell in enumerate(miles[i]) if cell is None})
+    if missing_rows:
+        table = _osrm_table_miles([origins[i] for i in missing_rows], [destinations[j] for j in missing_cols])
+        if table is not None:
+            for row_index, i in enumerate(missing_rows):
+                for col_index, j in enumerate(missing_cols):
+                    value = table[row_index][col_index]
+                    if value is None or miles[i][j] is not None:
+                        continue
+                    miles[i][j] = round(value, 2)
+                    sources[i][j] = "osrm"
+                    _matrix_cell_cache.set(_cell_key(origins[i], destinations[j]), miles[i][j])
+
+    gaps = [(i, j) for i, row in enumerate(miles) for j, cell in enumerate(row) if cell is None]
+    if gaps:
+        fallback = haversine_matrix_miles(origins, destinations)
+        for i, j in gaps:
+            miles[i][j] = round(fallback[i][j], 2)
+    return miles, sources
+
+
+def leg_miles(points: list[Point], fetch_missing: bool = True) -> list[float]:
+    """
+    Miles for each consecutive leg of `points`. Cached OSRM cells are used first; the rest come from
+    one OSRM /table call when `fetch_missing`, otherwise (and on failure) from Haversine.
+    """
+    if len(points) < 2:
+        return []
+    if fetch_missing:
+        matrix, _ = distance_matrix_miles(points[:-1], points[1:])
+        return [matrix[i][i] for i in range(len(points) - 1)]
+    legs = []
+    for origin, destination in zip(points, points[1:]):
+        cached = _matrix_cell_cache.get(_cell_key(origin, destination))
+        legs.append(cached if cached is not None else round(haversine_miles(*origin, *destination), 2))
+    return legs
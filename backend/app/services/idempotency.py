@@ -0,0 +1,164 @@
+"""
+Idempotency-Key handling for expensive order writes.
+
+- `claim` records the key in its own committed transaction so concurrent duplicates see it at once.
+- The handler calls `complete` in the same transaction as its order write, so the stored response
+  and the order commit together.
+- Duplicates wait for the first request and replay its response (and ETag); failed requests release the key.
+- A request that outlives its claim (a retry may have taken the key over) fails `complete` with 409,
+  so its write rolls back instead of committing beside the retry's.
+"""
+import hashlib
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.config import IDEMPOTENCY_LOCK_SECONDS, IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_WAIT_SECONDS
+from app.database import SessionLocal
+from app.models.idempotency_key import IdempotencyKey
+from app.services.http_cache import set_etag
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+_POLL_SECONDS = 0.1
+# Expired rows are purged opportunistically on roughly this share of claims.
+_PURGE_PROBABILITY = 0.01
+
+
+class IdempotencyClaim:
+    def __init__(self, claim_id: int):
+        self.id = claim_id
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _request_hash(body: BaseModel) -> str:
+    return hashlib.sha256(body.model_dump_json().encode()).hexdigest()
+
+
+def _replay(row) -> JSONResponse:
+    response = JSONResponse(
+        status_code=row.response_status,
+        content=row.response_body,
+        headers={"Idempotent-Replayed": "true"},
+    )
+    if row.response_etag:
+        set_etag(response, row.response_etag)
+    return response
+
+
+def claim(scope: str, key: str, body: BaseModel) -> IdempotencyClaim | JSONResponse:
+    """
+    Take ownership of (scope, key), or return the stored response of the request that already owns it.
+    Raises 422 if the key was used with a different body and 409 if the owner is still running after the wait.
+    """
+    request_hash = _request_hash(body)
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+    db = SessionLocal()
+    try:
+        if random.random() < _PURGE_PROBABILITY:
+            db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < _now()))
+            db.commit()
+        while True:
+            claim_id = db.execute(
+                insert(IdempotencyKey)
+                .values(
+                    scope=scope,
+                    key=key,
+                    request_hash=request_hash,
+                    status="in_progress",
+                    expires_at=_now() + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS),
+                )
+                .on_conflict_do_nothing(constraint="uq_idempotency_keys_scope_key")
+                .returning(IdempotencyKey.id)
+            ).scalar()
+            db.commit()
+            if claim_id is not None:
+                return IdempotencyClaim(claim_id)
+
+            row = (
+                db.query(
+                    IdempotencyKey.id,
+                    IdempotencyKey.request_hash,
+                    IdempotencyKey.status,
+                    IdempotencyKey.response_status,
+                    IdempotencyKey.response_body,
+                    IdempotencyKey.response_etag,
+                    IdempotencyKey.expires_at,
+                )
+                .filter(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+                .first()
+            )
+            db.rollback()
+            if row is None:
+                continue  # released between our insert and select; try again
+            if row.expires_at <= _now():
+                # Abandoned claim or expired response: remove it and claim afresh.
+                db.execute(
+                    delete(IdempotencyKey).where(
+                        IdempotencyKey.id == row.id, IdempotencyKey.expires_at <= _now()
+                    )
+                )
+                db.commit()
+                continue
+            if row.request_hash != request_hash:
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"{IDEMPOTENCY_HEADER} was already used with a different request body",
+                )
+            if row.status == "completed":
+                return _replay(row)
+            if time.monotonic() >= deadline:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"A request with this {IDEMPOTENCY_HEADER} is still in progress; retry later",
+                )
+            time.sleep(_POLL_SECONDS)
+    finally:
+        db.close()
+
+
+def complete(
+    db: Session, claim: IdempotencyClaim, status_code: int, response: BaseModel, etag: str | None = None
+) -> None:
+    """
+    Record the response in the caller's transaction; it becomes visible when the order write commits.
+    Raises 409 if the claim is gone: it expired, and a retry may already have taken the key over.
+    """
+    result = db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.id == claim.id, IdempotencyKey.status == "in_progress")
+        .values(
+            status="completed",
+            response_status=status_code,
+            response_body=response.model_dump(mode="json"),
+            response_etag=etag,
+            expires_at=_now() + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+        )
+    )
+    if result.rowcount == 0:
+        raise HTTPException(
+            status_code=409,
+            detail=f"This request outlived its {IDEMPOTENCY_HEADER} claim; retry to replay or rerun it",
+        )
+
+
+def release(claim: IdempotencyClaim) -> None:
+    """Forget a claim whose request failed so a retry can run it again."""
+    db = SessionLocal()
+    try:
+        db.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.id == claim.id, IdempotencyKey.status == "in_progress")
+        )
+        db.commit()
+    finally:
+        db.close()
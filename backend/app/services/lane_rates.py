@@ -0,0 +1,160 @@
+"""
+Rate quotes from lane history, answered from in-memory lookup tables.
+
+- One GROUPING SETS query over lane_history builds load-weighted average rates per lane
+  (origin city/state -> destination city/state), per state pair, per origin state and nationally.
+- A quote uses the most specific level backed by at least QUOTE_MIN_LOADS loads and falls back to
+  more general ones, then to QUOTE_DEFAULT_RATE_PER_MILE.
+- Tables are rebuilt at most every QUOTE_TABLE_REFRESH_SECONDS and swapped in whole, so a quote is
+  a few dict lookups and never waits on SQL between rebuilds.
+- Lane history is not split by equipment; a per-equipment multiplier is applied on top.
+"""
+import threading
+import time
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.config import (
+    QUOTE_DEFAULT_RATE_PER_MILE,
+    QUOTE_EQUIPMENT_MULTIPLIERS,
+    QUOTE_MIN_LOADS,
+    QUOTE_TABLE_REFRESH_SECONDS,
+)
+from app.models import LaneHistory
+from app.schemas.quote import QuoteResponse
+
+# Most specific first.
+LEVELS = ("lane", "state_pair", "origin_state", "national")
+
+
+def _city(value: str | None) -> str | None:
+    return (value or "").strip().lower() or None
+
+
+def _state(value: str | None) -> str | None:
+    return (value or "").strip().upper() or None
+
+
+def _equipment(value: str | None) -> str:
+    return (value or "").strip().lower().replace(" ", "-")
+
+
+class LaneRateTables:
+    """Load-weighted average rate per mile and load count, per key, for each fallback level."""
+
+    def __init__(
+        self,
+        refresh_seconds: float = QUOTE_TABLE_REFRESH_SECONDS,
+        min_loads: int = QUOTE_MIN_LOADS,
+        default_rate: float = QUOTE_DEFAULT_RATE_PER_MILE,
+        equipment_multipliers: dict[str, float] = QUOTE_EQUIPMENT_MULTIPLIERS,
+    ):
+        self.refresh_seconds = refresh_seconds
+        self.min_loads = min_loads
+        self.default_rate = default_rate
+        self.equipment_multipliers = equipment_multipliers
+        self._tables: dict[str, dict[tuple, tuple[float, int]]] = {level: {} for level in LEVELS}
+        self._loaded_at: float | None = None
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def load(self, db: Session) -> None:
+        """Rebuild every level from lane_history in one aggregate query."""
+        origin_city = func.lower(func.btrim(LaneHistory.origin_city))
+        origin_state = func.upper(func.btrim(LaneHistory.origin_state))
+        destination_city = func.lower(func.btrim(LaneHistory.destination_city))
+        destination_state = func.upper(func.btrim(LaneHistory.destination_state))
+        # Rows without a load count still carry a rate; count them once.
+        weight = func.greatest(func.coalesce(LaneHistory.total_loads, 0), 1)
+        query = (
+            select(
+                func.grouping(origin_city).label("g_lane"),
+                func.grouping(destination_state).label("g_state_pair"),
+                func.grouping(origin_state).label("g_origin_state"),
+                origin_city.label("origin_city"),
+                origin_state.label("origin_state"),
+                destination_city.label("destination_city"),
+                destination_state.label("destination_state"),
+                (func.sum(LaneHistory.avg_rate_per_mile * weight) / func.sum(weight)).label("rate"),
+                func.sum(weight).label("loads"),
+            )
+            .where(LaneHistory.avg_rate_per_mile.isnot(None))
+            .group_by(
+                func.grouping_sets(
+                    tuple_(origin_city, origin_state, destination_city, destination_state),
+                    tuple_(origin_state, destination_state),
+                    tuple_(origin_state),
+                    tuple_(),
+                )
+            )
+        )
+        tables: dict[str, dict[tuple, tuple[float, int]]] = {level: {} for level in LEVELS}
+        for row in db.execute(query).mappings():
+            if row["rate"] is None:
+                continue  # the grand-total row of an empty table
+            entry = (float(row["rate"]), int(row["loads"]))
+            if row["g_lane"] == 0:
+                key = (row["origin_city"], row["origin_state"], row["destination_city"], row["destination_state"])
+                tables["lane"][key] = entry
+            elif row["g_state_pair"] == 0:
+                tables["state_pair"][(row["origin_state"], row["destination_state"])] = entry
+            elif row["g_origin_state"] == 0:
+                tables["origin_state"][(row["origin_state"],)] = entry
+            else:
+                tables["national"][()] = entry
+        self._tables = tables
+        self._loaded_at = time.monotonic()
+
+    def ensure_fresh(self, db: Session) -> None:
+        """Load on first use, then rebuild at most once per refresh interval."""
+        if self._is_fresh():
+            return
+        with self._refresh_lock:
+            if not self._is_fresh():
+                self.load(db)
+
+    def _is_fresh(self) -> bool:
+        return self.loaded and time.monotonic() - self._loaded_at < self.refresh_seconds
+
+    def quote(
+        self,
+        origin_city: str | None,
+        origin_state: str | None,
+        destination_city: str | None,
+        destination_state: str | None,
+        equipment: str | None = None,
+        total_miles: float | None = None,
+        order_id: int | None = None,
+    ) -> QuoteResponse:
+        oc, os_, dc, ds = _city(origin_city), _state(origin_state), _city(destination_city), _state(destination_state)
+        tables = self._tables
+        candidates = [
+            ("lane", (oc, os_, dc, ds) if oc and os_ and dc and ds else None),
+            ("state_pair", (os_, ds) if os_ and ds else None),
+            ("origin_state", (os_,) if os_ else None),
+            ("national", ()),
+        ]
+        basis, rate, loads = "default", self.default_rate, 0
+        for level, key in candidates:
+            entry = tables[level].get(key) if key is not None else None
+            if entry is not None and entry[1] >= self.min_loads:
+                basis, (rate, loads) = level, entry
+                break
+        multiplier = self.equipment_multipliers.get(_equipment(equipment), 1.0)
+        rate_per_mile = round(rate * multiplier, 4)
+        return QuoteResponse(
+            order_id=order_id,
+            rate_per_mile=rate_per_mile,
+            total=round(rate_per_mile * total_miles, 2) if total_miles is not None else None,
+            total_miles=total_miles,
+            basis=basis,
+            sample_loads=loads,
+            equipment_multiplier=multiplier,
+        )
+
+
+lane_rates = LaneRateTables()
@@ -0,0 +1,160 @@
+"""
+Archive tier for old orders: `orders_archive` / `stops_archive` next to the hot tables.
+
+- `archive_orders` moves finished orders whose last update is older than the cutoff, one batch per
+  transaction (copy, then delete from the hot tables; stops follow by FK cascade). Triggers log
+  these as 'archived' rather than 'deleted' in the change feed and event stream.
+- Archived orders stay readable: `get_archived_order` backs `GET /orders/{id}`, `get_archived_orders`
+  backs `POST /orders/batch`, and `export_orders_csv` streams hot and archived orders for a created_at range.
+- Columns are copied by name from the hot models, so a column added to `orders`/`stops` must be
+  added to the archive tables in the same migration.
+"""
+import csv
+import io
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Iterator
+
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from app.database import SessionLocal
+from app.models import Order, OrderArchive, Stop, StopArchive
+
+EXPORT_COLUMNS = [
+    "id",
+    "customer_id",
+    "customer_name",
+    "status",
+    "trailer_type",
+    "load_type",
+    "weight_lbs",
+    "origin_city",
+    "origin_state",
+    "destination_city",
+    "destination_state",
+    "total_miles",
+    "created_at",
+    "archived_at",
+]
+
+_EXPORT_BATCH = 1000
+
+
+def archive_orders(db: Session, older_than_days: float, statuses: list[str], batch_size: int) -> int:
+    """Move up to `batch_size` archivable orders with their stops. Returns how many were moved."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    order_ids = list(
+        db.execute(
+            select(Order.id)
+            .where(Order.status.in_(statuses), Order.updated_at < cutoff)
+            .order_by(Order.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).scalars()
+    )
+    if not order_ids:
+        db.rollback()
+        return 0
+
+    db.execute(text("SET LOCAL app.archiving = 'on'"))
+    order_columns = [column.name for column in Order.__table__.columns]
+    stop_columns = [column.name for column in Stop.__table__.columns]
+    db.execute(
+        insert(OrderArchive).from_select(
+            order_columns, select(*[Order.__table__.c[name] for name in order_columns]).where(Order.id.in_(order_ids))
+        )
+    )
+    db.execute(
+        insert(StopArchive).from_select(
+            stop_columns, select(*[Stop.__table__.c[name] for name in stop_columns]).where(Stop.order_id.in_(order_ids))
+        )
+    )
+    db.execute(delete(Order).where(Order.id.in_(order_ids)).execution_options(synchronize_session=False))
+    db.commit()
+    return len(order_ids)
+
+
+def get_archived_order(db: Session, order_id: int) -> OrderArchive | None:
+    return (
+        db.query(OrderArchive)
+        .options(selectinload(OrderArchive.stops), joinedload(OrderArchive.customer))
+        .filter(OrderArchive.id == order_id)
+        .first()
+    )
+
+
+def get_archived_orders(db: Session, order_ids: list[int]) -> list[OrderArchive]:
+    return (
+        db.query(OrderArchive)
+        .options(selectinload(OrderArchive.stops), selectinload(OrderArchive.customer))
+        .filter(OrderArchive.id.in_(order_ids))
+        .all()
+    )
+
+
+def _export_row(order: Order | OrderArchive) -> list:
+    stops = sorted(order.stops, key=lambda s: s.sequence)
+    first = stops[0] if stops else None
+    last = stops[-1] if stops else None
+    archived_at = getattr(order, "archived_at", None)
+    return [
+        order.id,
+        order.customer_id,
+        order.customer.name if order.customer else "",
+        order.status,
+        order.trailer_type or "",
+        order.load_type or "",
+        order.weight_lbs if order.weight_lbs is not None else "",
+        (first.city or "") if first else "",
+        (first.state or "") if first else "",
+        (last.city or "") if last else "",
+        (last.state or "") if last else "",
+        order.total_miles if order.total_miles is not None else "",
+        order.created_at.isoformat() if order.created_at else "",
+        archived_at.isoformat() if archived_at else "",
+    ]
+
+
+def export_orders_csv(
+    created_from: date | None = None,
+    created_to: date | None = None,
+    include_archived: bool = True,
+) -> Iterator[str]:
+    """
+    Yield CSV text (header first) for orders created in [created_from, created_to], oldest first,
+    archived orders before hot ones. Runs on its own session because it outlives the request scope.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> str:
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return chunk
+
+    writer.writerow(EXPORT_COLUMNS)
+    yield flush()
+
+    db = SessionLocal()
+    try:
+        models = [OrderArchive, Order] if include_archived else [Order]
+        for model in models:
+            query = (
+                db.query(model)
+                .options(selectinload(model.stops), joinedload(model.customer))
+                .order_by(model.created_at, model.id)
+            )
+            if created_from:
+                query = query.filter(model.created_at >= datetime.combine(created_from, time.min, timezone.utc))
+            if created_to:
+                next_day = datetime.combine(created_to + timedelta(days=1), time.min, timezone.utc)
+                query = query.filter(model.created_at < next_day)
+            for count, order in enumerate(query.yield_per(_EXPORT_BATCH), start=1):
+                writer.writerow(_export_row(order))
+                if count % 100 == 0:
+                    yield flush()
+            yield flush()
+            db.expunge_all()
+    finally:
+        db.close()
@@ -0,0 +1,462 @@
+"""
+In-memory columnar snapshot of the order board (the fields `GET /orders` lists and filters on).
+
+- Loaded once per worker, then kept current from `updated_at` deltas on orders, stops and customers,
+  read from the primary; write paths in this worker mark it stale so their own changes show on the
+  next read.
+- One array per field, ordered by order id. Repeated strings (states, cities, equipment, status,
+  customer names) are dictionary-encoded, so a filter is checked once per distinct value, not per row.
+- Deleted orders are detected by comparing row counts and dropped on the next refresh.
+"""
+import math
+import threading
+import time
+from array import array
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from app.config import ORDER_BOARD_REFRESH_SECONDS
+from app.database import SessionLocal, delta_watermark
+from app.models import Customer, Order, Stop
+from app.schemas.order import OrderListItem
+
+# Rebuild the arrays once this share of rows are tombstones.
+_COMPACT_RATIO = 0.25
+
+# Separates the searchable fields of one order so a term cannot match across two of them.
+_SEARCH_SEPARATOR = "\x00"
+
+_TIME_WINDOWS = {"morning": (5, 12), "afternoon": (12, 17), "evening": (17, 23)}
+
+_NEW_SHIPPER_DAYS = 30
+
+
+def _normalize(value: str | None) -> str:
+    return (value or "").strip().lower()
+
+
+def _normalize_equipment(value: str | None) -> str:
+    return _normalize(value).replace(" ", "-")
+
+
+def _place(city: str | None, state: str | None) -> str:
+    return " ".join(part for part in [city, state] if part).lower()
+
+
+def _coordinate(value: float | None) -> float:
+    return value if value is not None else math.nan
+
+
+class _StringColumn:
+    """Dictionary-encoded strings: one small int code per row plus the distinct values."""
+
+    def __init__(self):
+        self.codes = array("i")
+        self.values: list[str | None] = []
+        self._lookup: dict[str | None, int] = {}
+
+    def encode(self, value: str | None) -> int:
+        code = self._lookup.get(value)
+        if code is None:
+            code = len(self.values)
+            self._lookup[value] = code
+            self.values.append(value)
+        return code
+
+    def append(self, value: str | None) -> None:
+        self.codes.append(self.encode(value))
+
+    def put(self, position: int, value: str | None) -> None:
+        self.codes[position] = self.encode(value)
+
+    def get(self, position: int) -> str | None:
+        return self.values[self.codes[position]]
+
+    def matching_codes(self, predicate) -> set[int]:
+        return {code for code, value in enumerate(self.values) if predicate(value)}
+
+
+class _Columns:
+    def __init__(self):
+        self.ids = array("q")
+        self.customer_ids = array("q")
+        self.weights = array("d")  # NaN when unknown
+        self.miles = array("d")  # NaN when unknown
+        self.created_at = array("d")  # epoch seconds, NaN when unknown
+        self.eta_hour = array("b")  # origin scheduled_arrival_early hour, -1 when unknown
+        self.eta_day = array("i")  # origin scheduled_arrival_early date ordinal, 0 when unknown
+        self.preferred = array("b")  # customer has an MC number
+        self.at_risk = array("b")  # schedule feasibility flag
+        self.origin_lat = array("d")  # first stop coordinates, NaN when ungeocoded
+        self.origin_lng = array("d")
+        self.destination_lat = array("d")  # last stop coordinates, NaN when ungeocoded
+        self.destination_lng = array("d")
+        self.alive = array("b")
+        self.customer_name = _StringColumn()
+        self.trailer_type = _StringColumn()
+        self.equipment = _StringColumn()  # normalized trailer type
+        self.load_type = _StringColumn()
+        self.status = _StringColumn()
+        self.origin_city = _StringColumn()
+        self.origin_state = _StringColumn()
+        self.destination_city = _StringColumn()
+        self.destination_state = _StringColumn()
+        self.origin_place = _StringColumn()  # lowercase "city state", what the pickup filter matches
+        self.destination_place = _StringColumn()
+        self.search_text: list[str] = []  # lowercase customer name and every stop city/state
+        self.routes: list[list | None] = []  # route_geometry coordinates ([lng, lat] pairs) for the map
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def _row_values(order: Order) -> dict:
+    stops = sorted(order.stops, key=lambda s: s.sequence)
+    first = stops[0] if stops else None
+    last = stops[-1] if stops else None
+    eta = first.scheduled_arrival_early if first else None
+    customer_name = order.customer.name if order.customer else ""
+    search_parts = [customer_name.lower()]
+    for stop in stops:
+        search_parts.extend(part.lower() for part in [stop.city, stop.state] if part)
+    return {
+        "customer_id": order.customer_id,
+        "weights": float(order.weight_lbs) if order.weight_lbs is not None else math.nan,
+        "miles": order.total_miles if order.total_miles is not None else math.nan,
+        "created_at": order.created_at.timestamp() if order.created_at else math.nan,
+        "eta_hour": eta.hour if eta else -1,
+        "eta_day": eta.date().toordinal() if eta else 0,
+        "preferred": 1 if order.customer and order.customer.mc_number else 0,
+        "at_risk": 1 if order.at_risk else 0,
+        "origin_lat": _coordinate(first.lat if first else None),
+        "origin_lng": _coordinate(first.lng if first else None),
+        "destination_lat": _coordinate(last.lat if last else None),
+        "destination_lng": _coordinate(last.lng if last else None),
+        "customer_name": customer_name,
+        "trailer_type": order.trailer_type,
+        "equipment": _normalize_equipment(order.trailer_type),
+        "load_type": order.load_type,
+        "status": order.status,
+        "origin_city": first.city if first else None,
+        "origin_state": first.state if first else None,
+        "destination_city": last.city if last else None,
+        "destination_state": last.state if last else None,
+        "origin_place": _place(first.city, first.state) if first else "",
+        "destination_place": _place(last.city, last.state) if last else "",
+        "search_text": _SEARCH_SEPARATOR.join(search_parts),
+        "route": (order.route_geometry or {}).get("coordinates") or None,
+    }
+
+
+_NUMERIC_FIELDS = (
+    "weights",
+    "miles",
+    "created_at",
+    "eta_hour",
+    "eta_day",
+    "preferred",
+    "at_risk",
+    "origin_lat",
+    "origin_lng",
+    "destination_lat",
+    "destination_lng",
+)
+_STRING_FIELDS = (
+    "customer_name",
+    "trailer_type",
+    "equipment",
+    "load_type",
+    "status",
+    "origin_city",
+    "origin_state",
+    "destination_city",
+    "destination_state",
+    "origin_place",
+    "destination_place",
+)
+
+
+class OrderBoardSnapshot:
+    """Columnar copy of the board fields for every order, filtered and paged in memory."""
+
+    def __init__(self, refresh_seconds: float = ORDER_BOARD_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        # Serializes load/refresh so a burst of stale reads runs one delta query, not one each.
+        self._refresh_lock = threading.Lock()
+        self._columns = _Columns()
+        self._positions: dict[int, int] = {}
+        self._dead = 0
+        self._watermark: datetime | None = None
+        self._checked_at: float | None = None
+        # mark_stale bumps the wanted generation; a refresh records the generation it started from.
+        self._wanted_generation = 0
+        self._loaded_generation = 0
+        # Bumped whenever rows change, so derived views (the order map) know when to rebuild.
+        self.version = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._checked_at is not None
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    @staticmethod
+    def _orders_query(db: Session):
+        return db.query(Order).options(joinedload(Order.customer), selectinload(Order.stops))
+
+    def load(self, db: Session) -> None:
+        """Rebuild the whole snapshot from the orders table."""
+        generation = self._wanted_generation
+        watermark = delta_watermark(db)
+        orders = self._orders_query(db).order_by(Order.id).all()
+        columns = _Columns()
+        positions: dict[int, int] = {}
+        for order in orders:
+            positions[order.id] = len(columns)
+            self._append(columns, order.id, _row_values(order))
+        with self._lock:
+            self._columns = columns
+            self._positions = positions
+            self._dead = 0
+            self._watermark = watermark
+            self._checked_at = time.monotonic()
+            self._loaded_generation = generation
+            self.version += 1
+
+    def refresh(self, db: Session) -> int:
+        """Apply orders changed since the last load/refresh. Returns how many rows were rewritten."""
+        generation = self._wanted_generation
+        watermark = delta_watermark(db)
+        since = self._watermark
+        changed_stops = db.query(Stop.order_id).filter(Stop.updated_at >= since)
+        changed_customers = db.query(Customer.id).filter(Customer.updated_at >= since)
+        changed = (
+            self._orders_query(db)
+            .filter(
+                or_(
+                    Order.updated_at >= since,
+                    Order.id.in_(changed_stops),
+                    Order.customer_id.in_(changed_customers),
+                )
+            )
+            .order_by(Order.id)
+            .all()
+        )
+        rows = [(order.id, _row_values(order)) for order in changed]
+        # Deleted orders leave no updated_at trace; a count mismatch means some went away.
+        live_ids = None
+        if len(self._positions) + sum(1 for order_id, _ in rows if order_id not in self._positions) != (
+            db.query(func.count(Order.id)).scalar()
+        ):
+            live_ids = {order_id for (order_id,) in db.query(Order.id)}
+
+        with self._lock:
+            needs_compact = False
+            for order_id, values in rows:
+                position = self._positions.get(order_id)
+                if position is None:
+                    if len(self._columns) and order_id < self._columns.ids[-1]:
+                        needs_compact = True  # keep rows in id order
+                    self._positions[order_id] = len(self._columns)
+                    self._append(self._columns, order_id, values)
+                else:
+                    self._overwrite(position, values)
+            if live_ids is not None:
+                for order_id in [order_id for order_id in self._positions if order_id not in live_ids]:
+                    self._columns.alive[self._positions.pop(order_id)] = 0
+                    self._dead += 1
+            if rows or live_ids is not None:
+                self.version += 1
+            if needs_compact or self._dead > _COMPACT_RATIO * max(len(self._columns), 1):
+                self._compact()
+            self._watermark = watermark
+            self._checked_at = time.monotonic()
+            self._loaded_generation = generation
+        return len(rows)
+
+    def ensure_fresh(self, db: Session | None = None) -> None:
+        """
+        Load on first use, then pull deltas when marked stale or at most once per refresh interval.
+        `db` must be on the primary (see delta_watermark); by default a primary session is opened when needed.
+        """
+        if self._is_fresh():
+            return
+        with self._refresh_lock:
+            if self._is_fresh():
+                return
+            primary = db or SessionLocal()
+            try:
+                if not self.loaded:
+                    self.load(primary)
+                else:
+                    self.refresh(primary)
+            finally:
+                if db is None:
+                    primary.close()
+
+    def _is_fresh(self) -> bool:
+        return (
+            self.loaded
+            and self._loaded_generation == self._wanted_generation
+            and time.monotonic() - self._checked_at < self.refresh_seconds
+        )
+
+    def mark_stale(self) -> None:
+        """Called after order writes in this worker so the next board read pulls them in."""
+        self._wanted_generation += 1
+
+    def query(
+        self,
+        q: str = "",
+        available_date: date | None = None,
+        time_window: str = "",
+        pickup: str = "",
+        delivery: str = "",
+        equipment: str = "",
+        shipper: str = "",
+        at_risk: bool | None = None,
+        page: int = 1,
+        page_size: int = 10,
+    ) -> tuple[list[OrderListItem], int]:
+        """Same filters and ordering (newest id first) as `list_orders`. Returns (page items, total)."""
+        with self._lock:
+            c = self._columns
+            checks = []
+            term = q.strip()
+            if term:
+                needle = term.lower()
+                search_id = int(term) if term.isdigit() else None
+                search_text = c.search_text
+                ids = c.ids
+                checks.append(lambda p: needle in search_text[p] or ids[p] == search_id)
+            if available_date:
+                day = available_date.toordinal()
+                eta_day = c.eta_day
+                checks.append(lambda p: eta_day[p] == day)
+            window = _TIME_WINDOWS.get(_normalize(time_window))
+            if window:
+                start, end = window
+                eta_hour = c.eta_hour
+                checks.append(lambda p: start <= eta_hour[p] < end)
+            for term, column in [(pickup, c.origin_place), (delivery, c.destination_place)]:
+                normalized = _normalize(term)
+                if normalized:
+                    allowed = column.matching_codes(lambda value, n=normalized: n in value)
+                    codes = column.codes
+                    checks.append(lambda p, allowed=allowed, codes=codes: codes[p] in allowed)
+            normalized_equipment = _normalize_equipment(equipment)
+            if normalized_equipment not in ("", "all"):
+                allowed_equipment = c.equipment.matching_codes(lambda value: value == normalized_equipment)
+                equipment_codes = c.equipment.codes
+                checks.append(lambda p: equipment_codes[p] in allowed_equipment)
+            normalized_shipper = _normalize(shipper)
+            if normalized_shipper == "preferred":
+                preferred = c.preferred
+                checks.append(lambda p: preferred[p] == 1)
+            elif normalized_shipper == "new":
+                cutoff = (datetime.now(timezone.utc) - timedelta(days=_NEW_SHIPPER_DAYS)).timestamp()
+                created_at = c.created_at
+                checks.append(lambda p: created_at[p] >= cutoff)  # NaN never passes
+
+            if at_risk is not None:
+                risk_flags, wanted = c.at_risk, 1 if at_risk else 0
+                checks.append(lambda p: risk_flags[p] == wanted)
+
+            alive = c.alive
+            matches = [
+                p for p in range(len(c) - 1, -1, -1) if alive[p] and all(check(p) for check in checks)
+            ]
+            offset = (page - 1) * page_size
+            items = [self._item(p) for p in matches[offset : offset + page_size]]
+            return items, len(matches)
+
+    def map_rows(self, equipment: str = "", status: str = "") -> tuple[int, list[tuple]]:
+        """
+        (version, rows) for the order map: one (id, origin_lat, origin_lng, destination_lat,
+        destination_lng, route coordinates) per live order matching the filters. NaN marks a missing point.
+        """
+        with self._lock:
+            c = self._columns
+            normalized_equipment = _normalize_equipment(equipment)
+            allowed_equipment = None
+            if normalized_equipment not in ("", "all"):
+                allowed_equipment = c.equipment.matching_codes(lambda value: value == normalized_equipment)
+            normalized_status = _normalize(status)
+            allowed_status = None
+            if normalized_status:
+                allowed_status = c.status.matching_codes(lambda value: _normalize(value) == normalized_status)
+            rows = [
+                (c.ids[p], c.origin_lat[p], c.origin_lng[p], c.destination_lat[p], c.destination_lng[p], c.routes[p])
+                for p in range(len(c))
+                if c.alive[p]
+                and (allowed_equipment is None or c.equipment.codes[p] in allowed_equipment)
+                and (allowed_status is None or c.status.codes[p] in allowed_status)
+            ]
+            return self.version, rows
+
+    def _item(self, p: int) -> OrderListItem:
+        c = self._columns
+        weight, miles, created_at = c.weights[p], c.miles[p], c.created_at[p]
+        return OrderListItem(
+            id=c.ids[p],
+            customer_id=c.customer_ids[p],
+            customer_name=c.customer_name.get(p) or "",
+            trailer_type=c.trailer_type.get(p),
+            load_type=c.load_type.get(p),
+            weight_lbs=None if math.isnan(weight) else int(weight),
+            origin_city=c.origin_city.get(p),
+            origin_state=c.origin_state.get(p),
+            destination_city=c.destination_city.get(p),
+            destination_state=c.destination_state.get(p),
+            total_miles=None if math.isnan(miles) else miles,
+            status=c.status.get(p),
+            created_at=None if math.isnan(created_at) else datetime.fromtimestamp(created_at, timezone.utc),
+            at_risk=bool(c.at_risk[p]),
+        )
+
+    @staticmethod
+    def _append(columns: _Columns, order_id: int, values: dict) -> None:
+        columns.ids.append(order_id)
+        columns.customer_ids.append(values["customer_id"])
+        columns.alive.append(1)
+        for name in _NUMERIC_FIELDS:
+            getattr(columns, name).append(values[name])
+        for name in _STRING_FIELDS:
+            getattr(columns, name).append(values[name])
+        columns.search_text.append(values["search_text"])
+        columns.routes.append(values["route"])
+
+    def _overwrite(self, position: int, values: dict) -> None:
+        c = self._columns
+        c.customer_ids[position] = values["customer_id"]
+        for name in _NUMERIC_FIELDS:
+            getattr(c, name)[position] = values[name]
+        for name in _STRING_FIELDS:
+            getattr(c, name).put(position, values[name])
+        c.search_text[position] = values["search_text"]
+        c.routes[position] = values["route"]
+
+    def _compact(self) -> None:
+        """Rebuild the arrays in id order without tombstones (also drops unused dictionary values)."""
+        old = self._columns
+        columns = _Columns()
+        positions: dict[int, int] = {}
+        for order_id in sorted(self._positions):
+            p = self._positions[order_id]
+            values = {name: getattr(old, name)[p] for name in _NUMERIC_FIELDS}
+            values.update({name: getattr(old, name).get(p) for name in _STRING_FIELDS})
+            values["customer_id"] = old.customer_ids[p]
+            values["search_text"] = old.search_text[p]
+            values["route"] = old.routes[p]
+            positions[order_id] = len(columns)
+            self._append(columns, order_id, values)
+        self._columns = columns
+        self._positions = positions
+        self._dead = 0
+
+
+order_board = OrderBoardSnapshot()
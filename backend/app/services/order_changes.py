@@ -0,0 +1,110 @@
+"""
+Change feed over the `order_changes` log (filled by triggers on orders and stops).
+
+- The token is the last `order_changes.id` a client has seen; ids only grow.
+- Ids are assigned before commit, so a lower id can commit after a higher one. The feed only hands
+  out changes from transactions older than every running one (the snapshot xmin), so a client
+  advancing its token can never skip a change that commits later. A page cut short that way reports
+  `pinned` instead of `has_more`: polling again right away would return nothing new.
+- Several changes to one order collapse into one entry whose kind reflects the order's current state;
+  orders moved to the archive tier are reported as "archived" rather than "deleted".
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, func, text
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from app.config import ORDER_CHANGES_PIN_WARN_SECONDS
+from app.models import Order, OrderChange
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeTokenExpired(Exception):
+    """The requested token is older than the retained log; the client must resync from GET /orders."""
+
+
+def latest_token(db: Session) -> int:
+    return db.query(func.coalesce(func.max(OrderChange.id), 0)).scalar()
+
+
+def _log_pinning_transaction(db: Session, horizon: int) -> None:
+    # backend_xid is the 32-bit xid; the txid functions add an epoch above it.
+    holder = db.execute(
+        text(
+            "SELECT pid, EXTRACT(EPOCH FROM clock_timestamp() - xact_start) AS age FROM pg_stat_activity "
+            "WHERE backend_xid::text::bigint = :xid"
+        ),
+        {"xid": horizon % 2**32},
+    ).first()
+    if holder is None:
+        logger.info("order change feed held back by transaction %s (not on this server)", horizon)
+    elif holder.age is not None and holder.age >= ORDER_CHANGES_PIN_WARN_SECONDS:
+        logger.warning("order change feed held back by transaction %s (pid %s, open %.0fs)", horizon, holder.pid, holder.age)
+
+
+def read_changes(
+    db: Session, since: int, limit: int
+) -> tuple[list[tuple[int, str, Order | None]], int, bool, bool]:
+    """
+    Return ([(order_id, change, order or None)], next_token, has_more, pinned) for up to `limit` log rows after
+    `since`. `change` is "created", "updated", "deleted" or "archived"; deleted and archived entries carry no
+    order. `pinned` means later rows wait on a still-running transaction: retry after a pause.
+    """
+    if since > 0:
+        oldest = db.query(func.min(OrderChange.id)).scalar()
+        if oldest is not None and since < oldest - 1:
+            raise ChangeTokenExpired()
+
+    horizon = db.execute(text("SELECT txid_snapshot_xmin(txid_current_snapshot())")).scalar()
+    rows = (
+        db.query(OrderChange.id, OrderChange.order_id, OrderChange.change, OrderChange.txid)
+        .filter(OrderChange.id > since)
+        .order_by(OrderChange.id)
+        .limit(limit + 1)
+        .all()
+    )
+
+    next_token = since
+    created: set[int] = set()
+    archived: set[int] = set()
+    last_seen: dict[int, int] = {}
+    consumed = 0
+    pinned = False
+    for row in rows[:limit]:
+        if row.txid >= horizon:
+            pinned = True  # an older transaction may still commit a lower id; wait for it
+            break
+        next_token = row.id
+        consumed += 1
+        last_seen[row.order_id] = row.id
+        if row.change == "created":
+            created.add(row.order_id)
+        elif row.change == "archived":
+            archived.add(row.order_id)
+    has_more = not pinned and consumed < len(rows)
+    if pinned:
+        _log_pinning_transaction(db, horizon)
+
+    order_ids = sorted(last_seen, key=last_seen.get)
+    orders: dict[int, Order] = {}
+    if order_ids:
+        query = db.query(Order).options(selectinload(Order.stops), joinedload(Order.customer))
+        orders = {order.id: order for order in query.filter(Order.id.in_(order_ids)).all()}
+    changes = []
+    for order_id in order_ids:
+        order = orders.get(order_id)
+        if order is None:
+            changes.append((order_id, "archived" if order_id in archived else "deleted", None))
+        else:
+            changes.append((order_id, "created" if order_id in created else "updated", order))
+    return changes, next_token, has_more, pinned
+
+
+def prune_order_changes(db: Session, retention_days: float) -> int:
+    """Delete log rows older than the retention window. Returns how many were removed."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    result = db.execute(delete(OrderChange).where(OrderChange.changed_at < cutoff))
+    db.commit()
+    return result.rowcount
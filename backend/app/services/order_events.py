@@ -0,0 +1,198 @@
+"""
+Live order events for `GET /orders/stream`, fed by Postgres LISTEN/NOTIFY.
+
+- Triggers on orders and stops `pg_notify('order_events', ...)` at commit, so every uvicorn worker
+  (and every writer, API or not) sees the same events.
+- One listener thread per worker holds a dedicated connection outside the pool and fans events out
+  to in-process subscribers (SSE connections) and callbacks (the order-board snapshot).
+- A subscriber that falls behind, or any gap while the listener reconnects, is told to resync
+  (`GET /orders/changes`) instead of silently missing events.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from app.config import ORDER_EVENTS_QUEUE_SIZE
+from app.database import engine
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "order_events"
+
+# Sent to subscribers when events may have been lost; clients refetch instead of trusting their view.
+RESYNC_EVENT = {"event": "resync"}
+
+_POLL_SECONDS = 5.0
+_RECONNECT_BACKOFF_SECONDS = (0.5, 1, 2, 5, 10)
+
+
+@dataclass
+class OrderEventFilter:
+    """Subscription filter; unset fields match everything. Deleted/resync events always pass."""
+
+    equipment: str | None = None  # normalized like the board filter, e.g. "dry-van"
+    status: str | None = None
+    customer_id: int | None = None
+    pickup_state: str | None = None
+    delivery_state: str | None = None
+
+    def matches(self, event: dict[str, Any]) -> bool:
+        if event.get("event") in ("deleted", "resync"):
+            return True
+        if self.equipment and (event.get("trailer_type") or "").strip().lower().replace(" ", "-") != self.equipment:
+            return False
+        if self.status and (event.get("status") or "").lower() != self.status:
+            return False
+        if self.customer_id is not None and event.get("customer_id") != self.customer_id:
+            return False
+        if self.pickup_state and (event.get("origin_state") or "").strip().upper() != self.pickup_state:
+            return False
+        if self.delivery_state and (event.get("destination_state") or "").strip().upper() != self.delivery_state:
+            return False
+        return True
+
+
+class _Subscriber:
+    def __init__(self, event_filter: OrderEventFilter, loop: asyncio.AbstractEventLoop, queue_size: int):
+        self.filter = event_filter
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def _put(self, event: dict[str, Any]) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Drop the backlog and ask the client to resync; it is cheaper than buffering without bound.
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC_EVENT)
+
+    def deliver(self, event: dict[str, Any]) -> None:
+        self.loop.call_soon_threadsafe(self._put, event)
+
+
+class OrderEventHub:
+    def __init__(self, queue_size: int = ORDER_EVENTS_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers: set[_Subscriber] = set()
+        self._callbacks: list[Callable[[dict[str, Any]], None]] = []
+        self._thread: threading.Thread | None = None
+        self._stopping = threading.Event()
+        self._connected = threading.Event()
+        self.events_received = 0
+        self.reconnects = 0
+
+    def start(self) -> None:
+        """Start the listener thread (idempotent)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="order-events-listener", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=_POLL_SECONDS + 1)
+
+    def wait_until_listening(self, timeout: float) -> bool:
+        return self._connected.wait(timeout)
+
+    def add_callback(self, callback: Callable[[dict[str, Any]], None]) -> None:
+        """Run `callback(event)` on the listener thread for every event (keep it fast)."""
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def subscribe(self, event_filter: OrderEventFilter) -> _Subscriber:
+        """Register a subscriber on the running event loop; its queue receives matching events once `start()` has run."""
+        subscriber = _Subscriber(event_filter, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: _Subscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "listening": self._connected.is_set(),
+            "subscribers": len(self._subscribers),
+            "events_received": self.events_received,
+            "reconnects": self.reconnects,
+        }
+
+    def _dispatch(self, event: dict[str, Any]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception:
+                logger.exception("order event callback failed")
+        for subscriber in subscribers:
+            if subscriber.filter.matches(event):
+                try:
+                    subscriber.deliver(event)
+                except RuntimeError:
+                    # Its event loop has closed (the stream died without unsubscribing); drop it alone.
+                    self.unsubscribe(subscriber)
+
+    def _run(self) -> None:
+        attempt = 0
+        while not self._stopping.is_set():
+            try:
+                self._listen()
+                attempt = 0
+            except Exception as exc:
+                logger.warning("order event listener disconnected: %s", exc)
+            self._connected.clear()
+            if self._stopping.is_set():
+                break
+            # Events committed while disconnected are gone; tell everyone to catch up.
+            self.reconnects += 1
+            self._dispatch(RESYNC_EVENT)
+            time.sleep(_RECONNECT_BACKOFF_SECONDS[min(attempt, len(_RECONNECT_BACKOFF_SECONDS) - 1)])
+            attempt += 1
+
+    def _listen(self) -> None:
+        # A dedicated connection detached from the pool: LISTEN holds it for the life of the worker.
+        pooled = engine.raw_connection()
+        connection = pooled.driver_connection
+        pooled.detach()
+        try:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+            self._connected.set()
+            while not self._stopping.is_set():
+                readable, _, _ = select.select([connection], [], [], _POLL_SECONDS)
+                if not readable:
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    notify = connection.notifies.pop(0)
+                    try:
+                        event = json.loads(notify.payload)
+                    except ValueError:
+                        continue
+                    self.events_received += 1
+                    self._dispatch(event)
+        finally:
+            connection.close()
+
+
+order_event_hub = OrderEventHub()
@@ -0,0 +1,175 @@
+"""
+Facet counts for the order-board filters, computed in one aggregate query.
+
+- Each facet is counted against every *other* active filter, so a count shows how many orders
+  selecting that value would return (the usual multi-select facet semantics).
+- One GROUPING SETS query covers all facets: a set per grouped facet plus the grand-total row,
+  which also carries the shipper counts via FILTER clauses.
+- Filter semantics mirror `list_orders`: origin/destination are the first/last stop by sequence,
+  time windows bucket the origin's scheduled_arrival_early hour, pickup/delivery are substring
+  matches on "city state".
+"""
+from datetime import date
+from typing import Any
+
+from sqlalchemy import Date, and_, case, cast, func, literal, or_, select, true, tuple_
+from sqlalchemy.orm import Session
+
+from app.config import FACETS_CACHE_SECONDS, FACETS_CACHE_SIZE
+from app.models import Customer, Order, Stop
+from app.services.cache import TTLCache
+
+NEW_SHIPPER_DAYS = 30
+
+# Facets reported as value -> count, each grouped on one column of the per-order base query.
+_GROUPED_FACETS = ("equipment", "time_window", "pickup_state", "delivery_state")
+
+_facets_cache = TTLCache(FACETS_CACHE_SECONDS, FACETS_CACHE_SIZE)
+
+
+def _normalize(value: str | None) -> str:
+    return (value or "").strip().lower()
+
+
+def _endpoint_stops(descending: bool):
+    """First (or last) stop per order by sequence."""
+    sequence = Stop.sequence.desc() if descending else Stop.sequence.asc()
+    return (
+        select(Stop.order_id, Stop.city, Stop.state, Stop.scheduled_arrival_early)
+        .distinct(Stop.order_id)
+        .order_by(Stop.order_id, sequence)
+        .subquery()
+    )
+
+
+def _base_query(q: str):
+    """One row per order (after the free-text search) with every attribute a filter or facet needs."""
+    origin = _endpoint_stops(descending=False)
+    destination = _endpoint_stops(descending=True)
+    hour = func.extract("hour", origin.c.scheduled_arrival_early)
+    query = (
+        select(
+            Order.id,
+            func.replace(func.lower(func.btrim(Order.trailer_type)), " ", "-").label("equipment"),
+            case(
+                (and_(hour >= 5, hour < 12), literal("morning")),
+                (and_(hour >= 12, hour < 17), literal("afternoon")),
+                (and_(hour >= 17, hour < 23), literal("evening")),
+            ).label("time_window"),
+            cast(origin.c.scheduled_arrival_early, Date).label("available_date"),
+            func.lower(func.concat_ws(" ", func.nullif(origin.c.city, ""), func.nullif(origin.c.state, ""))).label("pickup"),
+            func.lower(
+                func.concat_ws(" ", func.nullif(destination.c.city, ""), func.nullif(destination.c.state, ""))
+            ).label("delivery"),
+            func.upper(func.btrim(origin.c.state)).label("pickup_state"),
+            func.upper(func.btrim(destination.c.state)).label("delivery_state"),
+            (func.coalesce(Customer.mc_number, "") != "").label("preferred"),
+            (Order.created_at >= func.now() - func.make_interval(0, 0, 0, NEW_SHIPPER_DAYS)).label("new"),
+        )
+        .join(Customer, Order.customer_id == Customer.id)
+        .outerjoin(origin, origin.c.order_id == Order.id)
+        .outerjoin(destination, destination.c.order_id == Order.id)
+    )
+    term = q.strip()
+    if term:
+        pattern = f"%{term}%"
+        matching_stop = (
+            select(Stop.id)
+            .where(Stop.order_id == Order.id, or_(Stop.city.ilike(pattern), Stop.state.ilike(pattern)))
+            .exists()
+        )
+        search_filter = or_(Customer.name.ilike(pattern), matching_stop)
+        if term.isdigit():
+            search_filter = or_(search_filter, Order.id == int(term))
+        query = query.where(search_filter)
+    return query.subquery("board")
+
+
+def _filters(base, available_date, time_window, pickup, delivery, equipment, shipper) -> dict[str, Any]:
+    """Active filter predicates keyed by facet name; inactive filters are left out."""
+    filters: dict[str, Any] = {}
+    if available_date:
+        filters["available_date"] = base.c.available_date == available_date
+    if _normalize(time_window) in ("morning", "afternoon", "evening"):
+        filters["time_window"] = base.c.time_window == _normalize(time_window)
+    if _normalize(pickup):
+        filters["pickup_state"] = base.c.pickup.contains(_normalize(pickup), autoescape=True)
+    if _normalize(delivery):
+        filters["delivery_state"] = base.c.delivery.contains(_normalize(delivery), autoescape=True)
+    normalized_equipment = _normalize(equipment).replace(" ", "-")
+    if normalized_equipment not in ("", "all"):
+        filters["equipment"] = base.c.equipment == normalized_equipment
+    if _normalize(shipper) == "preferred":
+        filters["shipper"] = base.c.preferred
+    elif _normalize(shipper) == "new":
+        filters["shipper"] = base.c.new.is_(True)
+    return filters
+
+
+def _all_except(filters: dict[str, Any], facet: str | None = None):
+    conditions = [condition for name, condition in filters.items() if name != facet]
+    return and_(*conditions) if conditions else true()
+
+
+def compute_order_facets(
+    db: Session,
+    q: str = "",
+    available_date: date | None = None,
+    time_window: str = "",
+    pickup: str = "",
+    delivery: str = "",
+    equipment: str = "",
+    shipper: str = "",
+) -> dict[str, Any]:
+    """
+    Counts for every value of the equipment, shipper, time_window, pickup_state and delivery_state
+    facets under the given board filters, plus the total the board itself would show.
+    """
+    cache_key = (
+        _normalize(q),
+        available_date,
+        _normalize(time_window),
+        _normalize(pickup),
+        _normalize(delivery),
+        _normalize(equipment).replace(" ", "-"),
+        _normalize(shipper),
+    )
+    cached = _facets_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    base = _base_query(q)
+    filters = _filters(base, available_date, time_window, pickup, delivery, equipment, shipper)
+    grouped = [base.c[name] for name in _GROUPED_FACETS]
+    shipper_scope = _all_except(filters, "shipper")
+    query = select(
+        *[func.grouping(column).label(f"g_{column.name}") for column in grouped],
+        *grouped,
+        *[func.count().filter(_all_except(filters, column.name)).label(f"n_{column.name}") for column in grouped],
+        func.count().filter(_all_except(filters)).label("total"),
+        func.count().filter(shipper_scope).label("shipper_all"),
+        func.count().filter(and_(shipper_scope, base.c.preferred)).label("shipper_preferred"),
+        func.count().filter(and_(shipper_scope, base.c.new.is_(True))).label("shipper_new"),
+    ).group_by(func.grouping_sets(*grouped, tuple_()))
+
+    facets: dict[str, Any] = {name: {} for name in _GROUPED_FACETS}
+    result: dict[str, Any] = {"total": 0}
+    for row in db.execute(query).mappings():
+        grouped_on = [name for name in _GROUPED_FACETS if row[f"g_{name}"] == 0]
+        if not grouped_on:
+            result["total"] = row["total"]
+            result["shipper"] = {
+                "all": row["shipper_all"],
+                "preferred": row["shipper_preferred"],
+                "new": row["shipper_new"],
+            }
+            continue
+        name = grouped_on[0]
+        if row[name] and row[f"n_{name}"]:
+            facets[name][row[name]] = row[f"n_{name}"]
+
+    for name in _GROUPED_FACETS:
+        result[name] = dict(sorted(facets[name].items(), key=lambda item: (-item[1], item[0])))
+    result.setdefault("shipper", {"all": 0, "preferred": 0, "new": 0})
+    _facets_cache.set(cache_key, result)
+    return result
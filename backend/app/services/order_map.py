@@ -0,0 +1,171 @@
+"""
+Clustered map of order origins, destinations and routes for `GET /orders/map`.
+
+- Built from the order-board snapshot (first/last stop coordinates and route_geometry per order), so
+  no SQL runs beyond the snapshot's own delta refresh.
+- Points are clustered on a Web Mercator grid of `_CELLS_PER_TILE`² cells per 256px tile, so a cluster
+  covers about the same screen area at every zoom level.
+- Below MAP_ROUTE_MIN_ZOOM, lines are flows between origin and destination clusters (one line per
+  cluster pair, with a count). From it up, each order's route, simplified to about one pixel.
+- A layer holds every cluster and line for one zoom level and filter combination. It is computed once
+  per snapshot version and shared by concurrent requests. A request only picks the parts inside its bbox.
+"""
+import math
+from dataclasses import dataclass, field
+
+from app.config import MAP_CACHE_SIZE, MAP_MAX_LINES, MAP_ROUTE_MIN_ZOOM
+from app.schemas.order import OrderMapCluster, OrderMapLine, OrderMapResponse
+from app.services.cache import SingleFlight
+from app.services.order_board import order_board
+
+MAX_ZOOM = 20
+
+_CELLS_PER_TILE = 4  # 64px cells
+_TILE_PIXELS = 256
+_MAX_MERCATOR_LAT = 85.05112878
+_COORDINATE_DECIMALS = 5
+
+# Keys carry the snapshot version, so entries never go stale; the TTL only frees idle layers.
+_layer_flight = SingleFlight(ttl_seconds=3600, max_entries=MAP_CACHE_SIZE)
+
+BBox = tuple[float, float, float, float]  # min_lng, min_lat, max_lng, max_lat
+
+
+@dataclass
+class _Cluster:
+    count: int = 0
+    lat_sum: float = 0.0
+    lng_sum: float = 0.0
+    order_id: int | None = None
+
+    def add(self, order_id: int, lat: float, lng: float) -> None:
+        self.count += 1
+        self.lat_sum += lat
+        self.lng_sum += lng
+        self.order_id = order_id if self.count == 1 else None
+
+    @property
+    def centroid(self) -> tuple[float, float]:
+        return self.lat_sum / self.count, self.lng_sum / self.count
+
+
+@dataclass
+class _Layer:
+    clusters: list[OrderMapCluster] = field(default_factory=list)
+    # (line, bbox); busiest first so truncation keeps what matters most
+    lines: list[tuple[OrderMapLine, BBox]] = field(default_factory=list)
+
+
+def _cell(lat: float, lng: float, cells: int) -> tuple[int, int]:
+    """Grid cell of a point on a Web Mercator grid `cells` wide and tall."""
+    lat = max(-_MAX_MERCATOR_LAT, min(_MAX_MERCATOR_LAT, lat))
+    x = (lng + 180.0) / 360.0
+    sin_lat = math.sin(math.radians(lat))
+    y = 0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    return min(int(x * cells), cells - 1), min(int(y * cells), cells - 1)
+
+
+def _round(lng: float, lat: float) -> list[float]:
+    return [round(lng, _COORDINATE_DECIMALS), round(lat, _COORDINATE_DECIMALS)]
+
+
+def _bbox(coordinates: list[list[float]]) -> BBox:
+    lngs = [point[0] for point in coordinates]
+    lats = [point[1] for point in coordinates]
+    return min(lngs), min(lats), max(lngs), max(lats)
+
+
+def simplify_line(coordinates: list[list[float]], tolerance: float) -> list[list[float]]:
+    """Douglas-Peucker: drop points closer than `tolerance` (degrees) to the line through their neighbours."""
+    if len(coordinates) <= 2:
+        return coordinates
+    keep = [False] * len(coordinates)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(coordinates) - 1)]
+    while stack:
+        start, end = stack.pop()
+        (x1, y1), (x2, y2) = coordinates[start][:2], coordinates[end][:2]
+        dx, dy = x2 - x1, y2 - y1
+        length = math.hypot(dx, dy)
+        farthest, index = -1.0, -1
+        for i in range(start + 1, end):
+            px, py = coordinates[i][:2]
+            if length:
+                distance = abs(dy * px - dx * py + x2 * y1 - y2 * x1) / length
+            else:
+                distance = math.hypot(px - x1, py - y1)
+            if distance > farthest:
+                farthest, index = distance, i
+        if farthest > tolerance:
+            keep[index] = True
+            stack.extend([(start, index), (index, end)])
+    return [point for point, kept in zip(coordinates, keep) if kept]
+
+
+def build_layer(rows: list[tuple], zoom: int) -> _Layer:
+    """Cluster `OrderBoardSnapshot.map_rows` rows for one zoom level."""
+    cells = (2 ** zoom) * _CELLS_PER_TILE
+    origins: dict[tuple[int, int], _Cluster] = {}
+    destinations: dict[tuple[int, int], _Cluster] = {}
+    flows: dict[tuple[tuple[int, int], tuple[int, int]], int] = {}
+    routes: list[tuple[OrderMapLine, BBox]] = []
+    tolerance = 360.0 / (_TILE_PIXELS * 2 ** zoom)  # about one pixel, in degrees
+
+    for order_id, origin_lat, origin_lng, destination_lat, destination_lng, route in rows:
+        origin_cell = destination_cell = None
+        if not (math.isnan(origin_lat) or math.isnan(origin_lng)):
+            origin_cell = _cell(origin_lat, origin_lng, cells)
+            origins.setdefault(origin_cell, _Cluster()).add(order_id, origin_lat, origin_lng)
+        if not (math.isnan(destination_lat) or math.isnan(destination_lng)):
+            destination_cell = _cell(destination_lat, destination_lng, cells)
+            destinations.setdefault(destination_cell, _Cluster()).add(order_id, destination_lat, destination_lng)
+
+        if zoom >= MAP_ROUTE_MIN_ZOOM:
+            if route and len(route) >= 2:
+                simplified = [_round(point[0], point[1]) for point in simplify_line(route, tolerance)]
+                routes.append((OrderMapLine(coordinates=simplified, count=1, order_id=order_id), _bbox(simplified)))
+        elif origin_cell is not None and destination_cell is not None and origin_cell != destination_cell:
+            key = (origin_cell, destination_cell)
+            flows[key] = flows.get(key, 0) + 1
+
+    layer = _Layer()
+    for kind, clusters in (("origin", origins), ("destination", destinations)):
+        for cluster in clusters.values():
+            lat, lng = cluster.centroid
+            layer.clusters.append(
+                OrderMapCluster(
+                    kind=kind,
+                    lat=round(lat, _COORDINATE_DECIMALS),
+                    lng=round(lng, _COORDINATE_DECIMALS),
+                    count=cluster.count,
+                    order_id=cluster.order_id,
+                )
+            )
+    for (origin_cell, destination_cell), count in sorted(flows.items(), key=lambda item: -item[1]):
+        origin_lat, origin_lng = origins[origin_cell].centroid
+        destination_lat, destination_lng = destinations[destination_cell].centroid
+        coordinates = [_round(origin_lng, origin_lat), _round(destination_lng, destination_lat)]
+        layer.lines.append((OrderMapLine(coordinates=coordinates, count=count), _bbox(coordinates)))
+    layer.lines.extend(routes)
+    return layer
+
+
+def _intersects(a: BBox, b: BBox) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def order_map(bbox: BBox, zoom: int, equipment: str = "", status: str = "") -> OrderMapResponse:
+    """Clusters and lines inside `bbox` at `zoom`, optionally filtered like the board."""
+    order_board.ensure_fresh()
+    key = (order_board.version, zoom, equipment.strip().lower(), status.strip().lower())
+    layer = _layer_flight.do(key, lambda: build_layer(order_board.map_rows(equipment, status)[1], zoom))
+
+    min_lng, min_lat, max_lng, max_lat = bbox
+    clusters = [c for c in layer.clusters if min_lng <= c.lng <= max_lng and min_lat <= c.lat <= max_lat]
+    lines = [line for line, line_bbox in layer.lines if _intersects(line_bbox, bbox)]
+    return OrderMapResponse(
+        zoom=zoom,
+        clusters=clusters,
+        lines=lines[:MAP_MAX_LINES],
+        lines_truncated=len(lines) > MAP_MAX_LINES,
+    )
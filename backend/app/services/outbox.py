@@ -0,0 +1,253 @@
+"""
+Transactional outbox for order events consumed by downstream systems (TMS, billing, notifications).
+
+- Write paths call `enqueue` before committing, so an event exists exactly when its order change does.
+- `dispatch_batch` claims the oldest undelivered events (FOR UPDATE SKIP LOCKED) and hands them to
+  every sink as one batch. It marks them delivered in the same transaction. Delivery is at-least-once:
+  a crash after a sink accepted a batch but before the commit sends it again, so consumers dedupe on
+  the event `id`.
+- A failing batch is kept with its attempt count and error and retried with backoff, one event at a
+  time, so only the event a sink rejects keeps failing. After OUTBOX_MAX_ATTEMPTS it is parked
+  (`failed_at`): skipped by the dispatcher, counted by `outbox_status`, and sent again after
+  `retry_parked` (`outbox_dispatcher.py --retry-parked`). Until then later events wait behind it, so
+  one dispatcher delivers events in id order. That is not commit order across orders:
+  ids are assigned at INSERT, so a transaction can commit a lower id after a higher one went out.
+  Events of one order do arrive in commit order, since writers take the order's row lock (version
+  compare-and-swap) before enqueueing; consumers should order per order, not globally.
+- `outbox_status` reports backlog size and the age of the oldest undelivered event (delivery lag).
+"""
+import json
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Protocol
+
+import httpx
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.orm import Session
+
+from app.config import (
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_MAX_BACKOFF_SECONDS,
+    OUTBOX_POLL_SECONDS,
+    OUTBOX_WEBHOOK_TIMEOUT_SECONDS,
+)
+from app.database import SessionLocal
+from app.models import OrderOutbox
+
+logger = logging.getLogger(__name__)
+
+ORDER_CREATED = "order.created"
+ORDER_STOPS_UPDATED = "order.stops_updated"
+ORDER_STOPS_OPTIMIZED = "order.stops_optimized"
+
+_PRUNE_INTERVAL_SECONDS = 3600
+
+
+class Sink(Protocol):
+    name: str
+
+    def deliver(self, events: list[dict[str, Any]]) -> None:
+        """Deliver the whole batch or raise."""
+
+
+class WebhookSink:
+    """POSTs `{"events": [...]}`; any non-2xx response fails the batch."""
+
+    def __init__(self, url: str, timeout: float = OUTBOX_WEBHOOK_TIMEOUT_SECONDS):
+        self.name = f"webhook:{url}"
+        self.url = url
+        self._client = httpx.Client(timeout=timeout)
+
+    def deliver(self, events: list[dict[str, Any]]) -> None:
+        response = self._client.post(self.url, json={"events": events})
+        response.raise_for_status()
+
+
+class FileSink:
+    """Appends one JSON line per event and flushes before the batch counts as delivered."""
+
+    def __init__(self, path: str):
+        self.name = f"file:{path}"
+        self.path = path
+
+    def deliver(self, events: list[dict[str, Any]]) -> None:
+        with open(self.path, "a") as f:
+            f.writelines(json.dumps(event) + "\n" for event in events)
+            f.flush()
+
+
+class QueueSink:
+    """In-process stand-in for a message broker; consumers read `self.queue`."""
+
+    def __init__(self, maxsize: int = 0):
+        self.name = "queue"
+        self.queue: queue.Queue = queue.Queue(maxsize=maxsize)
+
+    def deliver(self, events: list[dict[str, Any]]) -> None:
+        for event in events:
+            self.queue.put_nowait(event)
+
+
+def build_sinks(specs: list[str]) -> list[Sink]:
+    """Sinks from OUTBOX_SINKS entries: "webhook:<url>", "file:<path>" or "queue"."""
+    sinks: list[Sink] = []
+    for spec in specs:
+        kind, _, target = spec.partition(":")
+        if kind == "webhook" and target:
+            sinks.append(WebhookSink(target))
+        elif kind == "file" and target:
+            sinks.append(FileSink(target))
+        elif kind == "queue":
+            sinks.append(QueueSink())
+        else:
+            raise ValueError(f"Unknown outbox sink: {spec!r}")
+    return sinks
+
+
+def enqueue(db: Session, order_id: int, event: str, order: dict[str, Any]) -> None:
+    """Add an event to the caller's transaction; it is only visible to the dispatcher once that commits."""
+    db.add(OrderOutbox(order_id=order_id, event=event, payload=order))
+
+
+def _message(row: OrderOutbox) -> dict[str, Any]:
+    return {
+        "id": row.id,
+        "event": row.event,
+        "order_id": row.order_id,
+        "occurred_at": row.created_at.isoformat(),
+        "order": row.payload,
+    }
+
+
+def dispatch_batch(
+    db: Session, sinks: list[Sink], batch_size: int, max_attempts: int = OUTBOX_MAX_ATTEMPTS
+) -> tuple[int, float | None]:
+    """
+    Deliver up to `batch_size` pending events to every sink. Returns (events delivered, lag in seconds
+    of the oldest one). Raises after recording the failure on the batch if a sink fails; events that
+    reach `max_attempts` failures are parked.
+    """
+    rows = list(
+        db.execute(
+            select(OrderOutbox)
+            .where(OrderOutbox.dispatched_at.is_(None), OrderOutbox.failed_at.is_(None))
+            .order_by(OrderOutbox.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).scalars()
+    )
+    if not rows:
+        db.rollback()
+        return 0, None
+    if rows[0].attempts:
+        # Retrying a failed batch: one event at a time isolates the one a sink rejects.
+        rows = rows[:1]
+    ids = [row.id for row in rows]
+    messages = [_message(row) for row in rows]
+    try:
+        for sink in sinks:
+            sink.deliver(messages)
+    except Exception as exc:
+        db.execute(
+            update(OrderOutbox)
+            .where(OrderOutbox.id.in_(ids))
+            .values(
+                attempts=OrderOutbox.attempts + 1,
+                last_error=f"{type(exc).__name__}: {exc}"[:512],
+                failed_at=case((OrderOutbox.attempts + 1 >= max_attempts, func.now()), else_=None),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        raise
+    now = datetime.now(timezone.utc)
+    lag = (now - rows[0].created_at).total_seconds()
+    db.execute(
+        update(OrderOutbox)
+        .where(OrderOutbox.id.in_(ids))
+        .values(dispatched_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return len(rows), lag
+
+
+def prune_outbox(db: Session, retention_days: float) -> int:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    result = db.execute(delete(OrderOutbox).where(OrderOutbox.dispatched_at < cutoff))
+    db.commit()
+    return result.rowcount
+
+
+def retry_parked(db: Session) -> int:
+    """Put parked events back in line with a fresh attempt count. Returns how many."""
+    result = db.execute(
+        update(OrderOutbox)
+        .where(OrderOutbox.dispatched_at.is_(None), OrderOutbox.failed_at.is_not(None))
+        .values(failed_at=None, attempts=0)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
+
+def outbox_status(db: Session) -> dict[str, Any]:
+    """
+    Backlog gauges: undelivered events, age of the oldest one (delivery lag), retries so far, and
+    events parked after OUTBOX_MAX_ATTEMPTS failures (not counted as pending).
+    """
+    pending, oldest, max_attempts = db.execute(
+        select(func.count(), func.min(OrderOutbox.created_at), func.max(OrderOutbox.attempts)).where(
+            OrderOutbox.dispatched_at.is_(None), OrderOutbox.failed_at.is_(None)
+        )
+    ).one()
+    parked = db.execute(
+        select(func.count()).where(OrderOutbox.dispatched_at.is_(None), OrderOutbox.failed_at.is_not(None))
+    ).scalar()
+    lag = (datetime.now(timezone.utc) - oldest).total_seconds() if oldest else 0.0
+    return {
+        "pending": pending,
+        "oldest_pending_seconds": round(lag, 3),
+        "max_attempts": max_attempts or 0,
+        "parked": parked,
+    }
+
+
+def run_dispatcher(
+    sinks: list[Sink],
+    batch_size: int,
+    stop: threading.Event,
+    poll_seconds: float = OUTBOX_POLL_SECONDS,
+    max_backoff_seconds: float = OUTBOX_MAX_BACKOFF_SECONDS,
+    retention_days: float | None = None,
+    on_batch: Callable[[int, float | None], None] | None = None,
+) -> None:
+    """
+    Drain the outbox until `stop` is set: back to back while there is a backlog, polling when idle.
+    Delivered events older than `retention_days` are pruned about once an hour.
+    """
+    backoff = poll_seconds
+    pruned_at: float | None = None
+    while not stop.is_set():
+        db = SessionLocal()
+        try:
+            due = pruned_at is None or time.monotonic() - pruned_at > _PRUNE_INTERVAL_SECONDS
+            if retention_days is not None and due:
+                prune_outbox(db, retention_days)
+                pruned_at = time.monotonic()
+            delivered, lag = dispatch_batch(db, sinks, batch_size)
+        except Exception as exc:
+            logger.warning("outbox delivery failed, retrying in %.1fs: %s", backoff, exc)
+            stop.wait(backoff)
+            backoff = min(backoff * 2, max_backoff_seconds)
+            continue
+        finally:
+            db.close()
+        backoff = poll_seconds
+        if delivered and on_batch is not None:
+            on_batch(delivered, lag)
+        if delivered < batch_size:
+            stop.wait(poll_seconds)
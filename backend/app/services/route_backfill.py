@@ -0,0 +1,227 @@
+"""
+Backfill missing stop coordinates and straight-line route miles on existing orders.
+
+- Candidates: orders with a stop lacking lat/lng, or whose miles are not OSRM driving distance
+  (`distance_source` NULL or 'haversine'). Rows written before `distance_source` existed are NULL and
+  get recomputed once.
+- Batches of ids (ascending) are processed by a thread pool; a shared token bucket caps how many orders
+  start per second across workers, on top of the geo gateway's retries and circuit breaker.
+- Each order is computed outside any transaction and written back only if its stops did not change
+  meanwhile, so the job can run next to live traffic.
+- After every batch the last id and counters go to a checkpoint file; a rerun resumes from it. The run
+  pauses (checkpoint kept) when the OSRM circuit opens, since further work would only yield Haversine;
+  the checkpoint then stops before the batch's first Haversine/unroutable order so a rerun retries it.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable
+
+from sqlalchemy import or_, select, union
+from sqlalchemy.orm import Session, selectinload
+
+from app.database import SessionLocal
+from app.models import Order, Stop
+from app.services.geo_gateway import geo_budget, geo_gateway
+from app.services.geometry import (
+    DISTANCE_SOURCE_OSRM,
+    compute_route_miles,
+    enrich_stops_with_coordinates,
+    stops_to_linestring,
+)
+
+logger = logging.getLogger(__name__)
+
+# Per-order outcomes counted in the checkpoint and the run summary.
+OUTCOMES = ("osrm", "haversine", "unroutable", "changed", "missing", "failed")
+
+# Outcomes an OSRM outage produces; they are not checkpointed past while the circuit is open.
+_FALLBACK_OUTCOMES = ("haversine", "unroutable")
+
+_STOP_FIELDS = ("sequence", "stop_type", "location_name", "address", "city", "state", "zip", "lat", "lng")
+
+
+class RateLimiter:
+    """Token bucket shared by worker threads: at most `rate` acquisitions per second (burst of one). 0 disables."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def acquire(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def find_backfill_candidates(db: Session, after_id: int, limit: int) -> list[int]:
+    """Next `limit` candidate order ids greater than `after_id`, ascending."""
+    not_driving = select(Order.id).where(
+        Order.id > after_id,
+        or_(Order.distance_source.is_(None), Order.distance_source != DISTANCE_SOURCE_OSRM),
+    )
+    missing_coordinates = select(Stop.order_id).where(
+        Stop.order_id > after_id,
+        or_(Stop.lat.is_(None), Stop.lng.is_(None)),
+    )
+    candidates = union(not_driving, missing_coordinates).subquery()
+    return list(db.execute(select(candidates.c[0]).order_by(candidates.c[0]).limit(limit)).scalars())
+
+
+def backfill_order(order_id: int) -> str:
+    """Geocode and re-route one order on its own session. Returns one of OUTCOMES."""
+    db = SessionLocal()
+    try:
+        order = db.query(Order).options(selectinload(Order.stops)).filter(Order.id == order_id).first()
+        if order is None:
+            return "missing"
+        version = order.version
+        stops = [Stop(**{field: getattr(s, field) for field in _STOP_FIELDS}) for s in order.stops]
+        stop_ids = [s.id for s in order.stops]
+        # No transaction (and no pooled connection) is held during geocoding/routing.
+        db.rollback()
+
+        with geo_budget():
+            enrich_stops_with_coordinates(stops)
+            total_miles, distance_source = compute_route_miles(stops)
+
+        # Locked until commit, so an edit landing now waits and then fails its version check instead.
+        order = (
+            db.query(Order)
+            .options(selectinload(Order.stops))
+            .filter(Order.id == order_id)
+            .with_for_update(of=Order)
+            .first()
+        )
+        if order is None:
+            return "missing"
+        if order.version != version:
+            return "changed"
+
+        by_id = {s.id: s for s in order.stops}
+        for stop_id, computed in zip(stop_ids, stops):
+            stored = by_id[stop_id]
+            if stored.lat is None or stored.lng is None:
+                stored.lat, stored.lng = computed.lat, computed.lng
+        if distance_source is not None:
+            order.route_geometry = stops_to_linestring(stops)
+            order.total_miles = total_miles
+            order.distance_source = distance_source
+        # Unchanged values emit no UPDATE, so an order that is still Haversine-only is not rewritten.
+        if any(db.is_modified(obj) for obj in db.dirty):
+            order.version = Order.version + 1
+        db.commit()
+        return distance_source or "unroutable"
+    except Exception:
+        db.rollback()
+        logger.exception("route backfill failed for order %s", order_id)
+        return "failed"
+    finally:
+        db.close()
+
+
+def load_checkpoint(path: str | Path) -> dict[str, Any]:
+    try:
+        with open(path) as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return {"last_id": 0, "counts": {}, "elapsed_seconds": 0.0}
+    checkpoint.setdefault("counts", {})
+    checkpoint.setdefault("elapsed_seconds", 0.0)
+    return checkpoint
+
+
+def save_checkpoint(path: str | Path, checkpoint: dict[str, Any]) -> None:
+    # Write then rename, so a crash mid-write never leaves a truncated checkpoint.
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+
+def _osrm_circuit_open() -> bool:
+    return geo_gateway.status().get("osrm", {}).get("circuit") == "open"
+
+
+def run_backfill(
+    workers: int,
+    batch_size: int,
+    rate_per_second: float,
+    checkpoint_path: str | Path,
+    restart: bool = False,
+    limit: int | None = None,
+    report: Callable[[str], None] = print,
+) -> dict[str, Any]:
+    """
+    Process candidates in id order until none are left, `limit` orders are done, or the OSRM circuit
+    opens. Returns the checkpoint plus `finished`; the checkpoint file is removed once finished.
+    """
+    checkpoint = {"last_id": 0, "counts": {}, "elapsed_seconds": 0.0} if restart else load_checkpoint(checkpoint_path)
+    counts: dict[str, int] = {outcome: checkpoint["counts"].get(outcome, 0) for outcome in OUTCOMES}
+    limiter = RateLimiter(rate_per_second)
+    processed = 0
+    started = time.monotonic()
+    finished = False
+
+    def work(order_id: int) -> str:
+        limiter.acquire()
+        return backfill_order(order_id)
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="route-backfill") as pool:
+        while True:
+            size = batch_size if limit is None else min(batch_size, limit - processed)
+            if size <= 0:
+                break
+            db = SessionLocal()
+            try:
+                order_ids = find_backfill_candidates(db, checkpoint["last_id"], size)
+            finally:
+                db.close()
+            if not order_ids:
+                finished = True
+                break
+
+            outcomes = list(pool.map(work, order_ids))
+            paused = _osrm_circuit_open()
+            last_id = order_ids[-1]
+            if paused:
+                # Orders that fell back while OSRM was down stay candidates: resume from the first of them.
+                fallback = [i for i, outcome in enumerate(outcomes) if outcome in _FALLBACK_OUTCOMES]
+                if fallback:
+                    cut = fallback[0]
+                    last_id = order_ids[cut - 1] if cut else checkpoint["last_id"]
+                    order_ids, outcomes = order_ids[:cut], outcomes[:cut]
+            for outcome in outcomes:
+                counts[outcome] += 1
+            processed += len(order_ids)
+            elapsed = time.monotonic() - started
+            checkpoint = {
+                "last_id": last_id,
+                "counts": counts,
+                "elapsed_seconds": checkpoint["elapsed_seconds"] + elapsed,
+            }
+            save_checkpoint(checkpoint_path, checkpoint)
+            started = time.monotonic()
+            total = sum(counts.values())
+            rate = total / checkpoint["elapsed_seconds"] if checkpoint["elapsed_seconds"] else 0.0
+            report(
+                f"through order {checkpoint['last_id']}: {total} processed ({rate:.1f} orders/s), "
+                + ", ".join(f"{outcome}={counts[outcome]}" for outcome in OUTCOMES)
+            )
+            if paused:
+                report("OSRM circuit is open; pausing (rerun to resume from the checkpoint).")
+                break
+
+    if finished:
+        Path(checkpoint_path).unlink(missing_ok=True)
+    return {**checkpoint, "counts": counts, "finished": finished}
@@ -0,0 +1,218 @@
+"""
+Schedule feasibility: per-stop ETAs from leg miles, speed and dwell, checked against time windows.
+
+- The clock starts at the first stop with a window, at its earliest time (or its latest when only that
+  is set); stops before it get no ETA. Each leg adds dwell at the previous stop plus
+  miles / ROUTE_AVG_SPEED_MPH. Arriving before a window's early bound waits for it.
+- Slack is the minutes between a stop's ETA and its late bound; negative slack is a window violation.
+  An order is at risk when any stop has less than SCHEDULE_MIN_SLACK_MINUTES of slack.
+- `schedule_stops` runs inline on order writes with leg miles from the route cache / OSRM and keeps
+  them in stops.leg_miles. `recompute_schedules` sweeps the whole board in id batches with those
+  stored legs, so a sweep only changes what its inputs (windows, speed, dwell, min slack) changed;
+  legs never stored are estimated from cached cells or Haversine (no network). Both store stops.eta /
+  slack_minutes and orders.at_risk / window_violations, so at-risk views filter in SQL.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import groupby
+from typing import Any, Sequence
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+
+from app.config import ROUTE_AVG_SPEED_MPH, SCHEDULE_MIN_SLACK_MINUTES, STOP_DWELL_MINUTES
+from app.models import Order, Stop
+from app.services.geometry import leg_miles
+
+Window = tuple[datetime | None, datetime | None]
+
+
+@dataclass
+class ScheduleSummary:
+    at_risk: bool
+    violations: int  # stops whose ETA is after their late bound
+
+
+def compute_schedule(
+    windows: Sequence[Window],
+    legs: Sequence[float | None],
+    avg_speed_mph: float = ROUTE_AVG_SPEED_MPH,
+    dwell_minutes: float = STOP_DWELL_MINUTES,
+) -> list[tuple[datetime | None, float | None]]:
+    """
+    (eta, slack_minutes) per stop, in sequence order. `legs[i]` is miles from stop i to stop i + 1;
+    an unknown leg (None) leaves every later ETA unknown. The clock starts at the first stop with a
+    window, as if the truck left just in time (like the stop optimizer); stops before it have no ETA.
+    """
+    dwell = timedelta(minutes=dwell_minutes)
+    started = False
+    clock: datetime | None = None
+    schedule: list[tuple[datetime | None, float | None]] = []
+    for index, (early, late) in enumerate(windows):
+        if started:
+            if clock is not None:
+                miles = legs[index - 1]
+                clock = None if miles is None else clock + dwell + timedelta(hours=miles / avg_speed_mph)
+        elif early is not None or late is not None:
+            started = True
+            clock = early or late
+        if clock is None:
+            schedule.append((None, None))
+            continue
+        slack = round((late - clock).total_seconds() / 60, 1) if late is not None else None
+        schedule.append((clock, slack))
+        if early is not None and clock < early:
+            clock = early
+    return schedule
+
+
+def summarize(schedule: Sequence[tuple[datetime | None, float | None]], min_slack_minutes: float) -> ScheduleSummary:
+    slacks = [slack for _, slack in schedule if slack is not None]
+    return ScheduleSummary(
+        at_risk=any(slack < min_slack_minutes for slack in slacks),
+        violations=sum(1 for slack in slacks if slack < 0),
+    )
+
+
+def _legs(stops: Sequence[Any], fetch_missing: bool) -> list[float | None]:
+    """Miles between consecutive stops (objects with lat/lng, in sequence order); None where one is unlocated."""
+    located = [s.lat is not None and s.lng is not None for s in stops]
+    if all(located):
+        return leg_miles([(s.lat, s.lng) for s in stops], fetch_missing)
+    return [
+        leg_miles([(a.lat, a.lng), (b.lat, b.lng)], fetch_missing)[0] if located[i] and located[i + 1] else None
+        for i, (a, b) in enumerate(zip(stops, stops[1:]))
+    ]
+
+
+def schedule_stops(
+    stops: list[Stop],
+    fetch_missing: bool = True,
+    min_slack_minutes: float = SCHEDULE_MIN_SLACK_MINUTES,
+) -> ScheduleSummary:
+    """Set `eta` and `slack_minutes` on each stop and return the order-level summary."""
+    ordered = sorted(stops, key=lambda s: s.sequence)
+    legs = _legs(ordered, fetch_missing)
+    schedule = compute_schedule([(s.scheduled_arrival_early, s.scheduled_arrival_late) for s in ordered], legs)
+    for stop, leg, (eta, slack) in zip(ordered, [None, *legs], schedule):
+        stop.leg_miles = leg
+        stop.eta = eta
+        stop.slack_minutes = slack
+    return summarize(schedule, min_slack_minutes)
+
+
+def _stored_legs(rows: Sequence[Any]) -> tuple[list[float | None], dict[int, float]]:
+    """
+    Leg miles a sweep should use: the stored ones, else an estimate from cached cells or Haversine.
+    Returns the legs and {stop id: leg} for stops whose leg is not stored yet.
+    """
+    legs: list[float | None] = []
+    missing: dict[int, float] = {}
+    for previous, row in zip(rows, rows[1:]):
+        leg = row.leg_miles
+        if leg is None:
+            leg = _legs([previous, row], fetch_missing=False)[0]
+        if leg is not None and row.leg_miles is None:
+            missing[row.id] = leg
+        legs.append(leg)
+    return legs, missing
+
+
+def _same_schedule(old: tuple[datetime | None, float | None], new: tuple[datetime | None, float | None]) -> bool:
+    """Equal up to float noise (a second of ETA, the 0.1 minute slack is rounded to)."""
+    (old_eta, old_slack), (eta, slack) = old, new
+    if (old_eta is None) != (eta is None) or (old_slack is None) != (slack is None):
+        return False
+    if eta is not None and abs((eta - old_eta).total_seconds()) > 1:
+        return False
+    return slack is None or abs(slack - old_slack) <= 0.1
+
+
+def recompute_schedules(
+    db: Session,
+    after_id: int,
+    batch_size: int,
+    min_slack_minutes: float = SCHEDULE_MIN_SLACK_MINUTES,
+) -> tuple[list[int], int]:
+    """
+    Recompute the next `batch_size` orders after `after_id` in one transaction, writing only rows whose
+    values changed. Returns (order ids processed, orders changed).
+    """
+    orders = (
+        db.query(Order.id, Order.at_risk, Order.window_violations)
+        .filter(Order.id > after_id)
+        .order_by(Order.id)
+        .limit(batch_size)
+        .with_for_update()  # edits lock the order row before touching stops, so they wait for this batch
+        .all()
+    )
+    if not orders:
+        db.rollback()
+        return [], 0
+    stop_rows = (
+        db.query(
+            Stop.id,
+            Stop.order_id,
+            Stop.lat,
+            Stop.lng,
+            Stop.scheduled_arrival_early,
+            Stop.scheduled_arrival_late,
+            Stop.eta,
+            Stop.slack_minutes,
+            Stop.leg_miles,
+        )
+        .filter(Stop.order_id.between(orders[0].id, orders[-1].id))
+        .order_by(Stop.order_id, Stop.sequence)
+        .all()
+    )
+    stops_by_order = {order_id: list(rows) for order_id, rows in groupby(stop_rows, key=lambda row: row.order_id)}
+
+    stop_updates: list[dict] = []
+    order_updates: list[dict] = []
+    changed: set[int] = set()
+    for order in orders:
+        rows = stops_by_order.get(order.id, [])
+        legs, missing_legs = _stored_legs(rows)
+        schedule = compute_schedule([(row.scheduled_arrival_early, row.scheduled_arrival_late) for row in rows], legs)
+        kept = []
+        for row, new in zip(rows, schedule):
+            same = _same_schedule((row.eta, row.slack_minutes), new)
+            eta, slack = (row.eta, row.slack_minutes) if same else new
+            kept.append((eta, slack))
+            if not same:
+                changed.add(order.id)
+            if not same or row.id in missing_legs:
+                # Storing a leg the ETA already reflects is bookkeeping, not a schedule change.
+                leg = missing_legs.get(row.id, row.leg_miles)
+                stop_updates.append({"stop_id": row.id, "new_eta": eta, "new_slack": slack, "new_leg": leg})
+        summary = summarize(kept, min_slack_minutes)
+        if (order.at_risk, order.window_violations) != (summary.at_risk, summary.violations):
+            changed.add(order.id)
+        if order.id in changed:
+            order_updates.append(
+                {"order_id": order.id, "new_at_risk": summary.at_risk, "new_violations": summary.violations}
+            )
+
+    # Core executemany so updated_at is bumped and the board snapshot picks the changes up; every changed
+    # order gets a new version, so cached reads revalidate and in-flight edits based on the old one get a 409.
+    stops_table, orders_table = Stop.__table__, Order.__table__
+    if stop_updates:
+        db.execute(
+            update(stops_table)
+            .where(stops_table.c.id == bindparam("stop_id"))
+            .values(eta=bindparam("new_eta"), slack_minutes=bindparam("new_slack"), leg_miles=bindparam("new_leg")),
+            stop_updates,
+        )
+    if order_updates:
+        db.execute(
+            update(orders_table)
+            .where(orders_table.c.id == bindparam("order_id"))
+            .values(
+                at_risk=bindparam("new_at_risk"),
+                window_violations=bindparam("new_violations"),
+                version=orders_table.c.version + 1,
+            ),
+            order_updates,
+        )
+    db.commit()
+    return [order.id for order in orders], len(changed)
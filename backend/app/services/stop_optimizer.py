@@ -0,0 +1,180 @@
+"""
+Stop-sequence optimization for multi-stop loads.
+
+- First and last stops (pickup, dropoff) stay fixed; intermediate stops are reordered.
+- Nearest-neighbor construction, then 2-opt and Or-opt local search over a precomputed miles matrix.
+- Tours are compared by (time-window violations, miles), so feasible windows always win over fewer miles.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+
+from app.config import ROUTE_AVG_SPEED_MPH, STOP_DWELL_MINUTES
+
+# Safety cap on accepted local-search moves; 25 stops converge in far fewer.
+_MAX_MOVES = 500
+# Improvements smaller than this are float noise.
+_EPSILON = 1e-9
+# Longest run of consecutive stops Or-opt relocates at once.
+_OR_OPT_SEGMENT = 3
+
+
+@dataclass
+class TourResult:
+    order: list[int]  # indexes into the input stops, first and last unchanged
+    miles: float
+    violations: int
+
+
+class _TourEvaluator:
+    def __init__(
+        self,
+        matrix: list[list[float]],
+        windows: list[tuple[datetime | None, datetime | None]],
+        avg_speed_mph: float,
+        dwell_minutes: float,
+    ):
+        self.matrix = matrix
+        self.speed = avg_speed_mph
+        self.dwell_hours = dwell_minutes / 60.0
+        # Windows as hours after the earliest bound on any stop; without any window only miles matter.
+        bounds = [bound for window in windows for bound in window if bound is not None]
+        self.windows: list[tuple[float | None, float | None]] | None = None
+        if bounds:
+            start = min(bounds)
+            self.windows = [
+                (
+                    (early - start).total_seconds() / 3600 if early is not None else None,
+                    (late - start).total_seconds() / 3600 if late is not None else None,
+                )
+                for early, late in windows
+            ]
+
+    def miles(self, order: list[int]) -> float:
+        return sum(self.matrix[a][b] for a, b in zip(order, order[1:]))
+
+    def violations(self, order: list[int]) -> int:
+        if self.windows is None:
+            return 0
+        count = 0
+        # The clock starts at the first stop in the tour that has a window, as if the truck left just in time.
+        clock: float | None = None
+        for position, index in enumerate(order):
+            if position > 0 and clock is not None:
+                clock += self.dwell_hours + self.matrix[order[position - 1]][index] / self.speed
+            early, late = self.windows[index]
+            if clock is None:
+                clock = early if early is not None else late
+                continue
+            if early is not None and clock < early:
+                clock = early
+            if late is not None and clock > late:
+                count += 1
+        return count
+
+    def cost(self, order: list[int]) -> tuple[int, float]:
+        return (self.violations(order), self.miles(order))
+
+
+def _nearest_neighbor(matrix: list[list[float]]) -> list[int]:
+    last = len(matrix) - 1
+    remaining = set(range(1, last))
+    order = [0]
+    while remaining:
+        current = order[-1]
+        nearest = min(remaining, key=lambda j: (matrix[current][j], j))
+        order.append(nearest)
+        remaining.remove(nearest)
+    order.append(last)
+    return order
+
+
+def _improve(order: list[int], evaluator: _TourEvaluator) -> list[int]:
+    """
+    First-improvement 2-opt and Or-opt until neither finds a better tour.
+
+    Each move's change in miles is computed in O(1) from prefix sums. Once the tour meets every
+    window only moves that save miles can win, so the O(n) window check runs just for those.
+    """
+    matrix = evaluator.matrix
+    best = list(order)
+    best_cost = evaluator.cost(best)
+    n = len(best)
+
+    def accept(candidate_builder, delta: float) -> bool:
+        nonlocal best, best_cost
+        if best_cost[0] == 0 and delta >= -_EPSILON:
+            return False
+        candidate = candidate_builder()
+        violations = evaluator.violations(candidate)
+        cost = (violations, best_cost[1] + delta)
+        if cost[0] < best_cost[0] or (cost[0] == best_cost[0] and delta < -_EPSILON):
+            best, best_cost = candidate, cost
+            return True
+        return False
+
+    for _ in range(_MAX_MOVES):
+        # Prefix sums of edge costs walked forward and backward, so reversed segments cost O(1).
+        forward = [0.0] * n
+        backward = [0.0] * n
+        for p in range(1, n):
+            forward[p] = forward[p - 1] + matrix[best[p - 1]][best[p]]
+            backward[p] = backward[p - 1] + matrix[best[p]][best[p - 1]]
+        if _two_opt_move(best, matrix, forward, backward, accept) or _or_opt_move(best, matrix, accept):
+            continue
+        break
+    return best
+
+
+def _two_opt_move(tour, matrix, forward, backward, accept) -> bool:
+    """Try reversing tour[i..k] within the intermediate stops."""
+    n = len(tour)
+    for i in range(1, n - 2):
+        for k in range(i + 1, n - 1):
+            before, first, last, after = tour[i - 1], tour[i], tour[k], tour[k + 1]
+            old = matrix[before][first] + (forward[k] - forward[i]) + matrix[last][after]
+            new = matrix[before][last] + (backward[k] - backward[i]) + matrix[first][after]
+            if accept(lambda: tour[:i] + tour[i : k + 1][::-1] + tour[k + 1 :], new - old):
+                return True
+    return False
+
+
+def _or_opt_move(tour, matrix, accept) -> bool:
+    """Try moving a run of 1..3 consecutive intermediate stops to another gap."""
+    n = len(tour)
+    for length in range(1, _OR_OPT_SEGMENT + 1):
+        for i in range(1, n - length):
+            head, tail = tour[i], tour[i + length - 1]
+            before, after = tour[i - 1], tour[i + length]
+            removed = matrix[before][head] + matrix[tail][after] - matrix[before][after]
+            rest = tour[:i] + tour[i + length :]
+            for j in range(1, len(rest)):
+                if j == i:
+                    continue
+                u, v = rest[j - 1], rest[j]
+                added = matrix[u][head] + matrix[tail][v] - matrix[u][v]
+                if accept(lambda: rest[:j] + tour[i : i + length] + rest[j:], added - removed):
+                    return True
+    return False
+
+
+def optimize_stop_order(
+    matrix: list[list[float]],
+    windows: list[tuple[datetime | None, datetime | None]],
+    avg_speed_mph: float = ROUTE_AVG_SPEED_MPH,
+    dwell_minutes: float = STOP_DWELL_MINUTES,
+) -> TourResult:
+    """
+    Reorder intermediate stops to minimize miles while keeping the first and last stop in place.
+
+    `matrix[i][j]` is miles from stop i to stop j in the current order; `windows[i]` is its
+    (scheduled_arrival_early, scheduled_arrival_late). The current order is always a candidate,
+    so the result is never worse than what was stored.
+    """
+    evaluator = _TourEvaluator(matrix, windows, avg_speed_mph, dwell_minutes)
+    current = list(range(len(matrix)))
+    if len(matrix) <= 3:
+        return TourResult(order=current, miles=evaluator.miles(current), violations=evaluator.violations(current))
+
+    candidates = [_improve(current, evaluator), _improve(_nearest_neighbor(matrix), evaluator)]
+    best = min(candidates, key=evaluator.cost)
+    return TourResult(order=best, miles=evaluator.miles(best), violations=evaluator.violations(best))
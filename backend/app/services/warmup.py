@@ -0,0 +1,142 @@
+"""
+Per-worker warm-up so the first real requests on a fresh worker are not the slow ones.
+
+- Steps, in order: configure ORM mappers, open pooled connections (primary and replicas), load the
+  in-memory customer index, rate tables and order board, build the OpenAPI schema, then send a few
+  in-process requests through the hot read endpoints (full middleware, validation and serialization).
+- By default it runs on a background thread after startup, so liveness (`/health`) answers at once
+  while `/ready` reports 503 until warm-up is done; point the load balancer's readiness check there.
+- A failing step is recorded and logged but does not keep the worker out of rotation: everything it
+  warms also loads lazily on first use.
+- Startup time (from app import to ready) and each step's duration are logged and reported by `/ready`.
+
+Geocoding and routing are not exercised: every worker of every deploy would call Nominatim/OSRM.
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy.orm import configure_mappers
+
+from app.config import DB_POOL_PREWARM, ORDER_BOARD_SNAPSHOT, WARMUP_REQUESTS
+from app.database import SessionLocal, engine, prewarm_pool, replica_engines
+from app.services.customer_index import customer_index
+from app.services.lane_rates import lane_rates
+from app.services.order_board import order_board
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupState:
+    """Progress of this worker's warm-up, for `/ready`."""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.ready_at: float | None = None
+        self.steps: dict[str, float] = {}
+        self.errors: dict[str, str] = {}
+        self._done = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self._done.wait(timeout)
+
+    def finish(self) -> None:
+        self.ready_at = time.monotonic()
+        self._done.set()
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "startup_seconds": round(self.ready_at - self.started_at, 3) if self.ready_at is not None else None,
+            "steps_ms": dict(self.steps),
+            "errors": dict(self.errors),
+        }
+
+
+warmup_state = WarmupState()
+
+
+def _open_pools() -> None:
+    prewarm_pool(engine, DB_POOL_PREWARM)
+    for replica_engine in replica_engines:
+        try:
+            prewarm_pool(replica_engine, DB_POOL_PREWARM)
+        except Exception:
+            # An unreachable replica must not block startup; reads fall back to the primary.
+            pass
+
+
+def _load_caches() -> None:
+    db = SessionLocal()
+    try:
+        customer_index.load(db)
+        lane_rates.load(db)
+        if ORDER_BOARD_SNAPSHOT:
+            order_board.load(db)
+    finally:
+        db.close()
+
+
+async def _exercise_endpoints(app: FastAPI, rounds: int) -> None:
+    """GET/POST the hot read endpoints in-process over ASGI; non-2xx answers are logged, not raised."""
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://warmup") as client:
+        for _ in range(rounds):
+            listed = await client.get("/orders", params={"page_size": 50})
+            items = listed.json().get("items", []) if listed.status_code == 200 else []
+            order_id = items[0]["id"] if items else None
+            responses = [
+                listed,
+                await client.get("/orders/facets"),
+                await client.get("/customers", params={"query": "a", "mode": "typeahead", "limit": 10}),
+                await client.post("/quotes", json={"order_id": order_id} if order_id else {"origin_state": "TX"}),
+            ]
+            if order_id:
+                responses.append(await client.get(f"/orders/{order_id}"))
+            for response in responses:
+                if response.status_code >= 400:
+                    request = response.request
+                    logger.warning("warm-up %s %s -> %s", request.method, request.url.path, response.status_code)
+
+
+def run_warmup(app: FastAPI, state: WarmupState = warmup_state, requests: int = WARMUP_REQUESTS) -> WarmupState:
+    """Run every step, timing each, then mark the worker ready."""
+    steps: list[tuple[str, Callable[[], Any]]] = [
+        ("mappers", configure_mappers),
+        ("pools", _open_pools),
+        ("caches", _load_caches),
+        ("openapi", app.openapi),
+    ]
+    if requests > 0:
+        steps.append(("endpoints", lambda: asyncio.run(_exercise_endpoints(app, requests))))
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as exc:
+            state.errors[name] = f"{type(exc).__name__}: {exc}"[:512]
+            logger.exception("warm-up step %s failed", name)
+        state.steps[name] = round((time.perf_counter() - started) * 1000, 1)
+    state.finish()
+    logger.info(
+        "worker ready in %.2fs (%s)",
+        state.ready_at - state.started_at,
+        ", ".join(f"{name} {ms:.0f}ms" for name, ms in state.steps.items()),
+    )
+    return state
+
+
+def start_warmup(app: FastAPI, background: bool, state: WarmupState = warmup_state) -> None:
+    """Warm up on a thread (it runs its own event loop for the requests); without `background`, wait for it."""
+    thread = threading.Thread(target=run_warmup, args=(app, state), name="warmup", daemon=True)
+    thread.start()
+    if not background:
+        thread.join()
@@ -0,0 +1,15 @@
+"""
+Deterministic local stand-in for the Nominatim and OSRM endpoints the backend calls.
+
+- `GET /search` geocodes "City, ST" (or any query containing it) from a fixture of places.
+- `GET /route/v1/driving/{coords}` and `GET /table/v1/driving/{coords}` answer Haversine distance
+  times the fixture's road factor, so the same stops always get the same miles.
+- Injected latency, error rate and timeouts are set by GEO_STANDIN_* env vars or at runtime with
+  `PUT /_standin/faults`; draws come from a seeded RNG so a run can be repeated.
+
+Run: python -m geo_standin --port 8081, then set NOMINATIM_SEARCH_URL=http://localhost:8081/search
+and OSRM_BASE_URL=http://localhost:8081 for the backend.
+"""
+from geo_standin.server import FaultSettings, create_app
+
+__all__ = ["FaultSettings", "create_app"]
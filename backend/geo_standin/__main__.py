@@ -0,0 +1,40 @@
+"""
+Serve the geo stand-in. Fault settings come from GEO_STANDIN_* env vars or the flags below.
+Run: python -m geo_standin --port 8081 --latency-ms 50 --error-rate 0.05
+"""
+import argparse
+
+import uvicorn
+
+from geo_standin.server import FaultSettings, create_app
+
+
+def main():
+    defaults = FaultSettings.from_env()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--fixture", default=None, help="places JSON (default: geo_standin/places.json)")
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=defaults.jitter_ms)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--error-status", type=int, default=defaults.error_status)
+    parser.add_argument("--timeout-rate", type=float, default=defaults.timeout_rate)
+    parser.add_argument("--timeout-seconds", type=float, default=defaults.timeout_seconds)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args()
+
+    faults = FaultSettings(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        timeout_rate=args.timeout_rate,
+        timeout_seconds=args.timeout_seconds,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(faults, args.fixture), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
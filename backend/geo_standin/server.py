@@ -0,0 +1,185 @@
+import asyncio
+import json
+import math
+import os
+import random
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+DEFAULT_FIXTURE = Path(__file__).with_name("places.json")
+EARTH_RADIUS_METERS = 6371008.8
+METERS_PER_MILE = 1609.344
+
+# Every endpoint except the control ones goes through fault injection.
+_CONTROL_PREFIX = "/_standin"
+
+
+@dataclass
+class FaultSettings:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0  # uniform extra latency in [0, jitter_ms)
+    error_rate: float = 0.0  # share of requests answered with `error_status`
+    error_status: int = 503
+    timeout_rate: float = 0.0  # share of requests held for `timeout_seconds`, then answered 504
+    timeout_seconds: float = 30.0
+    seed: int = 0
+
+    @classmethod
+    def from_env(cls) -> "FaultSettings":
+        return cls(
+            latency_ms=float(os.getenv("GEO_STANDIN_LATENCY_MS", "0")),
+            jitter_ms=float(os.getenv("GEO_STANDIN_JITTER_MS", "0")),
+            error_rate=float(os.getenv("GEO_STANDIN_ERROR_RATE", "0")),
+            error_status=int(os.getenv("GEO_STANDIN_ERROR_STATUS", "503")),
+            timeout_rate=float(os.getenv("GEO_STANDIN_TIMEOUT_RATE", "0")),
+            timeout_seconds=float(os.getenv("GEO_STANDIN_TIMEOUT_SECONDS", "30")),
+            seed=int(os.getenv("GEO_STANDIN_SEED", "0")),
+        )
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _distance_meters(a: tuple[float, float], b: tuple[float, float], road_factor: float) -> float:
+    """Great-circle meters between (lng, lat) points, stretched by the road factor."""
+    lng1, lat1 = map(math.radians, a)
+    lng2, lat2 = map(math.radians, b)
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(min(1.0, math.sqrt(h))) * road_factor
+
+
+def _parse_coordinates(raw: str) -> list[tuple[float, float]] | None:
+    """OSRM "lng,lat;lng,lat;..." -> [(lng, lat)]; None when malformed or fewer than two points."""
+    points: list[tuple[float, float]] = []
+    for pair in raw.split(";"):
+        try:
+            lng, lat = (float(part) for part in pair.split(","))
+        except ValueError:
+            return None
+        if not (-180 <= lng <= 180 and -90 <= lat <= 90):
+            return None
+        points.append((lng, lat))
+    return points if len(points) >= 2 else None
+
+
+def _parse_indexes(raw: str | None, count: int) -> list[int] | None:
+    if raw is None or raw == "all":
+        return list(range(count))
+    try:
+        indexes = [int(part) for part in raw.split(";")]
+    except ValueError:
+        return None
+    return indexes if all(0 <= i < count for i in indexes) else None
+
+
+def _invalid(message: str) -> JSONResponse:
+    return JSONResponse({"code": "InvalidQuery", "message": message}, status_code=400)
+
+
+def create_app(faults: FaultSettings | None = None, fixture_path: str | Path | None = None) -> FastAPI:
+    fixture = json.loads(Path(fixture_path or os.getenv("GEO_STANDIN_FIXTURE") or DEFAULT_FIXTURE).read_text())
+    places = {_normalize(name): (float(lat), float(lng)) for name, (lat, lng) in fixture["places"].items()}
+    road_factor = float(fixture.get("road_factor", 1.0))
+    meters_per_second = float(fixture.get("speed_mph", 50)) * METERS_PER_MILE / 3600
+
+    app = FastAPI(title="Geo stand-in")
+    state: dict[str, Any] = {"faults": faults or FaultSettings.from_env()}
+    state["rng"] = random.Random(state["faults"].seed)
+    stats = {"requests": 0, "errors": 0, "timeouts": 0}
+    lock = threading.Lock()
+
+    @app.middleware("http")
+    async def inject_faults(request: Request, call_next):
+        if request.url.path.startswith(_CONTROL_PREFIX):
+            return await call_next(request)
+        with lock:
+            settings: FaultSettings = state["faults"]
+            rng: random.Random = state["rng"]
+            stats["requests"] += 1
+            delay = settings.latency_ms + rng.random() * settings.jitter_ms
+            draw = rng.random()
+            timeout = draw < settings.timeout_rate
+            error = not timeout and draw < settings.timeout_rate + settings.error_rate
+            stats["timeouts"] += timeout
+            stats["errors"] += error
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        if timeout:
+            await asyncio.sleep(settings.timeout_seconds)
+            return JSONResponse({"code": "Timeout"}, status_code=504)
+        if error:
+            return JSONResponse({"code": "InjectedError"}, status_code=settings.error_status)
+        return await call_next(request)
+
+    @app.get("/search")
+    async def search(q: str = "", limit: int = 1):
+        """Nominatim-shaped results: the first fixture place named by the query or by two adjacent parts of it."""
+        parts = [_normalize(part) for part in q.split(",") if part.strip()]
+        candidates = [", ".join(parts)] + [f"{a}, {b}" for a, b in zip(parts, parts[1:])]
+        for name in candidates:
+            if name in places:
+                lat, lng = places[name]
+                return [{"lat": str(lat), "lon": str(lng), "display_name": name.title()}][: max(limit, 0)]
+        return []
+
+    @app.get("/route/v1/driving/{coordinates}")
+    async def route(coordinates: str):
+        points = _parse_coordinates(coordinates)
+        if points is None:
+            return _invalid("Expected at least two lng,lat pairs")
+        distance = sum(_distance_meters(a, b, road_factor) for a, b in zip(points, points[1:]))
+        return {
+            "code": "Ok",
+            "routes": [{"distance": round(distance, 1), "duration": round(distance / meters_per_second, 1)}],
+        }
+
+    @app.get("/table/v1/driving/{coordinates}")
+    async def table(
+        coordinates: str,
+        sources: str | None = None,
+        destinations: str | None = None,
+        annotations: str = "duration",
+    ):
+        points = _parse_coordinates(coordinates)
+        if points is None:
+            return _invalid("Expected at least two lng,lat pairs")
+        source_indexes = _parse_indexes(sources, len(points))
+        destination_indexes = _parse_indexes(destinations, len(points))
+        if source_indexes is None or destination_indexes is None:
+            return _invalid("Source or destination index out of range")
+        distances = [
+            [round(_distance_meters(points[i], points[j], road_factor), 1) for j in destination_indexes]
+            for i in source_indexes
+        ]
+        payload: dict[str, Any] = {"code": "Ok"}
+        requested = annotations.split(",")
+        if "distance" in requested:
+            payload["distances"] = distances
+        if "duration" in requested:
+            payload["durations"] = [[round(d / meters_per_second, 1) for d in row] for row in distances]
+        return payload
+
+    @app.get(f"{_CONTROL_PREFIX}/faults")
+    async def get_faults():
+        return asdict(state["faults"])
+
+    @app.put(f"{_CONTROL_PREFIX}/faults")
+    async def put_faults(body: dict[str, Any]):
+        """Replace fault settings (omitted fields keep their values) and reseed the RNG."""
+        with lock:
+            updated = FaultSettings(**{**asdict(state["faults"]), **body})
+            state["faults"] = updated
+            state["rng"] = random.Random(updated.seed)
+        return asdict(updated)
+
+    @app.get(f"{_CONTROL_PREFIX}/stats")
+    async def get_stats():
+        return dict(stats)
+
+    return app
@@ -0,0 +1,33 @@
+"""
+Move finished orders (ARCHIVE_STATUSES) not updated for ARCHIVE_AFTER_DAYS into orders_archive/stops_archive.
+Works in ARCHIVE_BATCH_SIZE transactions so the hot tables are never locked for long; safe to rerun.
+Run periodically (e.g. nightly cron): docker compose exec backend python scripts/archive_orders.py
+"""
+import sys
+from pathlib import Path
+
+# Ensure app is on path when run as script
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.config import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, ARCHIVE_STATUSES
+from app.database import SessionLocal
+from app.services.order_archive import archive_orders
+
+
+def main():
+    db = SessionLocal()
+    total = 0
+    try:
+        while True:
+            moved = archive_orders(db, ARCHIVE_AFTER_DAYS, ARCHIVE_STATUSES, ARCHIVE_BATCH_SIZE)
+            if not moved:
+                break
+            total += moved
+            print(f"Archived {total} orders so far...")
+    finally:
+        db.close()
+    print(f"Archived {total} orders ({', '.join(ARCHIVE_STATUSES)}; untouched for {ARCHIVE_AFTER_DAYS:g} days).")
+
+
+if __name__ == "__main__":
+    main()
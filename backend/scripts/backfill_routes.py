@@ -0,0 +1,44 @@
+"""
+Geocode stops missing lat/lng and recompute route miles for orders whose miles are not OSRM driving
+distance (Haversine fallback, or computed before distance_source was recorded).
+Runs BACKFILL_WORKERS threads under a shared BACKFILL_RATE_PER_SECOND cap and checkpoints after each
+batch, so it can be stopped at any time and rerun to resume.
+Run: docker compose exec backend python scripts/backfill_routes.py [--workers N] [--rate R] [--limit N] [--restart]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Ensure app is on path when run as script
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.config import BACKFILL_BATCH_SIZE, BACKFILL_CHECKPOINT_PATH, BACKFILL_RATE_PER_SECOND, BACKFILL_WORKERS
+from app.services.route_backfill import run_backfill
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE)
+    parser.add_argument("--rate", type=float, default=BACKFILL_RATE_PER_SECOND, help="orders started per second (0 = no cap)")
+    parser.add_argument("--checkpoint", default=BACKFILL_CHECKPOINT_PATH)
+    parser.add_argument("--limit", type=int, default=None, help="stop after this many orders")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start from the first order")
+    args = parser.parse_args()
+
+    result = run_backfill(
+        workers=args.workers,
+        batch_size=args.batch_size,
+        rate_per_second=args.rate,
+        checkpoint_path=args.checkpoint,
+        restart=args.restart,
+        limit=args.limit,
+    )
+    total = sum(result["counts"].values())
+    rate = total / result["elapsed_seconds"] if result["elapsed_seconds"] else 0.0
+    state = "Finished" if result["finished"] else f"Paused after order {result['last_id']} (checkpoint kept)"
+    print(f"{state}: {total} orders in {result['elapsed_seconds']:.1f}s ({rate:.1f} orders/s).")
+
+
+if __name__ == "__main__":
+    main()
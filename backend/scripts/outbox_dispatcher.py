@@ -0,0 +1,50 @@
+"""
+Deliver order events from the order_outbox table to OUTBOX_SINKS (webhook / JSON-lines file / queue stand-in).
+At-least-once: consumers dedupe on the event id. Run one instance to keep each order's events in order.
+Long-running; stop with Ctrl+C: docker compose exec backend python scripts/outbox_dispatcher.py
+Events parked after OUTBOX_MAX_ATTEMPTS failures are sent again once you pass --retry-parked.
+"""
+import argparse
+import signal
+import sys
+import threading
+from pathlib import Path
+
+# Ensure app is on path when run as script
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.config import OUTBOX_BATCH_SIZE, OUTBOX_RETENTION_DAYS, OUTBOX_SINKS
+from app.database import SessionLocal
+from app.services.outbox import build_sinks, retry_parked, run_dispatcher
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--retry-parked", action="store_true", help="put parked events back in line before starting")
+    args = parser.parse_args()
+
+    sinks = build_sinks(OUTBOX_SINKS)
+    if args.retry_parked:
+        db = SessionLocal()
+        try:
+            print(f"Retrying {retry_parked(db)} parked events.")
+        finally:
+            db.close()
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    totals = {"delivered": 0}
+
+    def report(delivered: int, lag: float | None) -> None:
+        totals["delivered"] += delivered
+        print(f"Delivered {delivered} events (lag {lag or 0:.1f}s); {totals['delivered']} so far.")
+
+    print(f"Dispatching order events to {', '.join(sink.name for sink in sinks)}...")
+    try:
+        run_dispatcher(sinks, OUTBOX_BATCH_SIZE, stop, retention_days=OUTBOX_RETENTION_DAYS, on_batch=report)
+    except KeyboardInterrupt:
+        pass
+    print(f"Stopped after delivering {totals['delivered']} events.")
+
+
+if __name__ == "__main__":
+    main()
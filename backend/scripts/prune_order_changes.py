@@ -0,0 +1,27 @@
+"""
+Delete order change-feed rows older than ORDER_CHANGES_RETENTION_DAYS.
+Clients holding an older token get 410 from GET /orders/changes and resync from GET /orders.
+Run periodically (e.g. daily cron): docker compose exec backend python scripts/prune_order_changes.py
+"""
+import sys
+from pathlib import Path
+
+# Ensure app is on path when run as script
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.config import ORDER_CHANGES_RETENTION_DAYS
+from app.database import SessionLocal
+from app.services.order_changes import prune_order_changes
+
+
+def main():
+    db = SessionLocal()
+    try:
+        removed = prune_order_changes(db, ORDER_CHANGES_RETENTION_DAYS)
+        print(f"Removed {removed} order change rows older than {ORDER_CHANGES_RETENTION_DAYS} days.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
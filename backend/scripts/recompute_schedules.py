@@ -0,0 +1,40 @@
+"""
+Recompute stop ETAs/slack and order at_risk flags for every order (schedule feasibility).
+Reuses the leg miles stored when each order was routed (Haversine only for legs never stored), never the
+network; writes only rows whose values changed.
+Run after changing ROUTE_AVG_SPEED_MPH / STOP_DWELL_MINUTES / SCHEDULE_MIN_SLACK_MINUTES, or periodically:
+docker compose exec backend python scripts/recompute_schedules.py
+"""
+import sys
+import time
+from pathlib import Path
+
+# Ensure app is on path when run as script
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.config import SCHEDULE_BATCH_SIZE
+from app.database import SessionLocal
+from app.services.schedule import recompute_schedules
+
+
+def main():
+    db = SessionLocal()
+    last_id = 0
+    processed = changed = 0
+    started = time.monotonic()
+    try:
+        while True:
+            order_ids, batch_changed = recompute_schedules(db, last_id, SCHEDULE_BATCH_SIZE)
+            if not order_ids:
+                break
+            last_id = order_ids[-1]
+            processed += len(order_ids)
+            changed += batch_changed
+            print(f"Checked {processed} orders ({changed} changed) through order {last_id}...")
+    finally:
+        db.close()
+    print(f"Recomputed schedules for {processed} orders in {time.monotonic() - started:.1f}s; {changed} changed.")
+
+
+if __name__ == "__main__":
+    main()
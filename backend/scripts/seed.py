@@ -13,7 +13,7 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 from app.database import SessionLocal
 from app.models import Customer, Order, Stop
-from app.services.geometry import stops_to_linestring, compute_total_miles
+from app.services.geometry import stops_to_linestring, compute_route_miles
 
 
 def seed():
@@ -143,7 +143,7 @@ def seed():
             # Reload stops for this order to build geometry and total_miles
             stops_for_order = db.query(Stop).filter(Stop.order_id == order.id).order_by(Stop.sequence).all()
             order.route_geometry = stops_to_linestring(stops_for_order)
-            order.total_miles = compute_total_miles(stops_for_order)
+            order.total_miles, order.distance_source = compute_route_miles(stops_for_order)
             db.add(order)
 
         db.commit()
@@ -0,0 +1,179 @@
+"""
+Shared test fixtures.
+
+- The geo stand-in runs for the whole session, so geocoding and routing never leave the machine.
+- Under pytest-xdist each worker migrates and uses its own schema (DATABASE_SCHEMA=test_<worker>).
+- `db` / `api` / `customer` run a test inside one connection-level transaction that is rolled back
+  afterwards. Every session the app opens (request dependencies, idempotency, archive, outbox) joins
+  it through a SAVEPOINT, so commits behave as usual but leave nothing behind and need no cleanup.
+- Tests that need real commits are marked `commits` (`pytest -m "not commits"` skips them). They cover
+  LISTEN/NOTIFY, the change feed and archive, the pooled-connection check, query plans, long
+  transactions and concurrent workers. They commit through `tests.test_orders.client` and delete their
+  `TEST_%` rows by name.
+
+Upstream URLs and the schema are set before `app` is imported, since app.config reads them at import time.
+"""
+import os
+import socket
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+import uvicorn
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+GEO_STANDIN_PORT = _free_port()
+GEO_STANDIN_URL = f"http://127.0.0.1:{GEO_STANDIN_PORT}"
+os.environ["NOMINATIM_SEARCH_URL"] = f"{GEO_STANDIN_URL}/search"
+os.environ["OSRM_BASE_URL"] = GEO_STANDIN_URL
+
+XDIST_WORKER = os.getenv("PYTEST_XDIST_WORKER")
+if XDIST_WORKER:
+    os.environ["DATABASE_SCHEMA"] = f"test_{XDIST_WORKER}"
+
+from fastapi import Request  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from app.config import DATABASE_SCHEMA  # noqa: E402
+from app.database import SessionLocal, engine, get_db, get_lazy_read_db, get_read_db  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Customer  # noqa: E402
+from app.services.customer_index import customer_index  # noqa: E402
+from app.services.lane_rates import lane_rates  # noqa: E402
+from app.services.order_board import order_board  # noqa: E402
+from app.services.order_facets import _facets_cache  # noqa: E402
+from geo_standin import FaultSettings, create_app  # noqa: E402
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "commits: commits for real outside the rolled-back fixtures; cleans up after itself")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def worker_schema():
+    """Give this xdist worker a freshly migrated schema of its own; the main run uses the database as is."""
+    if not DATABASE_SCHEMA:
+        yield None
+        return
+    with engine.begin() as conn:
+        conn.execute(text(f'DROP SCHEMA IF EXISTS "{DATABASE_SCHEMA}" CASCADE'))
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        cwd=BACKEND_DIR,
+        check=True,
+        capture_output=True,
+    )
+    yield DATABASE_SCHEMA
+
+
+@pytest.fixture(scope="session", autouse=True)
+def geo_standin():
+    server = uvicorn.Server(
+        uvicorn.Config(create_app(FaultSettings()), host="127.0.0.1", port=GEO_STANDIN_PORT, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("geo stand-in failed to start")
+        threading.Event().wait(0.01)
+    yield GEO_STANDIN_URL
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+def _reload_in_memory_state() -> None:
+    """Drop rows a rolled-back test left in the per-process snapshots and caches."""
+    _facets_cache.clear()
+    db = SessionLocal()
+    try:
+        if order_board.loaded:
+            order_board.load(db)
+        if customer_index.loaded:
+            customer_index.load(db)
+        if lane_rates.loaded:
+            lane_rates.load(db)
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def db():
+    """Session inside a transaction rolled back after the test; SessionLocal joins it meanwhile."""
+    connection = engine.connect()
+    outer = connection.begin()
+    saved = dict(SessionLocal.kw)
+    SessionLocal.configure(bind=connection, join_transaction_mode="create_savepoint")
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        SessionLocal.kw.clear()
+        SessionLocal.kw.update(saved)
+        outer.rollback()
+        connection.close()
+        _reload_in_memory_state()
+
+
+@pytest.fixture
+def api(db):
+    """TestClient whose requests use sessions inside the test transaction."""
+
+    def override_get_db(request: Request):
+        request.state.db_write = True
+        session = SessionLocal()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    def override_get_read_db():
+        session = SessionLocal()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    def override_get_lazy_read_db():
+        session = SessionLocal()
+        try:
+            yield lambda: session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_read_db
+    app.dependency_overrides[get_lazy_read_db] = override_get_lazy_read_db
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_read_db, None)
+        app.dependency_overrides.pop(get_lazy_read_db, None)
+
+
+@pytest.fixture
+def customer(db) -> Customer:
+    customer = Customer(
+        name="TEST_Customer",
+        mc_number="MC-TEST",
+        city="TestCity",
+        state="TS",
+        phone="555-0000",
+        email="test@example.com",
+    )
+    db.add(customer)
+    db.commit()
+    return customer
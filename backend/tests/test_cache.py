@@ -0,0 +1,50 @@
+import threading
+import time
+
+from app.services.cache import SingleFlight, TTLCache
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flight = SingleFlight(ttl_seconds=60)
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return 42.0
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", slow))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == [42.0] * 8
+    assert len(calls) == 1
+    assert flight.do("k", slow) == 42.0
+    assert len(calls) == 1
+
+
+def test_single_flight_skips_uncacheable_results():
+    flight = SingleFlight(ttl_seconds=60, cacheable=lambda value: value is not None)
+    calls = []
+
+    def unresolved():
+        calls.append(1)
+        return None
+
+    assert flight.do("k", unresolved) is None
+    assert flight.do("k", unresolved) is None
+    assert len(calls) == 2
+
+
+def test_ttl_cache_expires_and_evicts():
+    cache = TTLCache(ttl_seconds=0.05, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+    assert cache.get("a") is None
+    assert cache.get("c") == 3
+    time.sleep(0.06)
+    assert cache.get("c") is None
@@ -0,0 +1,47 @@
+from app.models import Customer
+from app.services.customer_index import CustomerPrefixIndex
+
+
+def _index_with(*customers: Customer) -> CustomerPrefixIndex:
+    index = CustomerPrefixIndex()
+    for customer in customers:
+        index.upsert(customer)
+    return index
+
+
+def test_typeahead_ranks_name_prefix_before_word_and_mc_matches():
+    index = _index_with(
+        Customer(id=1, name="Champion Brands LLC", mc_number="MC-1006"),
+        Customer(id=2, name="ABC Distribution", mc_number="MC-1005"),
+        Customer(id=3, name="Best Champ Co", mc_number="MC-2000"),
+    )
+
+    assert [c.id for c in index.search("champ")] == [1, 3]
+    assert [c.id for c in index.search("abc dist")] == [2]
+    assert [c.id for c in index.search("1005")] == [2]
+    assert [c.id for c in index.search("mc-10")] == [2, 1]
+    assert index.search("zzz") == []
+    assert [c.id for c in index.search("", limit=2)] == [2, 3]
+
+
+def test_typeahead_upsert_replaces_stale_tokens():
+    index = _index_with(Customer(id=1, name="Old Name", mc_number=None))
+    index.upsert(Customer(id=1, name="New Name", mc_number=None))
+
+    assert index.search("old") == []
+    assert [c.name for c in index.search("new")] == ["New Name"]
+    assert len(index) == 1
+
+
+def test_refresh_reads_only_the_delta_and_advances_the_watermark(db, customer):
+    index = CustomerPrefixIndex()
+    index.load(db)
+    assert [c.id for c in index.search("test_cust")] == [customer.id]
+    # Inside the test transaction now() stays put, so only rows written in it are re-read.
+    assert index.refresh(db) == 1
+
+    customer.name = "TEST_Renamed"
+    db.commit()
+    assert index.refresh(db) == 1
+    assert index.search("test_cust") == []
+    assert [c.id for c in index.search("test_renamed")] == [customer.id]
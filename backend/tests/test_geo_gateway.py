@@ -0,0 +1,93 @@
+import httpx
+import pytest
+
+from app.services import geo_gateway as gateway_module
+from app.services.geo_gateway import CircuitBreaker, GeoGateway
+
+
+def _gateway_with(handler) -> GeoGateway:
+    gateway = GeoGateway()
+    gateway._client = httpx.Client(transport=httpx.MockTransport(handler))
+    return gateway
+
+
+def test_gateway_retries_then_opens_circuit(monkeypatch):
+    monkeypatch.setattr(gateway_module, "GEO_MAX_RETRIES", 1)
+    monkeypatch.setattr(gateway_module, "GEO_RETRY_BACKOFF_SECONDS", 0.0)
+    calls = []
+
+    def handler(request):
+        calls.append(request.url)
+        return httpx.Response(503)
+
+    gateway = _gateway_with(handler)
+    gateway._breakers["osrm"] = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+    gateway._stats["osrm"] = gateway_module.UpstreamStats()
+
+    assert gateway.get_json("osrm", "http://osrm.test/route") is None
+    assert gateway.get_json("osrm", "http://osrm.test/route") is None
+    assert len(calls) == 4
+
+    # Circuit is open: no further upstream calls.
+    assert gateway.get_json("osrm", "http://osrm.test/route") is None
+    assert len(calls) == 4
+    status = gateway.status()["osrm"]
+    assert status["circuit"] == "open"
+    assert status["failures"] == 4
+    assert status["retries"] == 2
+    assert status["short_circuited"] == 1
+
+
+def test_gateway_returns_json_and_ignores_client_errors():
+    def handler(request):
+        if request.url.path == "/bad":
+            return httpx.Response(400, json={"code": "InvalidQuery"})
+        return httpx.Response(200, json=[{"lat": "1", "lon": "2"}])
+
+    gateway = _gateway_with(handler)
+    assert gateway.get_json("nominatim", "http://nominatim.test/search") == [{"lat": "1", "lon": "2"}]
+    assert gateway.get_json("nominatim", "http://nominatim.test/bad") is None
+    assert gateway.status()["nominatim"]["circuit"] == "closed"
+
+
+def test_undecodable_body_during_half_open_trial_reopens_instead_of_wedging(monkeypatch):
+    monkeypatch.setattr(gateway_module, "GEO_MAX_RETRIES", 1)
+    calls = []
+
+    def handler(request):
+        calls.append(request.url)
+        if len(calls) == 1:
+            raise httpx.DecodingError("Error -3 while decompressing data", request=request)
+        return httpx.Response(200, json={"code": "Ok"})
+
+    gateway = _gateway_with(handler)
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.0)
+    breaker.record_failure()
+    gateway._breakers["osrm"] = breaker
+    gateway._stats["osrm"] = gateway_module.UpstreamStats()
+    assert breaker.state == "half_open"
+
+    assert gateway.get_json("osrm", "http://osrm.test/route") is None
+    assert len(calls) == 1  # not retried
+    assert not breaker._trial_in_flight
+    assert "DecodingError" in gateway.status()["osrm"]["last_error"]
+
+    # The next half-open trial goes through and closes the circuit.
+    assert gateway.get_json("osrm", "http://osrm.test/route") == {"code": "Ok"}
+    assert breaker.state == "closed"
+
+
+def test_unexpected_error_releases_the_half_open_trial():
+    def handler(request):
+        raise RuntimeError("bug in a transport")
+
+    gateway = _gateway_with(handler)
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.0)
+    breaker.record_failure()
+    gateway._breakers["osrm"] = breaker
+    gateway._stats["osrm"] = gateway_module.UpstreamStats()
+
+    with pytest.raises(RuntimeError):
+        gateway.get_json("osrm", "http://osrm.test/route")
+    assert not breaker._trial_in_flight
+    assert breaker.allow()
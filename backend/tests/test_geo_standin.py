@@ -0,0 +1,66 @@
+import httpx
+from fastapi.testclient import TestClient
+
+from app.services import geometry
+from geo_standin import FaultSettings, create_app
+
+
+def test_standin_answers_geocode_and_routes_from_the_fixture():
+    standin = TestClient(create_app(FaultSettings()))
+
+    exact = standin.get("/search", params={"q": "Columbus, OH"}).json()
+    address = standin.get("/search", params={"q": "3200 Industrial Pkwy, Columbus, OH, 43215"}).json()
+    assert exact == address
+    assert (float(exact[0]["lat"]), float(exact[0]["lon"])) == (39.9612, -82.9988)
+    assert standin.get("/search", params={"q": "Nowhere, ZZ"}).json() == []
+
+    coordinates = "-81.6944,41.4993;-82.9988,39.9612;-84.1916,39.7589"
+    route = standin.get(f"/route/v1/driving/{coordinates}").json()
+    assert route == standin.get(f"/route/v1/driving/{coordinates}").json()
+    miles = route["routes"][0]["distance"] * geometry.METERS_TO_MILES
+    straight = geometry.haversine_miles(41.4993, -81.6944, 39.9612, -82.9988) + geometry.haversine_miles(
+        39.9612, -82.9988, 39.7589, -84.1916
+    )
+    assert abs(miles - straight * 1.2) < 0.01
+
+    table = standin.get(
+        f"/table/v1/driving/{coordinates}", params={"sources": "0;1", "destinations": "2", "annotations": "distance"}
+    ).json()
+    assert len(table["distances"]) == 2 and len(table["distances"][0]) == 1
+    assert "durations" not in table
+    assert standin.get("/route/v1/driving/-81.69,41.49").status_code == 400
+
+
+def test_injected_errors_follow_the_seed_and_timeouts_answer_504():
+    def statuses(seed: int) -> list[int]:
+        standin = TestClient(create_app(FaultSettings(error_rate=0.5, seed=seed)))
+        return [standin.get("/search", params={"q": "Dayton, OH"}).status_code for _ in range(20)]
+
+    first = statuses(7)
+    assert first == statuses(7)
+    assert set(first) == {200, 503}
+
+    standin = TestClient(create_app(FaultSettings()))
+    assert standin.put("/_standin/faults", json={"timeout_rate": 1.0, "timeout_seconds": 0.01}).status_code == 200
+    assert standin.get("/route/v1/driving/-81.69,41.49;-83.0,39.96").status_code == 504
+    assert standin.get("/_standin/stats").json() == {"requests": 1, "errors": 0, "timeouts": 1}
+
+
+def test_orders_geocode_and_route_through_the_session_standin(api, customer, geo_standin):
+    res = api.post(
+        "/orders",
+        json={
+            "customer_id": customer.id,
+            "trailer_type": "Dry Van",
+            "stops": [
+                {"stop_type": "pickup", "city": "Toledo", "state": "OH", "sequence": 1},
+                {"stop_type": "dropoff", "city": "Louisville", "state": "KY", "sequence": 2},
+            ],
+        },
+    )
+    assert res.status_code == 201, res.text
+    body = res.json()
+    assert (body["stops"][0]["lat"], body["stops"][0]["lng"]) == (41.6528, -83.5379)
+    assert body["distance_source"] == "osrm"
+    route = httpx.get(f"{geo_standin}/route/v1/driving/-83.5379,41.6528;-85.7585,38.2527").json()
+    assert body["total_miles"] == round(route["routes"][0]["distance"] * geometry.METERS_TO_MILES, 2)
@@ -0,0 +1,56 @@
+from app.routers import routing as routing_router
+from app.services import geometry
+
+
+def test_distance_matrix_caches_osrm_cells_and_falls_back_per_cell(monkeypatch):
+    geometry._matrix_cell_cache.clear()
+    requested = []
+
+    def fake_table(origins, destinations):
+        requested.append((list(origins), list(destinations)))
+        # OSRM cannot route to the second destination.
+        return [[100.0, None] for _ in origins]
+
+    monkeypatch.setattr(geometry, "_osrm_table_miles", fake_table)
+    origins = [(40.0, -80.0), (41.0, -81.0)]
+    destinations = [(42.0, -82.0), (43.0, -83.0)]
+
+    miles, sources = geometry.distance_matrix_miles(origins, destinations)
+    assert [row[0] for row in miles] == [100.0, 100.0]
+    assert sources == [["osrm", "haversine"], ["osrm", "haversine"]]
+    expected = geometry.haversine_miles(40.0, -80.0, 43.0, -83.0)
+    assert abs(miles[0][1] - expected) < 0.01
+
+    requested.clear()
+    miles_again, _ = geometry.distance_matrix_miles(origins, destinations[:1])
+    assert requested == []
+    assert miles_again == [[100.0], [100.0]]
+
+
+def test_osrm_table_sends_each_distinct_point_once(monkeypatch):
+    requests = []
+
+    def fake_get_json(upstream, url, params=None, headers=None):
+        requests.append((url, params))
+        sources = params["sources"].split(";")
+        destinations = params["destinations"].split(";")
+        return {"code": "Ok", "distances": [[1609.344 * (int(d) - int(s)) for d in destinations] for s in sources]}
+
+    monkeypatch.setattr(geometry.geo_gateway, "get_json", fake_get_json)
+    a, b, c = (40.0, -80.0), (41.0, -81.0), (42.0, -82.0)
+    matrix = geometry._osrm_table_miles([a, b, a], [b, c, b])
+
+    url, params = requests[0]
+    assert url.rsplit("/", 1)[1] == "-80.0,40.0;-81.0,41.0;-82.0,42.0"
+    assert (params["sources"], params["destinations"]) == ("0;1", "1;2")
+    assert [[round(cell) for cell in row] for row in matrix] == [[1, 2, 1], [0, 1, 0], [1, 2, 1]]
+
+
+def test_oversized_matrix_is_refused_before_geocoding(api, monkeypatch):
+    geocoded = []
+    monkeypatch.setattr(routing_router, "enrich_stops_with_coordinates", geocoded.append)
+    points = [{"city": f"Town {i}", "state": "AA"} for i in range(routing_router.MAX_MATRIX_COORDINATES // 2 + 1)]
+
+    res = api.post("/routing/matrix", json={"origins": points, "destinations": points})
+    assert res.status_code == 400
+    assert geocoded == []
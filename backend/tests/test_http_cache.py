@@ -0,0 +1,115 @@
+import pytest
+from sqlalchemy import text
+
+from app.database import SessionLocal
+from app.models import Customer, LaneHistory, Order, Stop
+from app.routers import orders as orders_router
+from app.services.http_cache import table_validator
+
+from tests.test_orders import _cleanup_test_rows, _ensure_test_customer, client
+
+STOPS = [
+    {"stop_type": "pickup", "city": "Etagville", "state": "AA", "lat": 40.0, "lng": -80.0, "sequence": 1},
+    {"stop_type": "dropoff", "city": "Beta", "state": "BB", "lat": 41.0, "lng": -81.0, "sequence": 2},
+]
+
+
+def _create(api, customer, **fields) -> dict:
+    res = api.post("/orders", json={"customer_id": customer.id, "trailer_type": "Dry Van", "stops": STOPS, **fields})
+    assert res.status_code == 201, res.text
+    return res.json()
+
+
+def _revalidate(api, path: str, etag: str, **params):
+    return api.get(path, params=params, headers={"If-None-Match": etag})
+
+
+def test_get_order_answers_304_until_its_stops_change(api, customer):
+    order = _create(api, customer)
+    first = api.get(f"/orders/{order['id']}")
+    etag = first.headers["ETag"]
+    assert etag.startswith('"') and first.headers["Cache-Control"] == "private, no-cache"
+
+    cached = _revalidate(api, f"/orders/{order['id']}", etag)
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["ETag"] == etag
+    assert _revalidate(api, f"/orders/{order['id']}", f'W/{etag}, "other"').status_code == 304
+
+    stops = [dict(STOPS[0], city="Moved"), STOPS[1]]
+    assert api.put(f"/orders/{order['id']}/stops", json={"stops": stops}).status_code == 200
+    fresh = _revalidate(api, f"/orders/{order['id']}", etag)
+    assert fresh.status_code == 200
+    assert fresh.json()["stops"][0]["city"] == "Moved"
+    assert fresh.headers["ETag"] != etag
+
+
+@pytest.mark.parametrize("snapshot", [True, False])
+def test_order_board_etag_follows_writes_and_filters(api, customer, monkeypatch, snapshot):
+    monkeypatch.setattr(orders_router, "ORDER_BOARD_SNAPSHOT", snapshot)
+    _create(api, customer)
+    params = {"q": "Etagville", "page_size": 50}
+    first = api.get("/orders", params=params)
+    etag = first.headers["ETag"]
+    assert first.json()["total"] == 1
+
+    assert _revalidate(api, "/orders", etag, **params).status_code == 304
+    assert _revalidate(api, "/orders", etag, **params, equipment="reefer").status_code == 200
+
+    _create(api, customer)
+    changed = _revalidate(api, "/orders", etag, **params)
+    assert changed.status_code == 200
+    assert changed.json()["total"] == 2
+
+
+def test_customer_search_etags_for_ilike_and_typeahead(api, customer):
+    for params in ({"query": "TEST_"}, {"query": "test", "mode": "typeahead"}):
+        first = api.get("/customers", params=params)
+        assert first.status_code == 200, first.text
+        assert _revalidate(api, "/customers", first.headers["ETag"], **params).status_code == 304
+
+
+def test_large_board_pages_are_gzipped(api, customer):
+    for _ in range(6):
+        _create(api, customer, notes="x" * 50)
+    res = api.get("/orders", params={"q": "Etagville", "page_size": 50}, headers={"Accept-Encoding": "gzip"})
+    assert res.headers["Content-Encoding"] == "gzip"
+    assert res.json()["total"] == 6
+    small = api.get("/customers", params={"query": "TEST_"}, headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+
+
+def test_customer_validator_follows_customer_writes(db):
+    before = table_validator(db, Customer)
+    db.add(Customer(name="TEST_Counted"))
+    db.flush()
+    assert table_validator(db, Customer) != before
+    with pytest.raises(ValueError):
+        table_validator(db, LaneHistory)
+
+
+@pytest.mark.commits
+def test_table_validator_changes_when_a_long_transaction_commits_late():
+    # Real commits on separate connections; the rolled-back fixtures cannot interleave transactions.
+    _cleanup_test_rows()
+    customer = _ensure_test_customer()
+    ids = [client.post("/orders", json={"customer_id": customer.id, "stops": STOPS}).json()["id"] for _ in range(2)]
+    holder, writer, setup, reader = SessionLocal(), SessionLocal(), SessionLocal(), SessionLocal()
+    try:
+        # Once as the oldest transaction (its commit moves the horizon), once behind an older one.
+        for pinned in (False, True):
+            if pinned:
+                holder.execute(text("SELECT txid_current()"))
+            writer.query(Order).filter(Order.id == ids[0]).update({"notes": "slow"})  # change id taken here
+            setup.query(Order).filter(Order.id == ids[1]).update({"notes": "fast"})
+            setup.commit()
+            before = table_validator(reader, Order, Stop, Customer)
+            reader.rollback()
+            writer.commit()  # its change id is below the max the reader saw
+            assert table_validator(reader, Order, Stop, Customer) != before
+            reader.rollback()
+        holder.rollback()
+    finally:
+        for session in (holder, writer, setup, reader):
+            session.close()
+        _cleanup_test_rows()
@@ -0,0 +1,115 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import func, select
+
+from app.database import SessionLocal
+from app.models import Order, Stop
+from app.routers import orders as orders_router
+from app.services.order_board import OrderBoardSnapshot
+
+from tests.test_orders import _cleanup_test_rows, _ensure_test_customer, client
+
+FILTERS = [
+    {},
+    {"q": "Boardtown"},
+    {"q": "tx"},
+    {"equipment": "flatbed"},
+    {"equipment": "Dry Van", "time_window": "morning"},
+    {"pickup": "boardtown", "delivery": "bb"},
+    {"shipper": "preferred", "time_window": "afternoon"},
+    {"shipper": "new"},
+    {"available_date": "2030-01-01"},
+    {"page": 2, "page_size": 1},
+    {"at_risk": "true"},
+    {"at_risk": "false", "q": "Boardtown"},
+]
+
+
+def _create_orders(client, customer_id: int) -> list[int]:
+    ids = []
+    for trailer_type, hour, state in [("Dry Van", 8, "TX"), ("Flatbed", 9, "AA"), ("flatbed", 14, "TX")]:
+        res = client.post(
+            "/orders",
+            json={
+                "customer_id": customer_id,
+                "trailer_type": trailer_type,
+                "stops": [
+                    {
+                        "stop_type": "pickup",
+                        "city": "Boardtown",
+                        "state": state,
+                        "lat": 40.0,
+                        "lng": -80.0,
+                        "sequence": 1,
+                        "scheduled_arrival_early": f"2030-01-01T{hour:02d}:00:00",
+                    },
+                    {"stop_type": "dropoff", "city": "Beta", "state": "BB", "lat": 41.0, "lng": -81.0, "sequence": 2},
+                ],
+            },
+        )
+        assert res.status_code == 201, res.text
+        ids.append(res.json()["id"])
+    return ids
+
+
+@pytest.mark.parametrize("params", FILTERS)
+def test_snapshot_matches_sql_board(api, customer, monkeypatch, params):
+    _create_orders(api, customer.id)
+
+    snapshot = api.get("/orders", params=params).json()
+    monkeypatch.setattr(orders_router, "ORDER_BOARD_SNAPSHOT", False)
+    sql = api.get("/orders", params=params).json()
+
+    assert snapshot["total"] == sql["total"]
+    assert [item["id"] for item in snapshot["items"]] == [item["id"] for item in sql["items"]]
+    for got, expected in zip(snapshot["items"], sql["items"]):
+        got.pop("created_at")
+        expected.pop("created_at")
+        assert got == expected
+
+
+def test_snapshot_refresh_applies_updates_and_deletes(api, customer, db):
+    ids = _create_orders(api, customer.id)
+    board = OrderBoardSnapshot(refresh_seconds=0)
+    board.load(db)
+    assert board.query(q="Boardtown")[1] == 3
+
+    db.query(Order).filter(Order.id == ids[0]).update({"trailer_type": "Reefer"})
+    db.query(Stop).filter(Stop.order_id == ids[1]).delete()
+    db.query(Order).filter(Order.id == ids[1]).delete()
+    db.commit()
+    board.ensure_fresh(db)
+
+    items, total = board.query(q="Boardtown")
+    assert total == 2
+    assert {item.id for item in items} == {ids[0], ids[2]}
+    assert board.query(q="Boardtown", equipment="reefer")[0][0].id == ids[0]
+    assert board.query(available_date=date(2030, 1, 1), time_window="afternoon")[0][0].id == ids[2]
+
+
+# Two transactions interleaving needs two real connections.
+@pytest.mark.commits
+def test_refresh_picks_up_a_long_transaction_that_commits_after_it():
+    _cleanup_test_rows()
+    ids = _create_orders(client, _ensure_test_customer().id)
+    board = OrderBoardSnapshot(refresh_seconds=0)
+    db = SessionLocal()
+    writer = SessionLocal()
+    try:
+        board.load(db)
+        db.commit()
+        # The writer's transaction starts now, so the updated_at it writes is older than the next refresh.
+        writer_started = writer.execute(select(func.now())).scalar()
+        board.refresh(db)
+        db.commit()
+        assert board._watermark <= writer_started
+
+        writer.query(Order).filter(Order.id == ids[0]).update({"trailer_type": "Reefer"})
+        writer.commit()
+        board.refresh(db)
+        assert [item.id for item in board.query(q="Boardtown", equipment="reefer")[0]] == [ids[0]]
+    finally:
+        writer.close()
+        db.close()
+    _cleanup_test_rows()
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from app.routers import orders as orders_router
+from app.services.order_events import RESYNC_EVENT, OrderEventFilter, OrderEventHub
+
+from tests.test_orders import _cleanup_test_rows, _ensure_test_customer, client
+
+
+def test_filter_matches_normalized_fields_and_always_passes_deletes():
+    event_filter = OrderEventFilter(equipment="dry-van", pickup_state="OH")
+    assert event_filter.matches({"event": "created", "trailer_type": "Dry Van", "origin_state": "oh "})
+    assert not event_filter.matches({"event": "created", "trailer_type": "Reefer", "origin_state": "OH"})
+    assert not event_filter.matches({"event": "created", "trailer_type": "Dry Van", "origin_state": None})
+    assert event_filter.matches({"event": "deleted", "order_id": 1})
+
+
+def test_slow_subscriber_is_told_to_resync():
+    hub = OrderEventHub(queue_size=2)
+
+    async def scenario():
+        subscriber = hub.subscribe(OrderEventFilter())
+        for order_id in range(5):
+            hub._dispatch({"event": "updated", "order_id": order_id})
+        await asyncio.sleep(0)
+        assert subscriber.overflowed
+        assert await subscriber.queue.get() is RESYNC_EVENT
+        assert subscriber.queue.empty()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        hub.stop()
+
+
+def test_subscriber_on_a_closed_loop_is_dropped_without_disturbing_others():
+    hub = OrderEventHub()
+    loop = asyncio.new_event_loop()
+
+    async def register():
+        return hub.subscribe(OrderEventFilter())
+
+    dead = loop.run_until_complete(register())
+    loop.close()
+
+    async def scenario():
+        alive = hub.subscribe(OrderEventFilter())
+        hub._dispatch({"event": "updated", "order_id": 1})
+        assert (await asyncio.wait_for(alive.queue.get(), 1))["order_id"] == 1
+        assert hub.status()["subscribers"] == 1
+
+    asyncio.run(scenario())
+    assert dead not in hub._subscribers
+
+
+# pg_notify fires at commit, so nothing reaches the listener from a rolled-back transaction.
+@pytest.mark.commits
+def test_committed_writes_reach_matching_subscribers_via_notify():
+    _cleanup_test_rows()
+    customer = _ensure_test_customer()
+    hub = OrderEventHub()
+    stops = [
+        {"stop_type": "pickup", "city": "Alpha", "state": "ZZ", "lat": 40.0, "lng": -80.0, "sequence": 1},
+        {"stop_type": "dropoff", "city": "Beta", "state": "BB", "lat": 41.0, "lng": -81.0, "sequence": 2},
+    ]
+
+    async def scenario():
+        hub.start()
+        wanted = hub.subscribe(OrderEventFilter(pickup_state="ZZ"))
+        other = hub.subscribe(OrderEventFilter(pickup_state="YY"))
+        assert await asyncio.to_thread(hub.wait_until_listening, 5)
+
+        res = await asyncio.to_thread(client.post, "/orders", json={"customer_id": customer.id, "stops": stops})
+        assert res.status_code == 201, res.text
+        order_id = res.json()["id"]
+        created = await asyncio.wait_for(wanted.queue.get(), 5)
+        # Deferred to commit, so the new order's stops are already in the payload.
+        assert created["event"] == "created"
+        assert created["order_id"] == order_id
+        assert created["origin_state"] == "ZZ"
+        assert created["destination_state"] == "BB"
+
+        stops[1]["state"] = "CC"
+        res = await asyncio.to_thread(client.put, f"/orders/{order_id}/stops", json={"stops": stops})
+        assert res.status_code == 200, res.text
+        updated = await asyncio.wait_for(wanted.queue.get(), 5)
+        assert updated["order_id"] == order_id
+        assert updated["event"] in ("stops_updated", "miles_computed", "updated")
+        assert other.queue.empty()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        hub.stop()
+        _cleanup_test_rows()
+
+
+def test_stream_is_503_when_listening_is_disabled(api, monkeypatch):
+    monkeypatch.setattr(orders_router, "ORDER_EVENTS_LISTEN", False)
+    res = api.get("/orders/stream")
+    assert res.status_code == 503
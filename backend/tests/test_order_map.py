@@ -0,0 +1,48 @@
+from app.services.order_map import simplify_line
+
+
+def _create_order(api, customer_id: int, origin: tuple[float, float], destination: tuple[float, float]) -> int:
+    res = api.post(
+        "/orders",
+        json={
+            "customer_id": customer_id,
+            "trailer_type": "Reefer",
+            "stops": [
+                {"stop_type": "pickup", "city": "Mapton", "state": "MP", "lat": origin[0], "lng": origin[1], "sequence": 1},
+                {"stop_type": "dropoff", "city": "Gridley", "state": "GR", "lat": destination[0], "lng": destination[1], "sequence": 2},
+            ],
+        },
+    )
+    assert res.status_code == 201, res.text
+    return res.json()["id"]
+
+
+def test_simplify_line_drops_points_within_tolerance():
+    line = [[0.0, 0.0], [1.0, 0.001], [2.0, 0.0], [3.0, 1.0]]
+    assert simplify_line(line, 0.01) == [[0.0, 0.0], [2.0, 0.0], [3.0, 1.0]]
+    assert simplify_line(line, 0.0001) == line
+
+
+def test_order_map_clusters_at_low_zoom_and_draws_routes_when_zoomed_in(api, customer):
+    first = _create_order(api, customer.id, (-40.0, 140.0), (-30.0, 150.0))
+    second = _create_order(api, customer.id, (-40.2, 140.2), (-30.1, 150.1))
+    viewport = {"bbox": "139,-41,151,-29", "equipment": "reefer"}
+
+    res = api.get("/orders/map", params={**viewport, "zoom": 3})
+    assert res.status_code == 200, res.text
+    body = res.json()
+    origins = [c for c in body["clusters"] if c["kind"] == "origin"]
+    assert [(c["count"], c["order_id"]) for c in origins] == [(2, None)]
+    assert abs(origins[0]["lat"] - -40.1) < 1e-6
+    assert [(line["count"], line["order_id"]) for line in body["lines"]] == [(2, None)]
+
+    res = api.get("/orders/map", params={**viewport, "zoom": 12})
+    body = res.json()
+    assert sorted(c["order_id"] for c in body["clusters"] if c["kind"] == "origin") == [first, second]
+    assert sorted(line["order_id"] for line in body["lines"]) == [first, second]
+    assert all(len(line["coordinates"]) == 2 for line in body["lines"])
+
+    # Outside the viewport, and bad viewports.
+    assert api.get("/orders/map", params={"bbox": "0,0,1,1", "zoom": 3, "equipment": "reefer"}).json()["clusters"] == []
+    assert api.get("/orders/map", params={"bbox": "1,2,3", "zoom": 3}).status_code == 400
+    assert api.get("/orders/map", params={"bbox": "5,0,1,1", "zoom": 3}).status_code == 400
@@ -0,0 +1,72 @@
+import pytest
+from sqlalchemy import update
+
+from app.database import SessionLocal
+from app.models import Order
+from app.routers import orders as orders_router
+
+STOPS = [
+    {"stop_type": "pickup", "city": "Versionville", "state": "AA", "lat": 40.0, "lng": -80.0, "sequence": 1},
+    {"stop_type": "dropoff", "city": "Beta", "state": "BB", "lat": 41.0, "lng": -81.0, "sequence": 2},
+]
+
+
+@pytest.fixture
+def order(api, customer) -> dict:
+    res = api.post("/orders", json={"customer_id": customer.id, "trailer_type": "Dry Van", "stops": STOPS})
+    assert res.status_code == 201, res.text
+    return res.json()
+
+
+def _stops(city: str) -> list[dict]:
+    return [dict(STOPS[0], city=city), STOPS[1]]
+
+
+def test_stale_version_is_rejected_before_geocoding(api, order, monkeypatch):
+    assert order["version"] == 1
+    first = api.put(f"/orders/{order['id']}/stops", json={"stops": _stops("First"), "version": 1})
+    assert first.status_code == 200, first.text
+    assert first.json()["version"] == 2
+
+    def fail(*args, **kwargs):
+        raise AssertionError("a stale edit must not reach the geocoder")
+
+    monkeypatch.setattr(orders_router, "enrich_stops_with_coordinates", fail)
+    stale = api.put(f"/orders/{order['id']}/stops", json={"stops": _stops("Second"), "version": 1})
+    assert stale.status_code == 409
+    assert api.get(f"/orders/{order['id']}").json()["stops"][0]["city"] == "First"
+
+
+def test_if_match_uses_the_etag_from_reads(api, order):
+    etag = api.get(f"/orders/{order['id']}").headers["ETag"]
+    updated = api.put(f"/orders/{order['id']}/stops", json={"stops": _stops("Matched")}, headers={"If-Match": etag})
+    assert updated.status_code == 200, updated.text
+    new_etag = updated.headers["ETag"]
+    assert new_etag != etag
+    assert api.get(f"/orders/{order['id']}").headers["ETag"] == new_etag
+
+    for stale in (etag, f"W/{new_etag}"):
+        res = api.put(f"/orders/{order['id']}/stops", json={"stops": _stops("Stale")}, headers={"If-Match": stale})
+        assert res.status_code == 409
+    optimize = api.post(f"/orders/{order['id']}/optimize-stops", headers={"If-Match": etag})
+    assert optimize.status_code == 409
+
+
+def test_edit_that_loses_a_race_during_routing_gets_409(api, order, monkeypatch):
+    compute_route_miles = orders_router.compute_route_miles
+
+    def concurrent_edit_then_route(stops):
+        db = SessionLocal()
+        try:
+            db.execute(update(Order).where(Order.id == order["id"]).values(version=Order.version + 1))
+            db.commit()
+        finally:
+            db.close()
+        return compute_route_miles(stops)
+
+    monkeypatch.setattr(orders_router, "compute_route_miles", concurrent_edit_then_route)
+    lost = api.put(f"/orders/{order['id']}/stops", json={"stops": _stops("Loser"), "version": 1})
+    assert lost.status_code == 409
+    current = api.get(f"/orders/{order['id']}").json()
+    assert current["version"] == 2
+    assert current["stops"][0]["city"] == "Versionville"
@@ -1,10 +1,22 @@
+import csv
+import io
+import uuid
+from datetime import datetime, timezone
+
+import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import text
 
-from app.database import SessionLocal
+from app.database import SessionLocal, engine
 from app.main import app
-from app.models import Customer, Order, Stop
+from app.models import Customer, IdempotencyKey, Order, OrderArchive, OrderOutbox, Stop
+from app.routers import orders as orders_router
+from app.services import geometry, order_changes
+from app.services.order_archive import archive_orders
+from app.services.order_changes import latest_token
 
 
+# For the `commits` tests (see conftest); everything else uses the rolled-back `api` fixture.
 client = TestClient(app)
 
 
@@ -17,8 +29,14 @@ def _cleanup_test_rows() -> None:
             test_orders = db.query(Order).filter(Order.customer_id.in_(test_customer_ids)).all()
             test_order_ids = [o.id for o in test_orders]
             if test_order_ids:
+                db.query(OrderOutbox).filter(OrderOutbox.order_id.in_(test_order_ids)).delete(
+                    synchronize_session=False
+                )
                 db.query(Stop).filter(Stop.order_id.in_(test_order_ids)).delete(synchronize_session=False)
                 db.query(Order).filter(Order.id.in_(test_order_ids)).delete(synchronize_session=False)
+            db.query(OrderArchive).filter(OrderArchive.customer_id.in_(test_customer_ids)).delete(
+                synchronize_session=False
+            )
             db.query(Customer).filter(Customer.id.in_(test_customer_ids)).delete(synchronize_session=False)
         db.commit()
     finally:
@@ -47,10 +65,7 @@ def _ensure_test_customer() -> Customer:
         db.close()
 
 
-def test_create_order_returns_geometry_and_stops():
-    _cleanup_test_rows()
-    customer = _ensure_test_customer()
-
+def test_create_order_returns_geometry_and_stops(api, customer):
     payload = {
         "customer_id": customer.id,
         "trailer_type": "Dry Van",
@@ -79,7 +94,7 @@ def test_create_order_returns_geometry_and_stops():
         ],
     }
 
-    res = client.post("/orders", json=payload)
+    res = api.post("/orders", json=payload)
     assert res.status_code == 201, res.text
     body = res.json()
     assert body["customer_id"] == customer.id
@@ -88,12 +103,9 @@ def test_create_order_returns_geometry_and_stops():
     assert len(body["route_geometry"]["coordinates"]) == 2
 
 
-def test_list_orders_search_by_customer():
-    _cleanup_test_rows()
-    customer = _ensure_test_customer()
-
+def test_list_orders_search_by_customer(api, customer):
     # Create one order
-    res = client.post(
+    res = api.post(
         "/orders",
         json={
             "customer_id": customer.id,
@@ -109,9 +121,346 @@ def test_list_orders_search_by_customer():
     assert res.status_code == 201, res.text
 
     # Search by customer name
-    res2 = client.get("/orders", params={"q": "TEST_Customer", "page": 1, "page_size": 10})
+    res2 = api.get("/orders", params={"q": "TEST_Customer", "page": 1, "page_size": 10})
     assert res2.status_code == 200, res2.text
     body = res2.json()
     assert body["total"] >= 1
     assert any(i["customer_name"] == "TEST_Customer" for i in body["items"])
 
+
+def test_get_orders_batch_with_field_selection(api, customer):
+    res = api.post(
+        "/orders",
+        json={
+            "customer_id": customer.id,
+            "trailer_type": "Dry Van",
+            "stops": [
+                {"stop_type": "pickup", "city": "Alpha", "state": "AA", "lat": 40.0, "lng": -80.0, "sequence": 1},
+                {"stop_type": "dropoff", "city": "Beta", "state": "BB", "lat": 41.0, "lng": -81.0, "sequence": 2},
+            ],
+        },
+    )
+    assert res.status_code == 201, res.text
+    order_id = res.json()["id"]
+
+    res2 = api.post("/orders/batch", json={"ids": [order_id, 0], "fields": ["id", "stops", "customer"]})
+    assert res2.status_code == 200, res2.text
+    body = res2.json()
+    assert body["missing_ids"] == [0]
+    assert len(body["items"]) == 1
+    item = body["items"][0]
+    assert set(item) == {"id", "stops", "customer"}
+    assert len(item["stops"]) == 2
+    assert item["customer"]["name"] == "TEST_Customer"
+
+    res3 = api.post("/orders/batch", json={"ids": [order_id], "fields": ["nope"]})
+    assert res3.status_code == 400
+
+
+def test_optimize_stops_preview_then_apply(api, customer):
+    res = api.post(
+        "/orders",
+        json={
+            "customer_id": customer.id,
+            "trailer_type": "Dry Van",
+            "stops": [
+                {"stop_type": "pickup", "city": "P", "state": "AA", "lat": 40.0, "lng": -80.0, "sequence": 1},
+                {"stop_type": "stop", "city": "Far", "state": "AA", "lat": 40.0, "lng": -77.0, "sequence": 2},
+                {"stop_type": "stop", "city": "Near", "state": "AA", "lat": 40.0, "lng": -79.0, "sequence": 3},
+                {"stop_type": "dropoff", "city": "D", "state": "AA", "lat": 40.0, "lng": -76.0, "sequence": 4},
+            ],
+        },
+    )
+    assert res.status_code == 201, res.text
+    order = res.json()
+    stop_ids = [s["id"] for s in order["stops"]]
+
+    preview = api.post(f"/orders/{order['id']}/optimize-stops/preview")
+    assert preview.status_code == 200, preview.text
+    body = preview.json()
+    assert body["applied"] is False
+    assert body["optimized_stop_ids"] == [stop_ids[0], stop_ids[2], stop_ids[1], stop_ids[3]]
+    assert body["saved_miles"] > 0
+    unchanged = api.get(f"/orders/{order['id']}").json()
+    assert [s["id"] for s in unchanged["stops"]] == stop_ids
+
+    applied = api.post(f"/orders/{order['id']}/optimize-stops")
+    assert applied.status_code == 200, applied.text
+    reordered = api.get(f"/orders/{order['id']}").json()
+    assert [s["id"] for s in reordered["stops"]] == body["optimized_stop_ids"]
+    assert [s["sequence"] for s in reordered["stops"]] == [1, 2, 3, 4]
+
+
+def test_create_order_idempotency_key_replays_response(api, customer):
+    key = f"test-{uuid.uuid4()}"
+    payload = {
+        "customer_id": customer.id,
+        "trailer_type": "Dry Van",
+        "stops": [
+            {"stop_type": "pickup", "city": "Alpha", "state": "AA", "lat": 40.0, "lng": -80.0, "sequence": 1},
+            {"stop_type": "dropoff", "city": "Beta", "state": "BB", "lat": 41.0, "lng": -81.0, "sequence": 2},
+        ],
+    }
+
+    first = api.post("/orders", json=payload, headers={"Idempotency-Key": key})
+    assert first.status_code == 201, first.text
+    second = api.post("/orders", json=payload, headers={"Idempotency-Key": key})
+    assert second.status_code == 201, second.text
+    assert second.headers.get("Idempotent-Replayed") == "true"
+    assert second.json() == first.json()
+
+    payload["weight_lbs"] = 500
+    conflict = api.post("/orders", json=payload, headers={"Idempotency-Key": key})
+    assert conflict.status_code == 422
+
+
+def test_replayed_stop_edit_sends_the_original_etag(api, customer):
+    key = f"test-{uuid.uuid4()}"
+    stops = [
+        {"stop_type": "pickup", "city": "Alpha", "state": "AA", "lat": 40.0, "lng": -80.0, "sequence": 1},
+        {"stop_type": "dropoff", "city": "Beta", "state": "BB", "lat": 41.0, "lng": -81.0, "sequence": 2},
+    ]
+    order = api.post("/orders", json={"customer_id": customer.id, "stops": stops}).json()
+    first = api.put(f"/orders/{order['id']}/stops", json={"stops": stops}, headers={"Idempotency-Key": key})
+    assert first.status_code == 200, first.text
+    second = api.put(f"/orders/{order['id']}/stops", json={"stops": stops}, headers={"Idempotency-Key": key})
+    assert second.headers.get("Idempotent-Replayed") == "true"
+    assert second.headers["ETag"] == first.headers["ETag"]
+
+
+def test_request_that_outlives_its_idempotency_claim_rolls_back(api, db, customer, monkeypatch):
+    key = f"test-{uuid.uuid4()}"
+    route_miles = orders_router.compute_route_miles
+
+    def claim_taken_over(stops):
+        # The claim expires mid-request and a retry takes the key over.
+        db = SessionLocal()
+        try:
+            db.query(IdempotencyKey).filter(IdempotencyKey.key == key).delete()
+            db.commit()
+        finally:
+            db.close()
+        return route_miles(stops)
+
+    monkeypatch.setattr(orders_router, "compute_route_miles", claim_taken_over)
+    stops = [
+        {"stop_type": "pickup", "city": "Alpha", "state": "AA", "lat": 40.0, "lng": -80.0, "sequence": 1},
+        {"stop_type": "dropoff", "city": "Beta", "state": "BB", "lat": 41.0, "lng": -81.0, "sequence": 2},
+    ]
+    res = api.post("/orders", json={"customer_id": customer.id, "stops": stops}, headers={"Idempotency-Key": key})
+    assert res.status_code == 409, res.text
+    assert db.query(Order).filter(Order.customer_id == customer.id).count() == 0
+
+
+def test_estimate_keeps_only_osrm_miles(api, monkeypatch):
+    stops = [
+        {"stop_type": "pickup", "city": f"Est-{uuid.uuid4()}", "state": "AA", "lat": 40.0, "lng": -80.0, "sequence": 1},
+        {"stop_type": "dropoff", "city": "Beta", "state": "BB", "lat": 41.0, "lng": -81.0, "sequence": 2},
+    ]
+    monkeypatch.setattr(geometry, "_osrm_route_miles", lambda stops: None)
+    fallback = api.post("/orders/estimate-miles", json={"stops": stops}).json()["total_miles"]
+    assert fallback == round(geometry.haversine_miles(40.0, -80.0, 41.0, -81.0), 2)
+
+    # OSRM is back: the Haversine figure was not kept, and the OSRM one is.
+    monkeypatch.setattr(geometry, "_osrm_route_miles", lambda stops: 150.0)
+    assert api.post("/orders/estimate-miles", json={"stops": stops}).json()["total_miles"] == 150.0
+    monkeypatch.setattr(geometry, "_osrm_route_miles", lambda stops: 999.0)
+    assert api.post("/orders/estimate-miles", json={"stops": stops}).json()["total_miles"] == 150.0
+
+
+def test_order_facets_match_board_totals(api, customer):
+    for trailer_type, hour, state in [("Dry Van", 8, "AA"), ("Flatbed", 8, "BB"), ("Flatbed", 14, "AA")]:
+        res = api.post(
+            "/orders",
+            json={
+                "customer_id": customer.id,
+                "trailer_type": trailer_type,
+                "stops": [
+                    {
+                        "stop_type": "pickup",
+                        "city": "Facetville",
+                        "state": state,
+                        "lat": 40.0,
+                        "lng": -80.0,
+                        "sequence": 1,
+                        "scheduled_arrival_early": f"2030-01-01T{hour:02d}:00:00",
+                    },
+                    {"stop_type": "dropoff", "city": "Beta", "state": "BB", "lat": 41.0, "lng": -81.0, "sequence": 2},
+                ],
+            },
+        )
+        assert res.status_code == 201, res.text
+
+    params = {"q": "Facetville", "equipment": "flatbed"}
+    facets = api.get("/orders/facets", params=params)
+    assert facets.status_code == 200, facets.text
+    body = facets.json()
+    assert body["total"] == api.get("/orders", params=params).json()["total"] == 2
+    # Each facet ignores its own filter, so the equipment facet still lists dry-van.
+    assert body["equipment"] == {"flatbed": 2, "dry-van": 1}
+    assert body["pickup_state"] == {"AA": 1, "BB": 1}
+    assert body["shipper"]["preferred"] == 2
+    for window, count in body["time_window"].items():
+        board = api.get("/orders", params={**params, "time_window": window}).json()
+        assert board["total"] == count
+
+
+# The change feed only reports committed transactions, so these tests commit through `client` and
+# clean up by name prefix instead of using the rolled-back `api` fixture.
+@pytest.mark.commits
+def test_order_changes_feed_reports_creates_updates_and_deletes():
+    _cleanup_test_rows()
+    customer = _ensure_test_customer()
+    db = SessionLocal()
+    try:
+        token = latest_token(db)
+    finally:
+        db.close()
+
+    stops = [
+        {"stop_type": "pickup", "city": "Alpha", "state": "AA", "lat": 40.0, "lng": -80.0, "sequence": 1},
+        {"stop_type": "dropoff", "city": "Beta", "state": "BB", "lat": 41.0, "lng": -81.0, "sequence": 2},
+    ]
+    kept = client.post("/orders", json={"customer_id": customer.id, "stops": stops}).json()
+    dropped = client.post("/orders", json={"customer_id": customer.id, "stops": stops}).json()
+
+    first = client.get("/orders/changes", params={"since": token})
+    assert first.status_code == 200, first.text
+    body = first.json()
+    assert [(c["order_id"], c["change"]) for c in body["changes"]] == [
+        (kept["id"], "created"),
+        (dropped["id"], "created"),
+    ]
+    assert body["changes"][0]["order"]["stops"][0]["city"] == "Alpha"
+
+    stops[1]["city"] = "Gamma"
+    assert client.put(f"/orders/{kept['id']}/stops", json={"stops": stops}).status_code == 200
+    updated = client.get("/orders/changes", params={"since": body["next_token"]}).json()
+    assert [(c["order_id"], c["change"]) for c in updated["changes"]] == [(kept["id"], "updated")]
+    assert updated["changes"][0]["order"]["stops"][1]["city"] == "Gamma"
+    _cleanup_test_rows()
+
+    second = client.get("/orders/changes", params={"since": body["next_token"]}).json()
+    changes = {c["order_id"]: c for c in second["changes"]}
+    assert changes[kept["id"]]["change"] == "deleted"
+    assert changes[dropped["id"]]["change"] == "deleted"
+    assert changes[dropped["id"]]["order"] is None
+    assert second["next_token"] > body["next_token"]
+
+    paged = client.get("/orders/changes", params={"since": token, "limit": 1}).json()
+    assert len(paged["changes"]) == 1
+    assert paged["has_more"] is True
+
+
+@pytest.mark.commits
+def test_order_changes_held_back_by_a_running_transaction_ask_to_retry_later(monkeypatch, caplog):
+    _cleanup_test_rows()
+    customer = _ensure_test_customer()
+    monkeypatch.setattr(order_changes, "ORDER_CHANGES_PIN_WARN_SECONDS", 0)
+    holder = SessionLocal()
+    try:
+        token = latest_token(holder)
+        holder.rollback()
+        xid = holder.execute(text("SELECT txid_current()")).scalar()
+        pid = holder.execute(text("SELECT pg_backend_pid()")).scalar()
+        stops = [
+            {"stop_type": "pickup", "city": "Alpha", "state": "AA", "lat": 40.0, "lng": -80.0, "sequence": 1},
+            {"stop_type": "dropoff", "city": "Beta", "state": "BB", "lat": 41.0, "lng": -81.0, "sequence": 2},
+        ]
+        created = client.post("/orders", json={"customer_id": customer.id, "stops": stops}).json()
+
+        with caplog.at_level("WARNING", logger="app.services.order_changes"):
+            held = client.get("/orders/changes", params={"since": token})
+        assert held.status_code == 200, held.text
+        assert held.json()["changes"] == []
+        assert held.json()["has_more"] is False
+        assert held.headers["Retry-After"] == "1"
+        assert f"transaction {xid} (pid {pid}," in caplog.text
+
+        holder.rollback()
+        released = client.get("/orders/changes", params={"since": token})
+        assert "Retry-After" not in released.headers
+        assert [c["order_id"] for c in released.json()["changes"]] == [created["id"]]
+    finally:
+        holder.close()
+        _cleanup_test_rows()
+
+
+@pytest.mark.commits
+def test_no_pooled_connection_is_held_during_geocoding_and_routing(monkeypatch):
+    """Needs the real pool (the `api` fixture pins every session to one connection), so it commits too."""
+    _cleanup_test_rows()
+    customer = _ensure_test_customer()
+    checked_out = []
+
+    def route(stops):
+        checked_out.append(engine.pool.checkedout())
+        return None, None
+
+    monkeypatch.setattr(orders_router, "compute_route_miles", route)
+    stops = [
+        {"stop_type": "pickup", "city": "Alpha", "state": "AA", "lat": 40.0, "lng": -80.0, "sequence": 1},
+        {"stop_type": "dropoff", "city": "Beta", "state": "BB", "lat": 41.0, "lng": -81.0, "sequence": 2},
+    ]
+    created = client.post("/orders", json={"customer_id": customer.id, "stops": stops})
+    assert created.status_code == 201, created.text
+    updated = client.put(f"/orders/{created.json()['id']}/stops", json={"stops": stops, "version": 1})
+    assert updated.status_code == 200, updated.text
+    assert checked_out == [0, 0]
+    _cleanup_test_rows()
+
+
+@pytest.mark.commits
+def test_archived_order_is_still_served_and_exported():
+    _cleanup_test_rows()
+    customer = _ensure_test_customer()
+    db = SessionLocal()
+    try:
+        token = latest_token(db)
+    finally:
+        db.close()
+    res = client.post(
+        "/orders",
+        json={
+            "customer_id": customer.id,
+            "stops": [
+                {"stop_type": "pickup", "city": "Oldtown", "state": "AA", "lat": 40.0, "lng": -80.0, "sequence": 1},
+                {"stop_type": "dropoff", "city": "Beta", "state": "BB", "lat": 41.0, "lng": -81.0, "sequence": 2},
+            ],
+        },
+    )
+    order = res.json()
+
+    db = SessionLocal()
+    try:
+        db.query(Order).filter(Order.id == order["id"]).update(
+            {"status": "delivered", "updated_at": datetime(2020, 1, 1, tzinfo=timezone.utc)}
+        )
+        db.commit()
+        assert archive_orders(db, older_than_days=30, statuses=["delivered"], batch_size=100) >= 1
+        assert db.query(Order).filter(Order.id == order["id"]).first() is None
+    finally:
+        db.close()
+
+    archived = client.get(f"/orders/{order['id']}")
+    assert archived.status_code == 200, archived.text
+    body = archived.json()
+    assert body["archived_at"] is not None
+    assert [s["id"] for s in body["stops"]] == [s["id"] for s in order["stops"]]
+
+    batch = client.post("/orders/batch", json={"ids": [order["id"], 999999999], "fields": ["id", "archived_at", "stops"]})
+    assert batch.status_code == 200, batch.text
+    [item] = batch.json()["items"]
+    assert item["archived_at"] is not None
+    assert [s["city"] for s in item["stops"]] == ["Oldtown", "Beta"]
+    assert batch.json()["missing_ids"] == [999999999]
+
+    export = client.get("/orders/export")
+    assert export.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(export.text)))
+    exported = next(row for row in rows if row["id"] == str(order["id"]))
+    assert exported["origin_city"] == "Oldtown"
+    assert exported["archived_at"]
+
+    changes = client.get("/orders/changes", params={"since": token}).json()["changes"]
+    assert {"order_id": order["id"], "change": "archived", "order": None} in changes
@@ -0,0 +1,104 @@
+import pytest
+from sqlalchemy import func, update
+
+from app.models import OrderOutbox
+from app.services.outbox import (
+    ORDER_CREATED,
+    ORDER_STOPS_UPDATED,
+    QueueSink,
+    dispatch_batch,
+    outbox_status,
+    retry_parked,
+)
+
+STOPS = [
+    {"stop_type": "pickup", "city": "Out", "state": "AA", "lat": 40.0, "lng": -80.0, "sequence": 1},
+    {"stop_type": "dropoff", "city": "Box", "state": "BB", "lat": 41.0, "lng": -81.0, "sequence": 2},
+]
+
+
+class FailingSink:
+    name = "failing"
+
+    def deliver(self, events):
+        raise ConnectionError("sink down")
+
+
+class RejectingSink(QueueSink):
+    """Rejects any batch containing an event of one order, like a webhook answering 400 to its payload."""
+
+    def __init__(self, poison_order_id: int):
+        super().__init__()
+        self.poison_order_id = poison_order_id
+
+    def deliver(self, events):
+        if any(event["order_id"] == self.poison_order_id for event in events):
+            raise ValueError("400 Bad Request")
+        super().deliver(events)
+
+
+def _drain_existing(db) -> None:
+    """Mark events already in the database delivered so this test sees only its own."""
+    db.execute(update(OrderOutbox).where(OrderOutbox.dispatched_at.is_(None)).values(dispatched_at=func.now()))
+    db.commit()
+
+
+def test_order_writes_enqueue_events_delivered_in_order_after_a_failed_attempt(api, customer, db):
+    _drain_existing(db)
+    created = api.post("/orders", json={"customer_id": customer.id, "trailer_type": "Reefer", "stops": STOPS})
+    assert created.status_code == 201, created.text
+    order = created.json()
+    updated = api.put(f"/orders/{order['id']}/stops", json={"stops": [{**STOPS[0], "city": "Moved"}, STOPS[1]]})
+    assert updated.status_code == 200, updated.text
+
+    status = outbox_status(db)
+    assert status["pending"] == 2
+    assert status["max_attempts"] == 0
+
+    with pytest.raises(ConnectionError):
+        dispatch_batch(db, [FailingSink()], batch_size=10)
+    status = outbox_status(db)
+    assert (status["pending"], status["max_attempts"]) == (2, 1)
+
+    # The failed batch is retried one event at a time.
+    sink = QueueSink()
+    delivered, lag = dispatch_batch(db, [sink], batch_size=10)
+    assert delivered == 1
+    assert lag is not None and lag >= 0
+    assert dispatch_batch(db, [sink], batch_size=10)[0] == 1
+    events = [sink.queue.get_nowait() for _ in range(2)]
+    assert [e["event"] for e in events] == [ORDER_CREATED, ORDER_STOPS_UPDATED]
+    assert events[0]["id"] < events[1]["id"]
+    assert all(e["order_id"] == order["id"] for e in events)
+    # The payload is the API response as of that write.
+    assert events[0]["order"]["stops"][0]["city"] == "Out"
+    assert events[1]["order"]["stops"][0]["city"] == "Moved"
+
+    assert outbox_status(db)["pending"] == 0
+    assert dispatch_batch(db, [sink], batch_size=10) == (0, None)
+
+
+def test_event_a_sink_keeps_rejecting_is_parked_and_later_events_flow(api, customer, db):
+    _drain_existing(db)
+    ids = []
+    for _ in range(3):
+        created = api.post("/orders", json={"customer_id": customer.id, "stops": STOPS})
+        assert created.status_code == 201, created.text
+        ids.append(created.json()["id"])
+    sink = RejectingSink(poison_order_id=ids[1])
+
+    with pytest.raises(ValueError):
+        dispatch_batch(db, [sink], batch_size=10, max_attempts=2)
+    assert dispatch_batch(db, [sink], batch_size=10, max_attempts=2)[0] == 1  # first event, alone
+    with pytest.raises(ValueError):
+        dispatch_batch(db, [sink], batch_size=10, max_attempts=2)  # second failure parks the poison event
+    assert dispatch_batch(db, [sink], batch_size=10, max_attempts=2)[0] == 1
+    assert [sink.queue.get_nowait()["order_id"] for _ in range(2)] == [ids[0], ids[2]]
+
+    status = outbox_status(db)
+    assert (status["pending"], status["parked"]) == (0, 1)
+    assert dispatch_batch(db, [sink], batch_size=10, max_attempts=2) == (0, None)
+
+    assert retry_parked(db) == 1
+    status = outbox_status(db)
+    assert (status["pending"], status["parked"], status["max_attempts"]) == (1, 0, 0)
@@ -0,0 +1,218 @@
+"""
+Query-plan regression tests: every SQL statement an endpoint issues is re-run under EXPLAIN with
+sequential scans disabled. If the planner still picks a Seq Scan on a large table, no index can
+serve that query, whatever the table size. Intentional full scans are listed per case with a reason.
+"""
+from contextlib import contextmanager
+from typing import Any, Callable
+
+import pytest
+from sqlalchemy import event
+
+from app.database import SessionLocal, engine
+from app.models import Customer, Order, Stop
+from app.routers import orders as orders_router
+from app.services.customer_index import CustomerPrefixIndex
+from app.services.http_cache import table_validator
+from app.services.order_archive import archive_orders
+from app.services.order_board import OrderBoardSnapshot
+from app.services.order_changes import latest_token
+from app.services.outbox import dispatch_batch, outbox_status
+from app.services.route_backfill import find_backfill_candidates
+from app.services.schedule import recompute_schedules
+
+from tests.test_orders import _cleanup_test_rows, _ensure_test_customer, client
+
+# The rows are shared by every case and EXPLAIN runs them on its own connection, so they are committed.
+pytestmark = pytest.mark.commits
+
+BIG_TABLES = {"orders", "stops", "customers", "order_changes", "orders_archive", "stops_archive", "idempotency_keys", "order_outbox"}
+
+_EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE")
+
+_STOP_FIELDS = ("stop_type", "city", "state", "lat", "lng", "sequence")
+
+
+@contextmanager
+def _captured_sql():
+    statements: list[tuple[str, Any]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(_EXPLAINABLE):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+
+def _seq_scans(plan: dict) -> set[str]:
+    tables = set()
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in BIG_TABLES:
+        tables.add(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        tables |= _seq_scans(child)
+    return tables
+
+
+def _explain_seq_scans(statements: list[tuple[str, Any]]) -> dict[str, set[str]]:
+    found: dict[str, set[str]] = {}
+    with engine.connect() as conn:
+        conn.exec_driver_sql("SET enable_seqscan = off")
+        for statement, parameters in statements:
+            plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+            tables = _seq_scans(plan[0]["Plan"])
+            if tables:
+                found[statement] = tables
+        conn.rollback()
+    return found
+
+
+@pytest.fixture(scope="module")
+def board():
+    _cleanup_test_rows()
+    customer = _ensure_test_customer()
+    res = client.post(
+        "/orders",
+        json={
+            "customer_id": customer.id,
+            "trailer_type": "Dry Van",
+            "stops": [
+                {"stop_type": "pickup", "city": "Plan", "state": "AA", "lat": 40.0, "lng": -80.0, "sequence": 1},
+                {"stop_type": "stop", "city": "Mid", "state": "AA", "lat": 40.0, "lng": -79.0, "sequence": 2},
+                {"stop_type": "dropoff", "city": "View", "state": "BB", "lat": 41.0, "lng": -81.0, "sequence": 3},
+            ],
+        },
+    )
+    assert res.status_code == 201, res.text
+    # Full loads read everything by design; only their delta refreshes are checked.
+    snapshot = OrderBoardSnapshot(refresh_seconds=0)
+    index = CustomerPrefixIndex(refresh_seconds=0)
+    db = SessionLocal()
+    try:
+        token = latest_token(db)
+        snapshot.load(db)
+        index.load(db)
+    finally:
+        db.close()
+    yield {"customer": customer, "order": res.json(), "token": token, "snapshot": snapshot, "index": index}
+    _cleanup_test_rows()
+
+
+def _refresh(loaded) -> None:
+    db = SessionLocal()
+    try:
+        loaded.refresh(db)
+    finally:
+        db.close()
+
+
+def _backfill_candidates(_board) -> None:
+    db = SessionLocal()
+    try:
+        find_backfill_candidates(db, 0, 50)
+    finally:
+        db.close()
+
+
+def _schedule_batch(board) -> None:
+    db = SessionLocal()
+    try:
+        recompute_schedules(db, board["order"]["id"] - 1, 100)
+    finally:
+        db.close()
+
+
+def _outbox(_board) -> None:
+    db = SessionLocal()
+    try:
+        dispatch_batch(db, [], 100)
+        outbox_status(db)
+    finally:
+        db.close()
+
+
+def _validators(_board) -> None:
+    db = SessionLocal()
+    try:
+        table_validator(db, Order, Stop, Customer)
+    finally:
+        db.close()
+
+
+def _archive_candidates(_board) -> None:
+    db = SessionLocal()
+    try:
+        archive_orders(db, 36500, ["delivered", "cancelled"], 100)
+    finally:
+        db.close()
+
+
+def _sql_board(_board):
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(orders_router, "ORDER_BOARD_SNAPSHOT", False)
+        return client.get("/orders", params={"equipment": "dry-van"})
+
+
+# (name, request, tables allowed to be scanned in full and why)
+CASES: list[tuple[str, Callable[[dict], Any], set[str]]] = [
+    ("get order", lambda b: client.get(f"/orders/{b['order']['id']}"), set()),
+    ("get missing order (archive fallback)", lambda b: client.get("/orders/999999999"), set()),
+    ("batch", lambda b: client.post("/orders/batch", json={"ids": [b["order"]["id"]], "fields": ["id", "stops"]}), set()),
+    ("changes", lambda b: client.get("/orders/changes", params={"since": max(b["token"] - 10, 0)}), set()),
+    ("export by date", lambda b: client.get("/orders/export", params={"created_from": "2030-01-01"}), set()),
+    ("optimize preview", lambda b: client.post(f"/orders/{b['order']['id']}/optimize-stops/preview"), set()),
+    (
+        "replace stops",
+        lambda b: client.put(
+            f"/orders/{b['order']['id']}/stops",
+            json={"stops": [{key: s[key] for key in _STOP_FIELDS} for s in b["order"]["stops"]]},
+            headers={"Idempotency-Key": f"plan-{b['order']['id']}"},
+        ),
+        set(),
+    ),
+    ("board snapshot delta refresh", lambda b: _refresh(b["snapshot"]), set()),
+    ("customer index delta refresh", lambda b: _refresh(b["index"]), set()),
+    ("backfill candidates", _backfill_candidates, set()),
+    ("schedule recompute batch", _schedule_batch, set()),
+    ("outbox dispatch and status", _outbox, set()),
+    ("ETag table validators", _validators, set()),
+    ("archive candidates", _archive_candidates, set()),
+    # Counts span the whole board by definition.
+    ("facets", lambda b: client.get("/orders/facets", params={"equipment": "dry-van"}), {"orders", "stops", "customers"}),
+    # The SQL fallback for GET /orders filters in Python over every order; the snapshot replaces it.
+    ("board SQL fallback", _sql_board, {"orders", "stops", "customers"}),
+    # ILIKE '%term%' cannot use a b-tree index.
+    ("customer substring search", lambda b: client.get("/customers", params={"query": "TEST"}), {"customers"}),
+]
+
+
+@pytest.mark.parametrize("name,request_fn,allowed", CASES, ids=[case[0] for case in CASES])
+def test_endpoint_queries_avoid_seq_scans(board, name, request_fn, allowed):
+    with _captured_sql() as statements:
+        response = request_fn(board)
+    if response is not None:
+        assert response.status_code < 500, response.text
+    assert statements, f"{name}: no SQL captured"
+
+    unexpected = {
+        statement: tables - allowed
+        for statement, tables in _explain_seq_scans(statements).items()
+        if tables - allowed
+    }
+    assert not unexpected, f"{name}: sequential scans on {unexpected}"
+
+
+def test_trigger_lookups_use_indexes():
+    """The notify trigger's first/last-stop lookups run server-side, so they are not captured above."""
+    with engine.connect() as conn:
+        conn.exec_driver_sql("SET enable_seqscan = off")
+        for direction in ("", " DESC"):
+            plan = conn.exec_driver_sql(
+                "EXPLAIN (FORMAT JSON) SELECT s.state FROM stops s WHERE s.order_id = 1 "
+                f"ORDER BY s.sequence{direction} LIMIT 1"
+            ).scalar()
+            assert not _seq_scans(plan[0]["Plan"])
+        conn.rollback()
@@ -0,0 +1,74 @@
+import pytest
+
+from app.models import LaneHistory
+from app.services.lane_rates import lane_rates
+
+# Made-up states so real lane history never mixes into the expected aggregates.
+_TEST_STATES = ("QA", "QB", "QC")
+
+
+@pytest.fixture
+def lanes(db):
+    """Lane history for the made-up states; the rates table is reloaded when the test rolls back."""
+    db.query(LaneHistory).filter(LaneHistory.origin_state.in_(_TEST_STATES)).delete(synchronize_session=False)
+    db.add_all(
+        [
+            LaneHistory(origin_city="Alpha", origin_state="QA", destination_city="Beta", destination_state="QB",
+                        avg_rate_per_mile=3.0, total_loads=4),
+            LaneHistory(origin_city="Gamma", origin_state="QA", destination_city="Delta", destination_state="QB",
+                        avg_rate_per_mile=2.0, total_loads=1),
+            LaneHistory(origin_city="Gamma", origin_state="QA", destination_city="Zeta", destination_state="QC",
+                        avg_rate_per_mile=1.0, total_loads=1),
+        ]
+    )
+    db.commit()
+    lane_rates.load(db)
+
+
+def test_quote_falls_back_from_lane_to_state_pair_to_origin_state(api, lanes):
+    lane = api.post(
+        "/quotes",
+        json={"origin_city": " alpha ", "origin_state": "qa", "destination_city": "Beta", "destination_state": "QB",
+              "equipment": "Dry Van", "total_miles": 100},
+    ).json()
+    assert (lane["basis"], lane["rate_per_mile"], lane["sample_loads"], lane["total"]) == ("lane", 3.0, 4, 300.0)
+
+    # One load on Gamma -> Delta is too thin; the QA -> QB pair (5 loads, weighted 2.8/mile) is used.
+    pair = api.post(
+        "/quotes",
+        json={"origin_city": "Gamma", "origin_state": "QA", "destination_city": "Delta", "destination_state": "QB",
+              "equipment": "reefer"},
+    ).json()
+    assert (pair["basis"], pair["sample_loads"], pair["total"]) == ("state_pair", 5, None)
+    assert pair["rate_per_mile"] == pytest.approx(2.8 * 1.2)
+
+    origin = api.post("/quotes", json={"origin_state": "QA", "destination_state": "QC"}).json()
+    assert (origin["basis"], origin["sample_loads"]) == ("origin_state", 6)
+    assert origin["rate_per_mile"] == pytest.approx(15.0 / 6)
+
+
+def test_quote_for_order_and_batch(api, customer, lanes):
+    res = api.post(
+        "/orders",
+        json={
+            "customer_id": customer.id,
+            "trailer_type": "Flatbed",
+            "stops": [
+                {"stop_type": "pickup", "city": "Alpha", "state": "QA", "lat": 40.0, "lng": -80.0, "sequence": 1},
+                {"stop_type": "dropoff", "city": "Beta", "state": "QB", "lat": 41.0, "lng": -81.0, "sequence": 2},
+            ],
+        },
+    )
+    order = res.json()
+
+    quote = api.post("/quotes", json={"order_id": order["id"]}).json()
+    assert (quote["basis"], quote["equipment_multiplier"], quote["total_miles"]) == ("lane", 1.3, order["total_miles"])
+    assert quote["total"] == pytest.approx(3.9 * order["total_miles"], abs=0.01)
+    assert api.post("/quotes", json={"order_id": 999999999}).status_code == 404
+
+    batch = api.post(
+        "/quotes/batch",
+        json={"items": [{"order_id": order["id"]}, {"order_id": 999999999}, {"origin_state": "QA", "destination_state": "QB"}]},
+    ).json()
+    assert batch["missing_order_ids"] == [999999999]
+    assert [item["basis"] for item in batch["items"]] == ["lane", "state_pair"]
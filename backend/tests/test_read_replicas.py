@@ -0,0 +1,56 @@
+import time
+
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from app import database, main
+from app.database import PRIMARY_STICKY_COOKIE, PRIMARY_STICKY_HEADER, _wants_primary
+from app.main import app
+from app.routers import orders as orders_router
+
+STOPS = [
+    {"stop_type": "pickup", "city": "Alpha", "state": "AA", "lat": 40.0, "lng": -80.0, "sequence": 1},
+    {"stop_type": "dropoff", "city": "Beta", "state": "BB", "lat": 41.0, "lng": -81.0, "sequence": 2},
+]
+
+
+def _request(headers: dict[str, str]) -> Request:
+    raw = [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/orders", "headers": raw})
+
+
+def test_writes_pin_reads_through_a_header_cross_site_clients_can_echo(api, customer, monkeypatch):
+    monkeypatch.setattr(main, "ReplicaSessionLocals", [object()])
+    res = api.post(
+        "/orders",
+        json={"customer_id": customer.id, "stops": STOPS},
+        headers={"Origin": "https://frontend.example"},
+    )
+    assert res.status_code == 201, res.text
+    sticky_until = res.headers[PRIMARY_STICKY_HEADER]
+    assert PRIMARY_STICKY_HEADER.lower() in res.headers["access-control-expose-headers"].lower()
+    assert res.cookies[PRIMARY_STICKY_COOKIE] == sticky_until
+
+    assert _wants_primary(_request({PRIMARY_STICKY_HEADER: sticky_until}))
+    assert _wants_primary(_request({"Cookie": f"{PRIMARY_STICKY_COOKIE}={sticky_until}"}))
+    assert not _wants_primary(_request({PRIMARY_STICKY_HEADER: str(time.time() - 1)}))
+    assert not _wants_primary(_request({PRIMARY_STICKY_HEADER: "soon"}))
+    assert not _wants_primary(_request({}))
+
+
+def test_in_memory_answers_never_open_a_read_session(monkeypatch):
+    # No fixture overrides: the real read-session dependencies, read-only requests.
+    opened = []
+    monkeypatch.setattr(database, "ReplicaSessionLocals", [object()])
+    monkeypatch.setattr(database, "_open_replica_session", lambda: opened.append(1))  # None: use the primary
+    monkeypatch.setattr(orders_router, "ORDER_BOARD_SNAPSHOT", True)
+    client = TestClient(app)
+
+    board = client.get("/orders", params={"page_size": 1})
+    assert board.status_code == 200, board.text
+    assert client.get("/orders", params={"page_size": 1}, headers={"If-None-Match": board.headers["ETag"]}).status_code == 304
+    assert client.get("/customers", params={"query": "a", "mode": "typeahead"}).status_code == 200
+    assert opened == []
+
+    assert client.get("/customers", params={"query": "a"}).status_code == 200
+    assert opened == [1]
@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+from app.database import SessionLocal
+from app.models import Order, Stop
+from app.services import geometry, route_backfill
+
+from tests.test_orders import _cleanup_test_rows, _ensure_test_customer, client
+
+
+def _create_order(customer_id: int, first_stop: dict) -> int:
+    res = client.post(
+        "/orders",
+        json={
+            "customer_id": customer_id,
+            "trailer_type": "Dry Van",
+            "stops": [
+                {"stop_type": "pickup", "sequence": 1, **first_stop},
+                {"stop_type": "dropoff", "city": "Columbus", "state": "OH", "lat": 39.96, "lng": -83.0, "sequence": 2},
+            ],
+        },
+    )
+    assert res.status_code == 201, res.text
+    return res.json()["id"]
+
+
+# Backfill workers run on threads, each with its own pooled session.
+@pytest.mark.commits
+def test_backfill_geocodes_reroutes_and_resumes_from_checkpoint(monkeypatch, tmp_path):
+    _cleanup_test_rows()
+    customer = _ensure_test_customer()
+    # Upstreams down while the orders are created: Haversine miles, one stop left ungeocoded.
+    monkeypatch.setattr(geometry, "_osrm_route_miles", lambda stops: None)
+    monkeypatch.setattr(geometry, "_geocode_query", lambda query: None)
+    located = _create_order(customer.id, {"city": "Pittsburgh", "state": "PA", "lat": 40.44, "lng": -79.99})
+    unlocated = _create_order(customer.id, {"city": "Backfillville", "state": "PA"})
+    assert client.get(f"/orders/{located}").json()["distance_source"] == "haversine"
+    assert client.get(f"/orders/{unlocated}").json()["distance_source"] is None
+
+    # Upstreams back.
+    monkeypatch.setattr(geometry, "_osrm_route_miles", lambda stops: 200.0)
+    monkeypatch.setattr(geometry, "_geocode_query", lambda query: (40.5, -80.5))
+    monkeypatch.setattr(route_backfill, "_osrm_circuit_open", lambda: False)
+    checkpoint = tmp_path / "backfill.json"
+    route_backfill.save_checkpoint(checkpoint, {"last_id": located - 1, "counts": {}, "elapsed_seconds": 0.0})
+    reports: list[str] = []
+
+    first = route_backfill.run_backfill(2, 1, 0, checkpoint, limit=1, report=reports.append)
+    assert not first["finished"]
+    assert json.loads(checkpoint.read_text())["last_id"] == located
+    assert first["counts"]["osrm"] == 1
+
+    second = route_backfill.run_backfill(2, 1, 0, checkpoint, report=reports.append)
+    assert second["finished"]
+    assert second["counts"]["osrm"] == 2
+    assert not checkpoint.exists()
+    assert reports and "orders/s" in reports[-1]
+
+    db = SessionLocal()
+    try:
+        for order_id in (located, unlocated):
+            order = db.query(Order).filter(Order.id == order_id).one()
+            assert (order.total_miles, order.distance_source) == (200.0, "osrm")
+        stop = db.query(Stop).filter(Stop.order_id == unlocated, Stop.sequence == 1).one()
+        assert (stop.lat, stop.lng) == (40.5, -80.5)
+        assert route_backfill.find_backfill_candidates(db, located - 1, 10) == []
+    finally:
+        db.close()
+    _cleanup_test_rows()
+
+
+def test_pause_on_open_circuit_keeps_fallback_orders_for_the_resumed_run(monkeypatch, tmp_path):
+    ids = [11, 12, 13, 14]
+    monkeypatch.setattr(
+        route_backfill, "find_backfill_candidates", lambda db, after_id, limit: [i for i in ids if i > after_id][:limit]
+    )
+    monkeypatch.setattr(route_backfill, "_osrm_circuit_open", lambda: True)
+    # OSRM went down after order 11: the rest of the batch only got Haversine miles.
+    outcomes = {11: "osrm", 12: "haversine", 13: "osrm", 14: "haversine"}
+    monkeypatch.setattr(route_backfill, "backfill_order", outcomes.get)
+    checkpoint = tmp_path / "backfill.json"
+
+    paused = route_backfill.run_backfill(2, 4, 0, checkpoint, report=lambda line: None)
+    assert not paused["finished"]
+    assert paused["last_id"] == 11
+    assert paused["counts"]["osrm"] == 1 and paused["counts"]["haversine"] == 0
+
+    # OSRM is back: the resumed run starts at order 12.
+    seen = []
+    monkeypatch.setattr(route_backfill, "_osrm_circuit_open", lambda: False)
+    monkeypatch.setattr(route_backfill, "backfill_order", lambda order_id: seen.append(order_id) or "osrm")
+    resumed = route_backfill.run_backfill(2, 4, 0, checkpoint, report=lambda line: None)
+    assert resumed["finished"]
+    assert seen == [12, 13, 14]
+    assert resumed["counts"]["osrm"] == 4
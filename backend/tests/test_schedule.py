@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+
+from app.models import Order, Stop
+from app.services import geometry
+from app.services.geometry import haversine_miles
+from app.services.schedule import compute_schedule, recompute_schedules, summarize
+
+START = datetime(2030, 3, 4, 8, 0, tzinfo=timezone.utc)
+
+
+def test_compute_schedule_waits_for_early_windows_and_flags_late_stops():
+    windows = [
+        (START, None),
+        (START + timedelta(hours=5), START + timedelta(hours=6)),  # reached at 10:00, waits until 13:00
+        (None, START + timedelta(hours=7)),  # 13:00 + 1h dwell + 2h drive = 16:00, 60 minutes late
+        (None, None),
+    ]
+    schedule = compute_schedule(windows, [100.0, 100.0, None], avg_speed_mph=50, dwell_minutes=60)
+
+    assert [eta for eta, _ in schedule] == [
+        START,
+        START + timedelta(hours=3),
+        START + timedelta(hours=8),
+        None,  # unknown leg
+    ]
+    assert [slack for _, slack in schedule] == [None, 180.0, -60.0, None]
+    summary = summarize(schedule, min_slack_minutes=30)
+    assert (summary.at_risk, summary.violations) == (True, 1)
+    assert summarize(schedule[:2], min_slack_minutes=30).at_risk is False
+
+
+def test_compute_schedule_keeps_windows_when_the_first_stop_has_none():
+    windows = [
+        (None, None),
+        (START, START + timedelta(hours=1)),
+        (None, START + timedelta(hours=2)),  # 600 miles on from stop 2 but due an hour after it
+    ]
+    schedule = compute_schedule(windows, [100.0, 600.0], avg_speed_mph=50, dwell_minutes=60)
+
+    assert [eta for eta, _ in schedule] == [None, START, START + timedelta(hours=13)]
+    assert [slack for _, slack in schedule] == [None, 60.0, -660.0]
+    assert summarize(schedule, min_slack_minutes=30).violations == 1
+
+
+def test_order_writes_flag_infeasible_windows_and_batch_recompute_restores_them(api, customer, db):
+    res = api.post(
+        "/orders",
+        json={
+            "customer_id": customer.id,
+            "stops": [
+                {
+                    "stop_type": "pickup", "city": "Early", "state": "EA", "lat": 40.0, "lng": -100.0, "sequence": 1,
+                    "scheduled_arrival_early": START.isoformat(),
+                },
+                {
+                    # ~690 miles away but due within two hours of pickup.
+                    "stop_type": "dropoff", "city": "Late", "state": "LA", "lat": 40.0, "lng": -87.0, "sequence": 2,
+                    "scheduled_arrival_late": (START + timedelta(hours=2)).isoformat(),
+                },
+            ],
+        },
+    )
+    assert res.status_code == 201, res.text
+    order = res.json()
+    assert (order["at_risk"], order["window_violations"]) == (True, 1)
+    dropoff = order["stops"][1]
+    assert dropoff["slack_minutes"] < 0
+    assert datetime.fromisoformat(dropoff["eta"]) > START + timedelta(hours=2)
+
+    listed = api.get("/orders", params={"at_risk": "true", "q": "Late"}).json()
+    assert order["id"] in [item["id"] for item in listed["items"]]
+    assert all(item["at_risk"] for item in listed["items"])
+
+    db.execute(update(Order).where(Order.id == order["id"]).values(at_risk=False, window_violations=0))
+    db.commit()
+    order_ids, changed = recompute_schedules(db, order["id"] - 1, batch_size=10)
+    assert order_ids[0] == order["id"]
+    assert changed == 1
+    refreshed = db.query(Order).filter(Order.id == order["id"]).one()
+    assert (refreshed.at_risk, refreshed.window_violations) == (True, 1)
+    assert refreshed.version == order["version"] + 1
+    # Nothing left to change on a second pass.
+    assert recompute_schedules(db, order["id"] - 1, batch_size=10)[1] == 0
+
+
+def test_sweep_keeps_the_osrm_legs_written_inline(api, customer, db):
+    res = api.post(
+        "/orders",
+        json={
+            "customer_id": customer.id,
+            "stops": [
+                {
+                    "stop_type": "pickup", "city": "Sweep", "state": "SW", "lat": 40.0, "lng": -80.0, "sequence": 1,
+                    "scheduled_arrival_early": START.isoformat(),
+                },
+                {
+                    "stop_type": "dropoff", "city": "Sweep", "state": "SW", "lat": 40.5, "lng": -81.5, "sequence": 2,
+                    "scheduled_arrival_late": (START + timedelta(hours=4)).isoformat(),
+                },
+            ],
+        },
+    )
+    assert res.status_code == 201, res.text
+    order = res.json()
+    stops = db.query(Stop).filter(Stop.order_id == order["id"]).order_by(Stop.sequence).all()
+    # The stand-in's road factor makes the OSRM leg longer than Haversine.
+    haversine = haversine_miles(40.0, -80.0, 40.5, -81.5)
+    assert stops[0].leg_miles is None
+    assert stops[1].leg_miles > haversine * 1.1
+
+    # A sweep runs in its own process with an empty route cache; it must not fall back to Haversine.
+    geometry._matrix_cell_cache.clear()
+    assert recompute_schedules(db, order["id"] - 1, batch_size=1)[1] == 0
+
+    db.expire_all()
+    assert db.get(Order, order["id"]).version == order["version"]
+
+    # A real input change (the slack threshold) still goes through.
+    assert recompute_schedules(db, order["id"] - 1, batch_size=1, min_slack_minutes=24 * 60)[1] == 1
@@ -0,0 +1,66 @@
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.services.geometry import haversine_matrix_miles
+from app.services.stop_optimizer import optimize_stop_order
+
+
+def test_optimizer_keeps_ends_fixed_and_removes_backtracking():
+    # Points along a line, intermediates given out of order.
+    points = [(40.0, -80.0), (40.0, -77.0), (40.0, -79.0), (40.0, -78.0), (40.0, -76.0)]
+    matrix = haversine_matrix_miles(points, points)
+
+    result = optimize_stop_order(matrix, [(None, None)] * len(points))
+
+    assert result.order == [0, 2, 3, 1, 4]
+    assert result.violations == 0
+    assert result.miles < sum(matrix[i][i + 1] for i in range(len(points) - 1))
+
+
+def test_optimizer_prefers_feasible_windows_over_fewer_miles():
+    start = datetime(2025, 10, 1, 8, tzinfo=timezone.utc)
+    points = [(40.0, -80.0), (40.0, -79.0), (40.0, -78.0), (40.0, -77.0)]
+    matrix = haversine_matrix_miles(points, points)
+    windows = [
+        (start, start),
+        (start + timedelta(hours=10), start + timedelta(hours=12)),  # must come after stop 2
+        (start, start + timedelta(hours=4)),
+        (None, None),
+    ]
+
+    result = optimize_stop_order(matrix, windows, avg_speed_mph=50, dwell_minutes=60)
+
+    assert result.order == [0, 2, 1, 3]
+    assert result.violations == 0
+
+
+def test_optimizer_keeps_windows_when_the_first_stop_has_none():
+    start = datetime(2025, 10, 1, 8, tzinfo=timezone.utc)
+    points = [(40.0, -80.0), (40.0, -79.0), (40.0, -78.0), (40.0, -77.0)]
+    matrix = haversine_matrix_miles(points, points)
+    windows = [
+        (None, None),
+        (start + timedelta(hours=10), start + timedelta(hours=12)),  # must come after stop 2
+        (start, start + timedelta(hours=4)),
+        (None, None),
+    ]
+
+    result = optimize_stop_order(matrix, windows, avg_speed_mph=50, dwell_minutes=60)
+
+    assert result.order == [0, 2, 1, 3]
+    assert result.violations == 0
+
+
+def test_optimizer_handles_25_stops_quickly():
+    rng = random.Random(7)
+    points = [(rng.uniform(35, 45), rng.uniform(-95, -80)) for _ in range(25)]
+    matrix = haversine_matrix_miles(points, points)
+
+    started = time.perf_counter()
+    result = optimize_stop_order(matrix, [(None, None)] * len(points))
+    elapsed = time.perf_counter() - started
+
+    assert result.order[0] == 0 and result.order[-1] == 24
+    assert sorted(result.order) == list(range(25))
+    assert elapsed < 1.0
@@ -0,0 +1,34 @@
+from app import main
+from app.main import app
+from app.services import warmup
+from app.services.warmup import WarmupState, run_warmup
+
+
+def test_ready_is_503_until_warmup_finishes(api, customer, monkeypatch):
+    state = WarmupState()
+    monkeypatch.setattr(main, "warmup_state", state)
+    pending = api.get("/ready")
+    assert pending.status_code == 503
+    assert pending.json()["ready"] is False
+    assert pending.json()["startup_seconds"] is None
+
+    run_warmup(app, state, requests=1)
+    ready = api.get("/ready")
+    assert ready.status_code == 200, ready.text
+    body = ready.json()
+    assert body["ready"] is True
+    assert body["errors"] == {}
+    assert list(body["steps_ms"]) == ["mappers", "pools", "caches", "openapi", "endpoints"]
+    assert body["startup_seconds"] > 0
+    assert app.openapi_schema is not None
+
+
+def test_failing_step_is_reported_without_blocking_readiness(api, monkeypatch):
+    def broken():
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(warmup, "_load_caches", broken)
+    state = run_warmup(app, WarmupState(), requests=0)
+    assert state.ready
+    assert state.errors == {"caches": "RuntimeError: database unavailable"}
+    assert "endpoints" not in state.steps
@@ -107,15 +107,27 @@ export interface OrderMilesEstimateResponse {
   total_miles?: number | null;
 }
 
+// After a write the API returns X-Primary-Until; echoing it keeps this browser's reads on the primary
+// database until then. The API is on another origin, so its cookie of the same value is not sent back.
+const PRIMARY_STICKY_HEADER = "X-Primary-Until";
+let primaryUntil: string | null = null;
+
 async function fetchApi<T>(
   path: string,
   options?: RequestInit
 ): Promise<T> {
   const url = `${BASE}${path}`;
+  const sticky =
+    primaryUntil && Number(primaryUntil) * 1000 > Date.now()
+      ? { [PRIMARY_STICKY_HEADER]: primaryUntil }
+      : undefined;
   const res = await fetch(url, {
     ...options,
-    headers: { "Content-Type": "application/json", ...options?.headers },
+    headers: { "Content-Type": "application/json", ...sticky, ...options?.headers },
   });
+  // Server-side rendering shares this module across users, so only browsers remember the pin.
+  const pinned = res.headers.get(PRIMARY_STICKY_HEADER);
+  if (pinned && typeof window !== "undefined") primaryUntil = pinned;
   if (!res.ok) {
     const err = await res.json().catch(() => ({ detail: res.statusText }));
     throw new Error(Array.isArray(err.detail) ? err.detail.map((e: { msg: string }) => e.msg).join(", ") : err.detail || res.statusText);